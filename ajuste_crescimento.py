@@ -0,0 +1,447 @@
+# ajuste_crescimento.py
+
+"""
+    Ajuste das curvas de crescimento aos pesos reais registrados em tbl_crescimento.
+
+    Todos os plantios são ajustados de uma só vez: as medições são empilhadas em
+    matrizes (n_plantios, n_medicoes) com máscara e um Levenberg-Marquardt em lote
+    resolve os parâmetros de todos os plantios ao mesmo tempo. Os resultados ficam
+    em tbl_crescimento_ajustes, chaveados por (bancada, cultivar, data_plantio), e
+    só são recalculados para os plantios cujos pesos mudaram.
+"""
+
+import hashlib
+import sqlite3
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import modelo_crescimento
+
+DB_NAME = "./dados/hidroponia.db"
+
+# Modelos disponíveis: nome -> número de parâmetros (K, r, t0[, nu])
+MODELOS = {
+    "logistico": 3,
+    "gompertz": 3,
+    "richards": 4,
+    "weibull": 4
+}
+
+MODELOS_AJUSTE = ("logistico", "gompertz", "richards", "weibull")
+
+# Plantios por consulta em carregar_medicoes (3 parâmetros cada, abaixo do limite do SQLite)
+CHAVES_POR_CONSULTA = 300
+
+MAX_ITER_LM = 100
+PASSO_JACOBIANO = 1e-6
+
+SQL_CRIAR_TABELA = """
+    CREATE TABLE IF NOT EXISTS tbl_crescimento_ajustes (
+        aju_bancada_id INTEGER NOT NULL,
+        aju_cultivar_id INTEGER NOT NULL,
+        aju_data_plantio TEXT NOT NULL,
+        aju_modelo TEXT,
+        aju_K REAL,
+        aju_r REAL,
+        aju_t0 REAL,
+        aju_nu REAL,
+        aju_rmse REAL,
+        aju_n_medicoes INTEGER,
+        aju_dias INTEGER,
+        aju_peso_colheita_previsto REAL,
+        aju_assinatura TEXT,
+        aju_atualizado_em TEXT,
+        PRIMARY KEY (aju_bancada_id, aju_cultivar_id, aju_data_plantio)
+    )
+"""
+
+
+def criar_tabela(conn):
+    """Cria a tabela de ajustes, se ainda não existir"""
+    conn.execute(SQL_CRIAR_TABELA)
+
+
+# --- Modelos de crescimento ---
+
+def avaliar_modelo(modelo, t, K, r, t0, nu=None):
+    """Avalia o modelo de crescimento no tempo t (com broadcasting)"""
+    t = np.asarray(t, dtype=np.float64)
+    x = -r * (t - t0)
+    with np.errstate(over="ignore", invalid="ignore", divide="ignore"):
+        if modelo == "logistico":
+            return modelo_crescimento.avaliar_logistica(t, K, r, t0)
+        if modelo == "gompertz":
+            return K * np.exp(-np.exp(np.minimum(x, 50.0)))
+        if modelo == "richards":
+            # W = K / (1 + nu e^x)^(1/nu), calculado em escala logarítmica
+            return K * np.exp(-np.logaddexp(0.0, np.log(nu) + x) / nu)
+        if modelo == "weibull":
+            # W = K (1 - e^-(r (t - t0))^nu), com t0 como início do crescimento
+            return -K * np.expm1(-(r * np.maximum(t - t0, 0.0)) ** nu)
+    raise ValueError(f"Modelo desconhecido: {modelo}")
+
+
+def estimativa_inicial(modelo, log_K, log_r, t0):
+    """
+    Parâmetros iniciais (escala transformada) de cada modelo a partir de uma
+    logística de referência com inflexão em t0.
+    """
+    if modelo == "weibull":
+        # Início em t = 0 e forma 3: a curva passa por 63% de K em t = t0
+        return np.column_stack([
+            log_K, -np.log(np.maximum(t0, 1.0)), np.zeros_like(t0), np.full_like(t0, np.log(3.0))
+        ])
+    colunas = [log_K, log_r, t0] + ([np.zeros_like(t0)] if MODELOS[modelo] == 4 else [])
+    return np.column_stack(colunas)
+
+
+def _para_naturais(modelo, theta):
+    """Converte os parâmetros otimizados (log K, log r, t0[, log nu]) em naturais"""
+    with np.errstate(over="ignore"):
+        K = np.exp(theta[..., 0])
+        r = np.exp(theta[..., 1])
+        t0 = theta[..., 2]
+        nu = np.exp(theta[..., 3]) if MODELOS[modelo] == 4 else None
+    return K, r, t0, nu
+
+
+def _prever(modelo, theta, t):
+    K, r, t0, nu = _para_naturais(modelo, theta)
+    return avaliar_modelo(
+        modelo, t, K[:, None], r[:, None], t0[:, None],
+        None if nu is None else nu[:, None]
+    )
+
+
+def aicc(n, sse, k):
+    """
+    AIC corrigido para amostras pequenas, em lote (n e sse por plantio). Exige
+    n >= k + 2 medições: abaixo disso o valor é infinito (modelo não elegível).
+    """
+    n = np.asarray(n, dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        valor = n * np.log(np.maximum(sse, 1e-12) / n) + 2 * k + 2 * k * (k + 1) / (n - k - 1)
+    return np.where(n >= k + 2, valor, np.inf)
+
+
+def _sse(modelo, theta, t, y, mascara):
+    residuos = np.where(mascara, _prever(modelo, theta, t) - y, 0.0)
+    sse = np.sum(residuos ** 2, axis=1)
+    return np.where(np.isfinite(sse), sse, np.inf), residuos
+
+
+def ajustar_lote(modelo, t, y, mascara, theta0, max_iter=MAX_ITER_LM):
+    """
+    Ajusta um modelo a vários plantios de uma vez por Levenberg-Marquardt.
+
+    t, y e mascara são matrizes (n_plantios, n_medicoes); theta0 traz as
+    estimativas iniciais (n_plantios, n_parametros) em escala transformada.
+    Retorna (theta, sse).
+    """
+    theta = np.array(theta0, dtype=np.float64)
+    n, k = theta.shape
+    lam = np.full(n, 1e-2)
+    sse, residuos = _sse(modelo, theta, t, y, mascara)
+    ativo = np.ones(n, dtype=bool)
+    identidade = np.eye(k)
+
+    for _ in range(max_iter):
+        # Jacobiano por diferenças finitas, todas as colunas em lote
+        jac = np.empty((n, t.shape[1], k))
+        for j in range(k):
+            deslocado = theta.copy()
+            deslocado[:, j] += PASSO_JACOBIANO
+            _, res_j = _sse(modelo, deslocado, t, y, mascara)
+            jac[:, :, j] = (res_j - residuos) / PASSO_JACOBIANO
+        jac = np.nan_to_num(jac, nan=0.0, posinf=0.0, neginf=0.0)
+
+        jtj = np.einsum("nmk,nml->nkl", jac, jac)
+        gradiente = np.einsum("nmk,nm->nk", jac, residuos)
+        diagonal = np.einsum("nkk->nk", jtj)
+        sistema = jtj + (lam[:, None] * diagonal + 1e-12)[:, :, None] * identidade
+        try:
+            delta = np.linalg.solve(sistema, -gradiente[:, :, None])[:, :, 0]
+        except np.linalg.LinAlgError:
+            delta = -np.einsum("nkl,nl->nk", np.linalg.pinv(sistema), gradiente)
+
+        candidato = theta + np.where(ativo[:, None], delta, 0.0)
+        sse_novo, residuos_novos = _sse(modelo, candidato, t, y, mascara)
+        aceito = ativo & (sse_novo < sse)
+
+        melhora = np.where(aceito, (sse - sse_novo) / np.maximum(sse, 1e-12), 0.0)
+        theta = np.where(aceito[:, None], candidato, theta)
+        residuos = np.where(aceito[:, None], residuos_novos, residuos)
+        sse = np.where(aceito, sse_novo, sse)
+        lam = np.where(aceito, lam / 3.0, lam * 4.0)
+
+        ativo &= ~(aceito & (melhora < 1e-10)) & (lam < 1e10)
+        if not ativo.any():
+            break
+
+    return theta, sse
+
+
+# --- Carregamento das medições ---
+
+def _dias_desde_plantio(datas, plantio):
+    return (pd.to_datetime(datas) - pd.to_datetime(plantio)).dt.days.to_numpy() + 1
+
+
+def carregar_medicoes(conn, plantios=None, apenas_ativos=True, data_ref=None):
+    """
+    Carrega os registros de crescimento agrupados por plantio.
+
+    plantios: lista opcional de chaves (bancada_id, cultivar_id, data_plantio),
+    filtradas na própria consulta.
+    apenas_ativos: considera só plantios cujo último dia previsto é >= data_ref.
+    """
+    sql = """
+        SELECT cre_bancada_id, cre_cultivar_id, cre_data_plantio, cre_data,
+               cre_peso_esperado, cre_peso_real
+        FROM tbl_crescimento
+        {filtro}
+        ORDER BY cre_bancada_id, cre_cultivar_id, cre_data_plantio, cre_data
+    """
+    if plantios is None:
+        df = pd.read_sql(sql.format(filtro=""), conn)
+    else:
+        plantios = [
+            (int(b), int(c), d.strftime('%Y-%m-%d') if isinstance(d, date) else d)
+            for b, c, d in plantios
+        ]
+        partes = []
+        for ini in range(0, len(plantios), CHAVES_POR_CONSULTA):
+            bloco = plantios[ini:ini + CHAVES_POR_CONSULTA]
+            filtro = ("WHERE (cre_bancada_id, cre_cultivar_id, cre_data_plantio) IN (VALUES "
+                      + ", ".join(["(?, ?, ?)"] * len(bloco)) + ")")
+            partes.append(pd.read_sql(sql.format(filtro=filtro), conn, params=[v for chave in bloco for v in chave]))
+        df = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame()
+    if df.empty:
+        return df
+
+    chaves = ["cre_bancada_id", "cre_cultivar_id", "cre_data_plantio"]
+    if plantios is None and apenas_ativos:
+        data_ref = (data_ref or date.today()).strftime('%Y-%m-%d')
+        ultimo_dia = df.groupby(chaves)["cre_data"].transform("max")
+        df = df[ultimo_dia >= data_ref]
+
+    df = df.copy()
+    df["dia"] = _dias_desde_plantio(df["cre_data"], df["cre_data_plantio"])
+    return df
+
+
+def _assinatura(grupo):
+    """Hash das medições de um plantio, usado para detectar alterações"""
+    medidas = grupo.loc[grupo["cre_peso_real"].notna(), ["dia", "cre_peso_real"]]
+    # O critério de escolha entra no hash: ajustes gravados com outro critério são refeitos
+    texto = "aicc|" + ";".join(f"{d}:{p:.4f}" for d, p in medidas.itertuples(index=False))
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def _montar_matrizes(grupos):
+    """Empilha as medições dos plantios em matrizes com máscara"""
+    medicoes = [g[g["cre_peso_real"].notna() & (g["cre_peso_real"] > 0)] for g in grupos]
+    n_max = max((len(m) for m in medicoes), default=0)
+    n = len(grupos)
+    t = np.zeros((n, max(n_max, 1)))
+    y = np.zeros_like(t)
+    mascara = np.zeros_like(t, dtype=bool)
+    for i, m in enumerate(medicoes):
+        t[i, :len(m)] = m["dia"].to_numpy()
+        y[i, :len(m)] = m["cre_peso_real"].to_numpy()
+        mascara[i, :len(m)] = True
+    return t, y, mascara
+
+
+def _estimativa_inicial(grupos, t, y, mascara, dias=None):
+    """
+    Estimativa inicial a partir da curva teórica gravada em cre_peso_esperado.
+    dias: ciclo de cada plantio; sem ele, vale o último dia registrado.
+    """
+    if dias is None:
+        dias = np.array([int(g["dia"].max()) for g in grupos])
+    else:
+        dias = np.asarray(dias, dtype=np.int64)
+    esperado = [g["cre_peso_esperado"].dropna() for g in grupos]
+    p_inicial = np.array([e.iloc[0] if len(e) else 5.0 for e in esperado], dtype=np.float64)
+    p_final = np.array([e.iloc[-1] if len(e) else 0.0 for e in esperado], dtype=np.float64)
+
+    # Sem curva teórica utilizável, parte do maior peso medido
+    y_max = np.where(mascara, y, 0.0).max(axis=1)
+    sem_teorica = ~(p_final > p_inicial)
+    p_inicial = np.where(sem_teorica, np.maximum(y_max / 50.0, 1e-3), p_inicial)
+    p_final = np.where(sem_teorica, np.maximum(y_max * 1.2, 1.0), p_final)
+
+    K, r, t0 = modelo_crescimento.calcular_parametros_lote(p_inicial, p_final, np.maximum(dias, 3))
+    return np.log(K), np.log(r), t0, dias
+
+
+def ajustar_plantios(grupos, modelos=MODELOS_AJUSTE, dias=None):
+    """
+    Ajusta os modelos pedidos a uma lista de plantios (DataFrames de medições)
+    e escolhe, para cada plantio, o modelo de menor AICc (ver aicc).
+
+    dias: ciclo de cada plantio (dia da colheita), onde o peso de colheita é
+    avaliado; sem ele, vale o último dia registrado de cada grupo.
+
+    Retorna um DataFrame com uma linha por plantio.
+    """
+    t, y, mascara = _montar_matrizes(grupos)
+    n_medicoes = mascara.sum(axis=1)
+    log_K, log_r, t0, dias = _estimativa_inicial(grupos, t, y, mascara, dias)
+
+    melhor = {
+        "modelo": np.full(len(grupos), None, dtype=object),
+        "aic": np.full(len(grupos), np.inf),
+        "theta": np.full((len(grupos), 4), np.nan),
+        "sse": np.full(len(grupos), np.nan),
+    }
+
+    for modelo in modelos:
+        k = MODELOS[modelo]
+        aptos = n_medicoes >= k + 2
+        if not aptos.any():
+            continue
+        theta0 = estimativa_inicial(modelo, log_K, log_r, t0)[aptos]
+        theta, sse = ajustar_lote(modelo, t[aptos], y[aptos], mascara[aptos], theta0)
+
+        aic = aicc(n_medicoes[aptos], sse, k)
+        idx = np.flatnonzero(aptos)
+        troca = np.isfinite(aic) & (aic < melhor["aic"][idx])
+        idx = idx[troca]
+        melhor["modelo"][idx] = modelo
+        melhor["aic"][idx] = aic[troca]
+        melhor["sse"][idx] = sse[troca]
+        melhor["theta"][idx, :k] = theta[troca]
+        melhor["theta"][idx, k:] = np.nan
+
+    theta = melhor["theta"]
+    K, r, t0_aj = np.exp(theta[:, 0]), np.exp(theta[:, 1]), theta[:, 2]
+    nu = np.exp(theta[:, 3])
+
+    peso_colheita = np.full(len(grupos), np.nan)
+    for modelo in modelos:
+        sel = melhor["modelo"] == modelo
+        if sel.any():
+            peso_colheita[sel] = avaliar_modelo(
+                modelo, dias[sel], K[sel], r[sel], t0_aj[sel],
+                nu[sel] if MODELOS[modelo] == 4 else None
+            )
+
+    return pd.DataFrame({
+        "modelo": melhor["modelo"],
+        "K": K,
+        "r": r,
+        "t0": t0_aj,
+        "nu": nu,
+        "rmse": np.sqrt(melhor["sse"] / np.maximum(n_medicoes, 1)),
+        "n_medicoes": n_medicoes,
+        "dias": dias,
+        "peso_colheita_previsto": peso_colheita,
+    })
+
+
+# --- Atualização incremental ---
+
+def atualizar_ajustes(conn=None, plantios=None, apenas_ativos=True, modelos=MODELOS_AJUSTE, forcar=False, data_ref=None):
+    """
+    Recalcula os ajustes dos plantios cujas medições mudaram desde o último cálculo.
+    data_ref: data que define os plantios ativos (padrão: hoje).
+
+    Retorna o número de plantios reajustados.
+    """
+    fechar = conn is None
+    if fechar:
+        conn = sqlite3.connect(DB_NAME)
+    try:
+        criar_tabela(conn)
+        df = carregar_medicoes(conn, plantios=plantios, apenas_ativos=apenas_ativos, data_ref=data_ref)
+        if df.empty:
+            return 0
+
+        armazenadas = dict(
+            ((b, c, d), a) for b, c, d, a in conn.execute("""
+                SELECT aju_bancada_id, aju_cultivar_id, aju_data_plantio, aju_assinatura
+                FROM tbl_crescimento_ajustes
+            """)
+        )
+
+        chaves, grupos, assinaturas = [], [], []
+        for chave, grupo in df.groupby(["cre_bancada_id", "cre_cultivar_id", "cre_data_plantio"], sort=False):
+            assinatura = _assinatura(grupo)
+            chave = (int(chave[0]), int(chave[1]), chave[2])
+            if forcar or armazenadas.get(chave) != assinatura:
+                chaves.append(chave)
+                grupos.append(grupo)
+                assinaturas.append(assinatura)
+
+        if not grupos:
+            return 0
+
+        resultado = ajustar_plantios(grupos, modelos)
+        agora = datetime.now().isoformat(timespec="seconds")
+
+        def _valor(v):
+            return None if v is None or (isinstance(v, float) and not np.isfinite(v)) else float(v)
+
+        linhas = []
+        for chave, assinatura, aj in zip(chaves, assinaturas, resultado.itertuples(index=False)):
+            ajustado = aj.modelo is not None
+            linhas.append((
+                *chave,
+                aj.modelo,
+                _valor(aj.K) if ajustado else None,
+                _valor(aj.r) if ajustado else None,
+                _valor(aj.t0) if ajustado else None,
+                _valor(aj.nu) if ajustado and MODELOS[aj.modelo] == 4 else None,
+                _valor(aj.rmse) if ajustado else None,
+                int(aj.n_medicoes),
+                int(aj.dias),
+                _valor(aj.peso_colheita_previsto) if ajustado else None,
+                assinatura,
+                agora
+            ))
+
+        conn.executemany("""
+            INSERT OR REPLACE INTO tbl_crescimento_ajustes (
+                aju_bancada_id, aju_cultivar_id, aju_data_plantio, aju_modelo,
+                aju_K, aju_r, aju_t0, aju_nu, aju_rmse, aju_n_medicoes, aju_dias,
+                aju_peso_colheita_previsto, aju_assinatura, aju_atualizado_em
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, linhas)
+        conn.commit()
+        return len(linhas)
+    finally:
+        if fechar:
+            conn.close()
+
+
+def obter_ajuste(bancada_id, cultivar_id, data_plantio):
+    """
+    Devolve o ajuste de um plantio como dicionário (ou None se não houver
+    medições suficientes), recalculando-o antes se os pesos mudaram.
+    """
+    data_plantio = data_plantio.strftime('%Y-%m-%d') if isinstance(data_plantio, date) else data_plantio
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        atualizar_ajustes(conn, plantios=[(bancada_id, cultivar_id, data_plantio)])
+        linha = conn.execute("""
+            SELECT aju_modelo, aju_K, aju_r, aju_t0, aju_nu, aju_rmse,
+                   aju_n_medicoes, aju_dias, aju_peso_colheita_previsto
+            FROM tbl_crescimento_ajustes
+            WHERE aju_bancada_id = ? AND aju_cultivar_id = ? AND aju_data_plantio = ?
+        """, (bancada_id, cultivar_id, data_plantio)).fetchone()
+    finally:
+        conn.close()
+
+    if not linha or linha[0] is None:
+        return None
+    campos = ["modelo", "K", "r", "t0", "nu", "rmse", "n_medicoes", "dias", "peso_colheita_previsto"]
+    return dict(zip(campos, linha))
+
+
+def avaliar_ajuste(ajuste, dias):
+    """Avalia a curva ajustada (dicionário de obter_ajuste) nos dias informados"""
+    return avaliar_modelo(ajuste["modelo"], dias, ajuste["K"], ajuste["r"], ajuste["t0"], ajuste["nu"])
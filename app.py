@@ -3,6 +3,8 @@
 import streamlit as st
 import importlib.util
 import sys
+import cache_curvas
+import recursos_chatbot
 
 # Configuração da página principal do Streamlit
 st.set_page_config(
@@ -73,6 +75,21 @@ if 'current_page' not in st.session_state:
 if 'show_change_password' not in st.session_state:
     st.session_state.show_change_password = False
 
+# --- Pré-aquecimento (uma vez por processo) do cache de curvas teóricas dos cultivares ---
+# A exceção sai da função cacheada: o st.cache_resource não guarda falhas e a
+# próxima execução da página tenta de novo
+@st.cache_resource(show_spinner=False)
+def pre_aquecer_curvas():
+    return cache_curvas.pre_aquecer_cultivares()
+
+try:
+    pre_aquecer_curvas()
+except Exception as e:
+    print(f"[app] Pré-aquecimento das curvas falhou: {e}")
+
+# --- Carga em segundo plano (uma vez por processo) dos modelos do chatbot; não bloqueia a página ---
+recursos_chatbot.iniciar()
+
 # --- Função para carregar módulos externos dinamicamente ---
 def load_module(module_name):
     try:
@@ -178,6 +195,7 @@ def home_page():
                 {"icon": "🧮", "name": "Calculadora Inteligente", "page": "calculadora"},
                 {"icon": "🧬", "name": "Nutrientes por Cultivar", "page": "nutrientes"},
                 {"icon": "📈", "name": "Crescimento Inteligente", "page": "crescimento"},
+                {"icon": "📊", "name": "Painel de Crescimento", "page": "painel_crescimento"},
                 {"icon": "🧑‍🌾", "name": "Pergunte ao especialista", "page": "chatbot_ollama"},
                 {"icon": "📚", "name": "Biblioteca hidropônica", "page": "biblioteca"},
                 {"icon": "📅", "name": "Agenda de tarefas 🚧", "page": "agenda"},
@@ -0,0 +1,201 @@
+# avaliar_chatbot.py
+
+"""
+    Avaliação offline do chatbot (busca e extração de respostas) sobre um índice
+    gravado pelo treinar.py, sem o Streamlit.
+
+    As perguntas de referência ficam em benchmarks/perguntas_ouro.json, cada uma
+    com a resposta esperada e o trecho do documento que a contém. Um chunk
+    recuperado é relevante quando contém o trecho (sem diferença de acentos,
+    maiúsculas e espaços); assim a avaliação vale para qualquer índice dos
+    mesmos documentos, seja qual for o tamanho dos chunks ou a numeração.
+
+    Métricas: recall@k (perguntas com algum chunk relevante entre os k
+    primeiros), MRR, exact match e F1 por tokens da resposta extraída, e
+    latência p50/p95 de cada etapa (embedding da pergunta, busca com o
+    embedding, QA e total). O cache de consultas não é usado: cada pergunta paga
+    o custo real.
+
+    Com limites (--min-recall, --min-mrr, --min-f1, --max-p95), o código de saída
+    é 1 quando algum não é atingido, o que permite condicionar a troca do índice
+    à avaliação:
+
+        python treinar.py --indice faiss_index_novo --reconstruir
+        python avaliar_chatbot.py --indice faiss_index_novo --min-recall 0.9 --min-mrr 0.7 --max-p95 800
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+# A raiz do projeto (pasta deste script) vai para o fim do sys.path: o email.py
+# do projeto não pode encobrir o módulo email da biblioteca padrão (usado pelo langchain)
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+sys.path = [p for p in sys.path if os.path.abspath(p or os.curdir) != RAIZ] + [RAIZ]
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+import busca_hibrida
+import indice_chatbot
+import recursos_chatbot
+
+PERGUNTAS = "benchmarks/perguntas_ouro.json"
+K_DOCS = 5
+ETAPAS = ("embedding", "busca", "qa", "total")
+
+
+def normalizar_resposta(texto):
+    texto = busca_hibrida.remover_acentos(texto.lower())
+    return re.sub(r"[^\w\s]", " ", texto).split()
+
+
+def exato(previsto, esperado):
+    return float(normalizar_resposta(previsto) == normalizar_resposta(esperado))
+
+
+def f1(previsto, esperado):
+    previsto, esperado = normalizar_resposta(previsto), normalizar_resposta(esperado)
+    comuns = sum((Counter(previsto) & Counter(esperado)).values())
+    if not comuns:
+        return 0.0
+    precisao, cobertura = comuns / len(previsto), comuns / len(esperado)
+    return 2 * precisao * cobertura / (precisao + cobertura)
+
+
+def normalizar_trecho(texto):
+    return " ".join(busca_hibrida.remover_acentos(texto.lower()).split())
+
+
+def posicao_relevante(textos, trecho):
+    """Posição (a partir de 1) do primeiro texto que contém o trecho, ou None"""
+    trecho = normalizar_trecho(trecho)
+    for posicao, texto in enumerate(textos, 1):
+        if trecho in normalizar_trecho(texto):
+            return posicao
+    return None
+
+
+class EmbeddingsCronometrados(Embeddings):
+    """Repassa ao modelo de embeddings e guarda a duração do último embed_query"""
+
+    def __init__(self, embeddings):
+        self.embeddings = embeddings
+        self.ultimo = 0.0
+
+    def embed_documents(self, textos):
+        return self.embeddings.embed_documents(textos)
+
+    def embed_query(self, texto):
+        inicio = time.perf_counter()
+        vetor = self.embeddings.embed_query(texto)
+        self.ultimo = time.perf_counter() - inicio
+        return vetor
+
+
+def avaliar_pergunta(recursos, embeddings, item, k, com_qa=True):
+    """Posição do primeiro chunk relevante, resposta extraída, EM, F1 e tempo de cada etapa (ms)"""
+    inicio = time.perf_counter()
+    docs = recursos.buscar_documentos(recursos_chatbot.preprocess_question(item["pergunta"]), k)
+    tempos = {"embedding": embeddings.ultimo * 1000, "busca": (time.perf_counter() - inicio) * 1000}
+    contextos = [doc.page_content for doc in docs if doc.page_content.strip()]
+    resultado = {"pergunta": item["pergunta"], "posicao": posicao_relevante(contextos, item["trecho"])}
+    if com_qa:
+        inicio_qa = time.perf_counter()
+        extraido = recursos.leitor_qa.responder(item["pergunta"], contextos)
+        tempos["qa"] = (time.perf_counter() - inicio_qa) * 1000
+        resposta = extraido["answer"].strip() if extraido else ""
+        resultado.update(resposta=resposta, esperada=item["resposta"], em=exato(resposta, item["resposta"]), f1=f1(resposta, item["resposta"]))
+    tempos["total"] = (time.perf_counter() - inicio) * 1000
+    resultado["tempos"] = tempos
+    return resultado
+
+
+def resumir(resultados, k):
+    """Métricas agregadas: recall@1, @3 e @k, MRR, EM e F1 médios e p50/p95 (ms) de cada etapa"""
+    posicoes = [r["posicao"] for r in resultados]
+    metricas = {}
+    for corte in sorted({1, 3, k}):
+        if corte <= k:
+            metricas[f"recall@{corte}"] = float(np.mean([p is not None and p <= corte for p in posicoes]))
+    metricas["mrr"] = float(np.mean([1 / p if p else 0.0 for p in posicoes]))
+    if "em" in resultados[0]:
+        metricas["em"] = float(np.mean([r["em"] for r in resultados]))
+        metricas["f1"] = float(np.mean([r["f1"] for r in resultados]))
+    for etapa in ETAPAS:
+        tempos = [r["tempos"][etapa] for r in resultados if etapa in r["tempos"]]
+        if tempos:
+            metricas[f"{etapa}_p50_ms"] = float(np.percentile(tempos, 50))
+            metricas[f"{etapa}_p95_ms"] = float(np.percentile(tempos, 95))
+    return metricas
+
+
+def verificar_limites(metricas, k, min_recall=None, min_mrr=None, min_f1=None, max_p95=None):
+    """Lista dos limites não atingidos (vazia se a avaliação passou)"""
+    falhas = []
+    for nome, valor, limite in ((f"recall@{k}", metricas[f"recall@{k}"], min_recall), ("mrr", metricas["mrr"], min_mrr), ("f1", metricas.get("f1"), min_f1)):
+        if limite is not None and (valor is None or valor < limite):
+            falhas.append(f"{nome} = {'-' if valor is None else f'{valor:.3f}'} < {limite}")
+    if max_p95 is not None and metricas["total_p95_ms"] > max_p95:
+        falhas.append(f"total p95 = {metricas['total_p95_ms']:.0f} ms > {max_p95} ms")
+    return falhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avaliação offline da busca e das respostas do chatbot")
+    parser.add_argument("--indice", default=recursos_chatbot.FAISS_INDEX_PATH, help="pasta do índice gravado pelo treinar.py")
+    parser.add_argument("--perguntas", default=PERGUNTAS, help="arquivo JSON com as perguntas de referência")
+    parser.add_argument("--k", type=int, default=K_DOCS, help="chunks recuperados por pergunta")
+    parser.add_argument("--modelo", default=recursos_chatbot.EMBEDDING_MODEL, help="modelo de embeddings (o mesmo do índice)")
+    parser.add_argument("--busca", choices=("hibrida", "densa"), default="hibrida", help="densa: só o FAISS, sem o BM25")
+    parser.add_argument("--sem-qa", action="store_true", help="avalia só a busca (sem carregar o modelo de QA)")
+    parser.add_argument("--saida", help="grava o relatório completo (métricas e cada pergunta) em JSON")
+    limites = parser.add_argument_group("limites (código de saída 1 se algum não for atingido)")
+    limites.add_argument("--min-recall", type=float, help="recall@k mínimo")
+    limites.add_argument("--min-mrr", type=float, help="MRR mínimo")
+    limites.add_argument("--min-f1", type=float, help="F1 médio mínimo das respostas")
+    limites.add_argument("--max-p95", type=float, help="latência total p95 máxima (ms)")
+    args = parser.parse_args()
+
+    with open(args.perguntas, encoding="utf-8") as f:
+        perguntas = json.load(f)
+
+    recursos_chatbot.verificar_indice(args.indice)
+    embeddings = EmbeddingsCronometrados(recursos_chatbot.carregar_embeddings(args.modelo))
+    vector_store, bm25 = recursos_chatbot.carregar_indices(args.indice, embeddings)
+    leitor_qa = None if args.sem_qa else recursos_chatbot.carregar_leitor_qa()
+    recursos = recursos_chatbot.RecursosChatbot(vector_store, bm25 if args.busca == "hibrida" else None, leitor_qa, None)
+
+    resultados = [avaliar_pergunta(recursos, embeddings, item, args.k, not args.sem_qa) for item in perguntas]
+    metricas = resumir(resultados, args.k)
+
+    print(f"Índice: {args.indice} (versão {indice_chatbot.versao_indice(args.indice)}), busca {args.busca}, "
+          f"{len(perguntas)} perguntas, k = {args.k}")
+    for r in resultados:
+        linha = f"  {r['posicao'] or '-':>2}  {r['pergunta']}"
+        if "resposta" in r:
+            linha += f"  ->  {r['resposta']!r} (F1 {r['f1']:.2f})"
+        print(linha)
+    print(" | ".join(f"{nome} {valor:.3f}" for nome, valor in metricas.items() if not nome.endswith("_ms")))
+    for etapa in ETAPAS:
+        if f"{etapa}_p50_ms" in metricas:
+            print(f"{etapa:<10} p50 {metricas[f'{etapa}_p50_ms']:8.1f} ms   p95 {metricas[f'{etapa}_p95_ms']:8.1f} ms")
+
+    falhas = verificar_limites(metricas, args.k, args.min_recall, args.min_mrr, args.min_f1, args.max_p95)
+    if args.saida:
+        relatorio = {"indice": args.indice, "versao": indice_chatbot.versao_indice(args.indice), "busca": args.busca,
+                     "k": args.k, "metricas": metricas, "falhas": falhas, "perguntas": resultados}
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=2)
+    if falhas:
+        print("REPROVADO: " + "; ".join(falhas))
+        sys.exit(1)
+    print("APROVADO")
+
+
+if __name__ == "__main__":
+    main()
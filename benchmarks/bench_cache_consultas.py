@@ -0,0 +1,86 @@
+# benchmarks/bench_cache_consultas.py
+
+"""
+    Benchmark do cache de consultas do chatbot (cache_consultas): latência de
+    RecursosChatbot.buscar_documentos (embedding da pergunta, busca FAISS + BM25
+    e leitura dos chunks) sem cache e com o cache nas situações do servidor:
+
+    - falha: pergunta nova (calcula tudo e põe o embedding na fila de gravação);
+    - memória: pergunta repetida no mesmo processo;
+    - disco: pergunta repetida depois de um reinício (cache novo, mesmo banco).
+
+    As perguntas vêm de perguntas_ouro.json e o cache grava num banco temporário
+    (hidroponia.db não é tocado).
+
+    Uso (a partir da raiz do projeto):
+        python benchmarks/bench_cache_consultas.py [--indice faiss_index] [--repeticoes 3]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+# A raiz do projeto vai para o fim do sys.path: o email.py do projeto não pode
+# encobrir o módulo email da biblioteca padrão
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+import numpy as np
+
+import cache_consultas
+import recursos_chatbot
+
+PERGUNTAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perguntas_ouro.json")
+K = 5
+
+
+def medir(recursos, perguntas):
+    """Latências (ms) de buscar_documentos, uma pergunta por vez"""
+    latencias = []
+    for pergunta in perguntas:
+        inicio = time.perf_counter()
+        recursos.buscar_documentos(pergunta, K)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+    return latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do cache de consultas do chatbot")
+    parser.add_argument("--indice", default=os.path.join(RAIZ, "faiss_index"))
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    with open(PERGUNTAS, encoding="utf-8") as f:
+        perguntas = [p["pergunta"] for p in json.load(f)]
+    embeddings = recursos_chatbot.carregar_embeddings()
+    vector_store, bm25 = recursos_chatbot.carregar_indices(args.indice, embeddings)
+
+    resultados = {"sem cache": [], "falha": [], "memória": [], "disco": []}
+    sem_cache = recursos_chatbot.RecursosChatbot(vector_store, bm25, None, None)
+    with tempfile.TemporaryDirectory() as pasta:
+        db = os.path.join(pasta, "cache.db")
+        for _ in range(args.repeticoes):
+            resultados["sem cache"] += medir(sem_cache, perguntas)
+            if os.path.exists(db):
+                os.remove(db)
+            cache = cache_consultas.CacheConsultas(recursos_chatbot.EMBEDDING_MODEL, db=db)
+            recursos = recursos_chatbot.RecursosChatbot(vector_store, bm25, None, cache)
+            resultados["falha"] += medir(recursos, perguntas)
+            resultados["memória"] += medir(recursos, perguntas)
+            cache.esperar_gravacoes()
+            # Reinício do servidor: memória vazia, embeddings no disco
+            recursos.cache = cache_consultas.CacheConsultas(recursos_chatbot.EMBEDDING_MODEL, db=db)
+            resultados["disco"] += medir(recursos, perguntas)
+            recursos.cache.esperar_gravacoes()
+
+    print(f"{len(perguntas)} perguntas x {args.repeticoes} repetições; busca dos {K} chunks mais relevantes")
+    print(f"{'situação':<10} {'p50 (ms)':>9} {'p95 (ms)':>9}")
+    for situacao, latencias in resultados.items():
+        print(f"{situacao:<10} {np.percentile(latencias, 50):>9.2f} {np.percentile(latencias, 95):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
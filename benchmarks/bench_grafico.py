@@ -0,0 +1,127 @@
+# benchmarks/bench_grafico.py
+
+"""
+    Benchmark do gráfico de crescimento: figura original (2 traces de pontos por
+    linha, um add_vline por data e um add_vrect por fase) contra a figura de
+    número constante de traces de grafico_crescimento.py.
+
+    Mede, por duração de plantio, o número de traces e shapes, o tempo de montagem,
+    o tempo de serialização (fig.to_json, o que o Streamlit envia ao navegador)
+    e o tamanho do JSON.
+
+    Uso (a partir da raiz do projeto):
+        python benchmarks/bench_grafico.py [--dias 30 90 180 365] [--repeticoes 3]
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+# A raiz do projeto vai para o fim do sys.path: o email.py do projeto não pode
+# encobrir o módulo email da biblioteca padrão (usado por plotly e pandas)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+import grafico_crescimento
+import modelo_crescimento
+
+
+def criar_grafico_original(registros_df, cultivar_nome="Desconhecido"):
+    """Versão anterior de crescimento.criar_grafico (sem o título e a legenda)"""
+    df = registros_df.copy()
+    df["Data"] = pd.to_datetime(df["Data"])
+
+    fig = px.line(
+        df,
+        x="Data",
+        y=["Peso previsto (g)", "Peso real (g)"],
+        color_discrete_sequence=["#81C784", "#FF5252"],
+        labels={"value": "Peso (g)", "variable": ""},
+    )
+
+    for _, row in df.iterrows():
+        fig.add_scatter(x=[row["Data"]], y=[row["Peso real (g)"]], mode='markers',
+                        marker=dict(color="#FF5252", size=8), showlegend=False, hoverinfo="skip")
+        fig.add_scatter(x=[row["Data"]], y=[row["Peso previsto (g)"]], mode='markers',
+                        marker=dict(color="#81C784", size=8), showlegend=False, hoverinfo="skip")
+
+    meses_pt = grafico_crescimento.MESES_PT
+    fig.update_layout(xaxis=dict(
+        tickvals=df["Data"],
+        ticktext=[f"{d.day}/{meses_pt[d.month]}" for d in df["Data"]],
+        tickangle=90
+    ))
+
+    inicio, fase_atual = None, None
+    intervalos = []
+    for _, row in df.iterrows():
+        if row["Fase"] != fase_atual:
+            if fase_atual is not None:
+                intervalos.append((fase_atual, inicio, row["Data"]))
+            fase_atual, inicio = row["Fase"], row["Data"]
+    intervalos.append((fase_atual, inicio, df.iloc[-1]["Data"]))
+
+    for fase, x0, x1 in intervalos:
+        fig.add_vrect(x0=x0, x1=x1, fillcolor=grafico_crescimento.CORES_FASES[fase], opacity=0.7,
+                      layer="below", line_width=0, annotation_text=fase, annotation_position="top left")
+
+    for data in df["Data"]:
+        fig.add_vline(x=data, line_dash="dot", line_color="gray", line_width=1, opacity=0.3)
+
+    return fig
+
+
+def montar_registros(dias, semente=0):
+    """Plantio sintético com pesos reais em torno da curva prevista"""
+    rng = np.random.default_rng(semente)
+    dias_arr, pesos, fase_ids, _, _ = modelo_crescimento.gerar_curva(5.0, 260.0, dias)
+    return pd.DataFrame({
+        "Dia": dias_arr,
+        "Data": [date(2025, 1, 1) + timedelta(days=int(d) - 1) for d in dias_arr],
+        "Fase": [modelo_crescimento.FASES[int(f)] for f in fase_ids],
+        "Peso previsto (g)": np.round(pesos, 2),
+        "Peso real (g)": np.round(pesos * rng.normal(1.0, 0.05, dias), 2),
+    })
+
+
+def medir(funcao, df, repeticoes):
+    montagem, serializacao = [], []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        fig = funcao(df)
+        montagem.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        json_fig = fig.to_json()
+        serializacao.append(time.perf_counter() - inicio)
+    return fig, min(montagem), min(serializacao), len(json_fig)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do gráfico de crescimento")
+    parser.add_argument("--dias", type=int, nargs="+", default=[30, 90, 180, 365])
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    versoes = {
+        "original": criar_grafico_original,
+        "constante": grafico_crescimento.criar_grafico,
+    }
+
+    print(f"{'dias':>5} {'versão':>10} {'traces':>7} {'shapes':>7} {'montagem (s)':>13} "
+          f"{'to_json (s)':>12} {'JSON (KiB)':>11}")
+    for dias in args.dias:
+        df = montar_registros(dias)
+        for nome, funcao in versoes.items():
+            fig, t_montagem, t_json, tamanho = medir(funcao, df, args.repeticoes)
+            print(f"{dias:>5} {nome:>10} {len(fig.data):>7} {len(fig.layout.shapes):>7} "
+                  f"{t_montagem:>13.3f} {t_json:>12.3f} {tamanho / 1024:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
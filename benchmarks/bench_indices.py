@@ -0,0 +1,138 @@
+# benchmarks/bench_indices.py
+
+"""
+    Benchmark dos tipos de índice de busca de treinar.py: exato (flat) contra
+    HNSW e IVF-PQ com vários parâmetros. Para cada variante mede o recall@5 em
+    relação à busca exata, a latência por consulta (uma consulta por vez, como no
+    chatbot), o tempo de montagem e o tamanho do index.faiss gravado.
+
+    Por padrão usa 100 mil vetores sintéticos de dimensão 768 (a do modelo de
+    embeddings), agrupados em tópicos como os chunks de uma biblioteca; com
+    --indice, usa os vetores de um índice já treinado (parte deles vira consulta).
+    Os arquivos são gravados numa pasta temporária.
+
+    Uso (a partir da raiz do projeto):
+        python benchmarks/bench_indices.py [--n 100000] [--consultas 500]
+        python benchmarks/bench_indices.py --indice faiss_index
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# A raiz do projeto vai para o fim do sys.path: o email.py do projeto não pode
+# encobrir o módulo email da biblioteca padrão
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import faiss
+import numpy as np
+
+import treinar
+
+K = 5
+
+# (rótulo, ajustes da configuração, parâmetro de busca variado sem remontar)
+VARIANTES = [
+    ("hnsw M=16", {"tipo": "hnsw", "hnsw_m": 16}, ("ef_busca", [32, 64, 128])),
+    ("hnsw M=32", {"tipo": "hnsw", "hnsw_m": 32}, ("ef_busca", [32, 64, 128])),
+    ("ivfpq m=48", {"tipo": "ivfpq", "pq_m": 48}, ("nprobe", [8, 16, 32])),
+    ("ivfpq m=96", {"tipo": "ivfpq", "pq_m": 96}, ("nprobe", [8, 16, 32])),
+]
+
+
+def vetores_sinteticos(n, d, n_consultas, topicos=2000, semente=0):
+    """Vetores em torno de centros de tópicos, com ruído; consultas do mesmo modelo"""
+    rng = np.random.default_rng(semente)
+    centros = rng.standard_normal((topicos, d)).astype("float32")
+    total = n + n_consultas
+    vetores = centros[rng.integers(topicos, size=total)]
+    vetores += 0.7 * rng.standard_normal((total, d)).astype("float32")
+    return vetores[:n], vetores[n:]
+
+
+def vetores_do_indice(pasta, n_consultas, semente=0):
+    """Vetores de um índice treinado; n_consultas deles saem do índice e viram consultas"""
+    exato = treinar.VETORES if os.path.exists(os.path.join(pasta, treinar.VETORES)) else "index.faiss"
+    # O índice precisa existir enquanto os vetores (sem cópia) são lidos
+    index = faiss.read_index(os.path.join(pasta, exato))
+    _, vetores = treinar.matriz_vetores(index)
+    # Em índices pequenos, no máximo metade dos vetores vira consulta
+    n_consultas = min(n_consultas, len(vetores) // 2)
+    ordem = np.random.default_rng(semente).permutation(len(vetores))
+    return np.ascontiguousarray(vetores[ordem[n_consultas:]]), np.ascontiguousarray(vetores[ordem[:n_consultas]])
+
+
+def definir_parametro(index, nome, valor):
+    if nome == "ef_busca":
+        faiss.downcast_index(index.index).hnsw.efSearch = valor
+    else:
+        index.nprobe = valor
+
+
+def medir_busca(index, consultas, exatos):
+    """Recall@K em relação à busca exata e latências (ms) de consultas individuais"""
+    latencias = np.empty(len(consultas))
+    encontrados = np.empty((len(consultas), K), dtype=np.int64)
+    for i in range(len(consultas)):
+        inicio = time.perf_counter()
+        _, ids = index.search(consultas[i:i + 1], K)
+        latencias[i] = (time.perf_counter() - inicio) * 1000
+        encontrados[i] = ids[0]
+    acertos = sum(len(np.intersect1d(encontrados[i], exatos[i])) for i in range(len(consultas)))
+    return acertos / exatos.size, np.percentile(latencias, 50), np.percentile(latencias, 95)
+
+
+def tamanho_mb(index, pasta, nome):
+    caminho = os.path.join(pasta, nome)
+    faiss.write_index(index, caminho)
+    return os.path.getsize(caminho) / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos índices de busca (flat, HNSW, IVF-PQ)")
+    parser.add_argument("--n", type=int, default=100_000, help="vetores sintéticos")
+    parser.add_argument("--d", type=int, default=768, help="dimensão dos vetores sintéticos")
+    parser.add_argument("--consultas", type=int, default=500)
+    parser.add_argument("--indice", help="pasta de um índice treinado (em vez dos vetores sintéticos)")
+    args = parser.parse_args()
+
+    if args.indice:
+        vetores, consultas = vetores_do_indice(args.indice, args.consultas)
+    else:
+        vetores, consultas = vetores_sinteticos(args.n, args.d, args.consultas)
+    n, d = vetores.shape
+
+    exato = faiss.IndexIDMap2(faiss.IndexFlatL2(d))
+    exato.add_with_ids(vetores, np.arange(1, n + 1, dtype=np.int64))
+    del vetores
+    _, exatos = exato.search(consultas, K)
+
+    print(f"{n} vetores de dimensão {d}; {len(consultas)} consultas; recall@{K} em relação à busca exata")
+    print(f"{'índice':<12} {'parâmetro':<14} {'recall@5':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} "
+          f"{'montagem (s)':>12} {'disco (MB)':>10}")
+    with tempfile.TemporaryDirectory() as pasta:
+        _, p50, p95 = medir_busca(exato, consultas, exatos)
+        print(f"{'flat':<12} {'-':<14} {1.0:>8.3f} {p50:>9.3f} {p95:>9.3f} {0.0:>12.1f} "
+              f"{tamanho_mb(exato, pasta, 'flat.faiss'):>10.1f}")
+
+        for rotulo, ajustes, (parametro, valores) in VARIANTES:
+            config = treinar.config_indice(**ajustes)
+            if config["tipo"] == "ivfpq" and (n < treinar.MIN_VETORES_IVFPQ or d % config["pq_m"]):
+                print(f"{rotulo:<12} (ignorado: {n} vetores de dimensão {d})")
+                continue
+            inicio = time.perf_counter()
+            index = treinar.construir_indice(exato, config)
+            montagem = time.perf_counter() - inicio
+            disco = tamanho_mb(index, pasta, "busca.faiss")
+            for valor in valores:
+                definir_parametro(index, parametro, valor)
+                recall, p50, p95 = medir_busca(index, consultas, exatos)
+                print(f"{rotulo:<12} {f'{parametro}={valor}':<14} {recall:>8.3f} {p50:>9.3f} {p95:>9.3f} "
+                      f"{montagem:>12.1f} {disco:>10.1f}")
+            del index
+
+
+if __name__ == "__main__":
+    main()
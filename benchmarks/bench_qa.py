@@ -0,0 +1,107 @@
+# benchmarks/bench_qa.py
+
+"""
+    Benchmark da extração de respostas do chatbot: pipeline question-answering
+    da HF sobre os 5 chunks juntos num único contexto (versão anterior de
+    chatbot.py) contra qa_extrativo.LeitorQA (janelas por chunk em lotes, com e
+    sem saída antecipada) no PyTorch e, se o onnxruntime estiver instalado, no
+    ONNX Runtime com quantização int8.
+
+    As perguntas e respostas esperadas vêm de perguntas_ouro.json; os contextos
+    de cada pergunta são os 5 chunks da busca BM25 do índice do chatbot (sem o
+    modelo de embeddings, para medir só o QA). Para cada variante: exact match,
+    F1 por tokens (os do avaliar_chatbot.py), latência por pergunta (p50/p95) e
+    janelas processadas.
+
+    Uso (a partir da raiz do projeto):
+        python benchmarks/bench_qa.py [--indice faiss_index] [--repeticoes 3]
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time
+
+# A raiz do projeto vai para o fim do sys.path: o email.py do projeto não pode
+# encobrir o módulo email da biblioteca padrão
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(RAIZ)
+
+import numpy as np
+from transformers import pipeline
+
+import busca_hibrida
+import indice_chatbot
+import qa_extrativo
+from avaliar_chatbot import exato, f1
+
+QA_MODEL = "pierreguillou/bert-base-cased-squad-v1.1-portuguese"
+PERGUNTAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perguntas_ouro.json")
+K_DOCS = 5
+
+
+def carregar_casos(pasta):
+    """(pergunta, resposta esperada, textos dos K_DOCS chunks do BM25) de cada pergunta do arquivo"""
+    with open(PERGUNTAS, encoding="utf-8") as f:
+        perguntas = json.load(f)
+    bm25 = busca_hibrida.IndiceBM25(pasta)
+    docstore = indice_chatbot.DocstoreSQLite(os.path.join(pasta, indice_chatbot.DOCSTORE), somente_leitura=True)
+    casos = []
+    for item in perguntas:
+        ids = bm25.buscar(item["pergunta"], K_DOCS)
+        casos.append((item["pergunta"], item["resposta"], [docstore.search(str(i)).page_content for i in ids]))
+    docstore.fechar()
+    return casos
+
+
+def medir(responder, casos, repeticoes):
+    """EM e F1 médios, latências p50/p95 (ms) e média de janelas processadas por pergunta"""
+    latencias, ems, f1s, janelas = [], [], [], []
+    for pergunta, esperada, contextos in casos:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = responder(pergunta, contextos)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        resposta = resultado["answer"] if resultado else ""
+        ems.append(exato(resposta, esperada))
+        f1s.append(f1(resposta, esperada))
+        janelas.append(resultado["janelas"][0] if resultado and "janelas" in resultado else np.nan)
+    return np.mean(ems), np.mean(f1s), np.percentile(latencias, 50), np.percentile(latencias, 95), np.nanmean(janelas)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da extração de respostas do chatbot (PyTorch e ONNX int8)")
+    parser.add_argument("--indice", default=os.path.join(RAIZ, "faiss_index"), help="pasta do índice do chatbot")
+    parser.add_argument("--repeticoes", type=int, default=3, help="execuções de cada pergunta (latência)")
+    args = parser.parse_args()
+
+    casos = carregar_casos(args.indice)
+    leitor = qa_extrativo.LeitorQA(QA_MODEL)
+    hf = pipeline("question-answering", model=leitor.modelo, tokenizer=leitor.tokenizer, device=-1)
+
+    variantes = [
+        ("pipeline contexto único", lambda p, c: hf({"question": p, "context": " ".join(c)})),
+        ("torch lotes", lambda p, c: leitor.responder(p, c, limiar_saida=1.1)),
+        ("torch lotes + saída", leitor.responder),
+    ]
+    if importlib.util.find_spec("onnxruntime"):
+        onnx = qa_extrativo.LeitorQA(QA_MODEL, "onnx", os.path.join(RAIZ, qa_extrativo.PASTA_ONNX))
+        variantes += [
+            ("onnx int8 lotes", lambda p, c: onnx.responder(p, c, limiar_saida=1.1)),
+            ("onnx int8 lotes + saída", onnx.responder),
+        ]
+    else:
+        print("onnxruntime não instalado: variantes ONNX ignoradas")
+
+    print(f"{len(casos)} perguntas, {K_DOCS} chunks por pergunta, {args.repeticoes} repetições")
+    print(f"{'variante':<26} {'EM':>6} {'F1':>6} {'p50 (ms)':>9} {'p95 (ms)':>9} {'janelas':>8}")
+    for rotulo, responder in variantes:
+        responder(casos[0][0], casos[0][2])  # aquecimento
+        em, f1_medio, p50, p95, janelas = medir(responder, casos, args.repeticoes)
+        print(f"{rotulo:<26} {em:>6.2f} {f1_medio:>6.2f} {p50:>9.1f} {p95:>9.1f} {janelas:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# benchmarks/bench_salvar.py
+
+"""
+    Benchmark da gravação dos registros de crescimento: laço SELECT + UPDATE/INSERT
+    por linha (versão anterior de crescimento.main) contra o UPSERT em lote de
+    crescimento_db.salvar_registros, para plantios de 365 dias.
+
+    Usa um banco SQLite temporário; o banco do projeto não é alterado.
+
+    Uso (a partir da raiz do projeto):
+        python benchmarks/bench_salvar.py [--dias 365] [--outros-plantios 200] [--alterados 1 30 365]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# A raiz do projeto vai para o fim do sys.path: o email.py do projeto não pode
+# encobrir o módulo email da biblioteca padrão (usado por plotly e pandas)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+import crescimento_db
+import modelo_crescimento
+
+SQL_TABELA = """
+    CREATE TABLE tbl_crescimento (
+        cre_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        cre_bancada_id INTEGER,
+        cre_cultivar_id INTEGER,
+        cre_data_plantio TEXT,
+        cre_data TEXT,
+        cre_fase_id INTEGER,
+        cre_peso_esperado REAL,
+        cre_peso_real REAL
+    )
+"""
+
+DATA_PLANTIO = date(2025, 1, 1)
+
+
+def salvar_original(conn, bancada_id, cultivar_id, data_plantio, registros_df):
+    """Laço usado antes no botão "Salvar Alterações" (uma consulta por linha)"""
+    cursor = conn.cursor()
+    for _, row in registros_df.iterrows():
+        cursor.execute("""
+            SELECT cre_id FROM tbl_crescimento
+            WHERE cre_bancada_id = ? AND cre_cultivar_id = ?
+            AND cre_data_plantio = ? AND cre_data = ?
+        """, (bancada_id, cultivar_id, data_plantio.strftime('%Y-%m-%d'), row["Data"].strftime('%Y-%m-%d')))
+        existente = cursor.fetchone()
+        if existente:
+            cursor.execute("UPDATE tbl_crescimento SET cre_peso_real = ? WHERE cre_id = ?",
+                           (round(row["Peso real (g)"], 2), existente[0]))
+        else:
+            cursor.execute("""
+                INSERT INTO tbl_crescimento (
+                    cre_bancada_id, cre_cultivar_id, cre_data_plantio, cre_data,
+                    cre_fase_id, cre_peso_esperado, cre_peso_real
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (bancada_id, cultivar_id, data_plantio.strftime('%Y-%m-%d'), row["Data"].strftime('%Y-%m-%d'),
+                  row["_fase_id"], round(row["Peso previsto (g)"], 2), round(row["Peso real (g)"], 2)))
+    conn.commit()
+
+
+def montar_registros(dias):
+    dias_arr, pesos, fase_ids, _, _ = modelo_crescimento.gerar_curva(5.0, 260.0, dias)
+    return pd.DataFrame({
+        "Dia": dias_arr,
+        "Data": [pd.Timestamp(DATA_PLANTIO + timedelta(days=int(d) - 1)) for d in dias_arr],
+        "Fase": [modelo_crescimento.FASES[int(f)] for f in fase_ids],
+        "Peso previsto (g)": np.round(pesos, 2),
+        "Peso real (g)": np.round(pesos, 2),
+        "_fase_id": fase_ids,
+    })
+
+
+def verificar_duplicados():
+    """
+    Tabela antiga com dias duplicados: a criação da chave única deve manter o
+    peso real salvo (gravado pelo laço antigo na linha de menor cre_id).
+    Retorna True se todos os pesos foram preservados.
+    """
+    conn = sqlite3.connect(":memory:")
+    conn.execute(SQL_TABELA)
+    linhas = [
+        # (data, peso_esperado, peso_real): a primeira linha de cada dia recebeu o peso salvo
+        ("2025-01-01", 5.0, 6.1), ("2025-01-01", 5.0, None),
+        ("2025-01-02", 5.5, None), ("2025-01-02", 5.5, 7.3),
+        ("2025-01-03", 6.0, None), ("2025-01-03", 6.0, None),
+    ]
+    conn.executemany("""
+        INSERT INTO tbl_crescimento (cre_bancada_id, cre_cultivar_id, cre_data_plantio, cre_data,
+                                     cre_fase_id, cre_peso_esperado, cre_peso_real)
+        VALUES (1, 6, '2025-01-01', ?, 1, ?, ?)
+    """, linhas)
+    crescimento_db.garantir_chave_unica(conn)
+    restantes = conn.execute("SELECT cre_id, cre_data, cre_peso_real FROM tbl_crescimento ORDER BY cre_data").fetchall()
+    conn.close()
+    return restantes == [(1, "2025-01-01", 6.1), (4, "2025-01-02", 7.3), (5, "2025-01-03", None)]
+
+
+def criar_banco(caminho, registros_df, outros_plantios, com_indice):
+    """Banco com o plantio medido e outros plantios para dar volume à tabela"""
+    conn = sqlite3.connect(caminho)
+    conn.execute(SQL_TABELA)
+    for i in range(outros_plantios + 1):
+        plantio = DATA_PLANTIO + timedelta(days=7 * i)
+        crescimento_db.salvar_registros(1 + i % 4, 6, plantio, registros_df.assign(
+            Data=registros_df["Data"] + pd.Timedelta(days=7 * i)), conn=conn)
+    if not com_indice:
+        conn.execute("DROP INDEX idx_crescimento_plantio_data")
+    conn.commit()
+    return conn
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark da gravação de tbl_crescimento")
+    parser.add_argument("--dias", type=int, default=365)
+    parser.add_argument("--outros-plantios", type=int, default=200)
+    parser.add_argument("--alterados", type=int, nargs="+", default=[1, 30, 365])
+    args = parser.parse_args()
+
+    if not verificar_duplicados():
+        sys.exit("Erro: a remoção de duplicados perdeu pesos reais salvos.")
+    print("Remoção de duplicados: pesos reais salvos preservados.")
+
+    registros = montar_registros(args.dias)
+    rng = np.random.default_rng(0)
+
+    print(f"Plantio de {args.dias} dias; tabela com {args.outros_plantios + 1} plantios")
+    print(f"{'alterados':>9} {'laço original (s)':>18} {'UPSERT em lote (s)':>19} {'linhas enviadas':>16}")
+    with tempfile.TemporaryDirectory() as pasta:
+        conn_original = criar_banco(os.path.join(pasta, "original.db"), registros, args.outros_plantios, False)
+        conn_lote = criar_banco(os.path.join(pasta, "lote.db"), registros, args.outros_plantios, True)
+
+        for qtd in args.alterados:
+            pesos_salvos = registros["Peso real (g)"].copy()
+            editado = registros.copy()
+            idx = rng.choice(len(editado), size=min(qtd, len(editado)), replace=False)
+            editado.loc[idx, "Peso real (g)"] += 1.0
+
+            inicio = time.perf_counter()
+            salvar_original(conn_original, 1, 6, DATA_PLANTIO, editado)
+            tempo_original = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            enviadas = crescimento_db.salvar_registros(1, 6, DATA_PLANTIO, editado, pesos_salvos, conn=conn_lote)
+            tempo_lote = time.perf_counter() - inicio
+
+            print(f"{qtd:>9} {tempo_original:>18.4f} {tempo_lote:>19.4f} {enviadas:>16}")
+
+        conn_original.close()
+        conn_lote.close()
+
+
+if __name__ == "__main__":
+    main()
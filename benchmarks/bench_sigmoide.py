@@ -0,0 +1,106 @@
+# benchmarks/bench_sigmoide.py
+
+"""
+    Benchmark do motor de crescimento (modelo_crescimento.py) contra o laço
+    de ponto fixo original de crescimento.py / cresc.py / sigmoid.py.
+
+    Uso (a partir da raiz do projeto):
+        python benchmarks/bench_sigmoide.py [--plantios 10000]
+"""
+
+import argparse
+import os
+import sys
+import math
+import time
+
+# A raiz do projeto vai para o fim do sys.path: o email.py do projeto não pode
+# encobrir o módulo email da biblioteca padrão (usado por plotly e pandas)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+import modelo_crescimento
+
+
+def calcular_parametros_original(p_inicial, p_final, dias):
+    """Cópia do laço de ponto fixo usado antes do motor vetorizado"""
+    t0 = dias / 2.0
+    K = p_final * 1.05
+    tolerancia = 0.01
+    max_iter = 1000
+
+    for _ in range(max_iter):
+        try:
+            if K <= p_inicial:
+                K = p_inicial * 1.1
+                continue
+
+            arg = (K / p_inicial) - 1
+            if arg <= 0:
+                K *= 1.1
+                continue
+
+            r = -math.log(arg) / (1 - t0)
+
+            exp_term = math.exp(-r * (dias - t0))
+            p_final_calculado = K / (1 + exp_term)
+
+            if abs(p_final_calculado - p_final) < tolerancia:
+                return K, r, t0
+
+            K *= p_final / p_final_calculado
+
+        except (ValueError, ZeroDivisionError):
+            K *= 1.1
+            continue
+
+    return K, 0.1, t0
+
+
+def gerar_dados_original(p_inicial, p_final, dias):
+    """Geração dia a dia com math.exp, como era feito nas páginas"""
+    K, r, t0 = calcular_parametros_original(p_inicial, p_final, dias)
+    pesos = []
+    for t in range(1, dias + 1):
+        pesos.append(K / (1 + math.exp(-r * (t - t0))))
+    return pesos, K, r
+
+
+def sortear_plantios(n, semente=42):
+    rng = np.random.default_rng(semente)
+    p_inicial = rng.uniform(1.0, 20.0, n)
+    p_final = p_inicial * rng.uniform(5.0, 400.0, n)
+    dias = rng.integers(20, 120, n)
+    return p_inicial, p_final, dias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do motor de crescimento sigmoidal")
+    parser.add_argument("--plantios", type=int, default=10_000)
+    args = parser.parse_args()
+
+    p_inicial, p_final, dias = sortear_plantios(args.plantios)
+
+    inicio = time.perf_counter()
+    resultados = [gerar_dados_original(pi, pf, int(d)) for pi, pf, d in zip(p_inicial, p_final, dias)]
+    tempo_original = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    pesos, _, K, r, _ = modelo_crescimento.gerar_curvas_lote(p_inicial, p_final, dias)
+    tempo_lote = time.perf_counter() - inicio
+
+    K_original = np.array([res[1] for res in resultados])
+    finais = pesos[np.arange(len(dias)), dias - 1]
+    desvio_K = np.max(np.abs(K - K_original) / K_original)
+    desvio_final = np.max(np.abs(finais - p_final))
+
+    print(f"Plantios: {args.plantios}")
+    print(f"Laço original : {tempo_original:8.3f} s")
+    print(f"Motor em lote : {tempo_lote:8.3f} s  ({tempo_original / tempo_lote:.0f}x)")
+    print(f"Maior desvio relativo de K: {desvio_K:.2e}")
+    print(f"Maior erro no peso final (g): {desvio_final:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# benchmarks/testar_provedores.py
+
+"""
+    Testes da camada de LLMs remotos (provedores_llm) contra APIs simuladas por
+    um httpx.MockTransport, sem rede: novas tentativas em 429/5xx e falhas de
+    conexão, troca de provedor em erro e em resposta vazia, prazo do primeiro
+    token (TTFT) e pedido paralelo (hedge), nos dois sentidos. Cada cenário
+    confere o provedor que respondeu, o texto, as falhas registradas, as
+    tentativas e se o pedido descartado foi cancelado, e mostra o tempo gasto.
+
+    O comportamento de cada API simulada vem do caminho da URL do provedor:
+        /ok           responde na hora
+        /lento<s>     manda o primeiro pedaço depois de s segundos
+        /erro<status> responde sempre com o status
+        /falha<n>     n respostas 429 (Retry-After curto) antes do 200
+        /conexao<n>   n falhas de conexão antes do 200
+        /vazio        resposta 200 sem texto
+
+    Uso (a partir da raiz do projeto; sai com código 1 se algum cenário falhar):
+        python benchmarks/testar_provedores.py
+"""
+
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import Counter
+
+# A raiz do projeto vai para o fim do sys.path: o email.py do projeto não pode
+# encobrir o módulo email da biblioteca padrão
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+import provedores_llm
+
+PEDACOS = ["Olá", ",", " mundo."]
+MENSAGENS = [{"role": "user", "content": "O que é hidroponia?"}]
+
+
+class APISimulada:
+    """Handler do httpx.MockTransport: responde conforme o caminho e conta requisições e cancelamentos"""
+
+    def __init__(self):
+        self.requisicoes = Counter()
+        self.cancelados = Counter()
+
+    async def __call__(self, requisicao):
+        modo = requisicao.url.path.split("/")[1]
+        self.requisicoes[modo] += 1
+        n = self.requisicoes[modo]
+        if m := re.fullmatch(r"erro(\d+)", modo):
+            return httpx.Response(int(m.group(1)), json={"error": {"message": f"falha simulada {m.group(1)}"}})
+        if (m := re.fullmatch(r"falha(\d+)", modo)) and n <= int(m.group(1)):
+            return httpx.Response(429, json={"error": {"message": "rate limit"}}, headers={"Retry-After": "0.01"})
+        if (m := re.fullmatch(r"conexao(\d+)", modo)) and n <= int(m.group(1)):
+            raise httpx.ConnectError("conexão recusada", request=requisicao)
+        m = re.fullmatch(r"lento([\d.]+)", modo)
+        atraso = float(m.group(1)) if m else 0.0
+        gemini = ":streamGenerateContent" in requisicao.url.path
+        return httpx.Response(200, headers={"Content-Type": "text/event-stream"},
+                              content=self._eventos(modo, atraso, gemini))
+
+    async def _eventos(self, modo, atraso, gemini):
+        completo = False
+        try:
+            await asyncio.sleep(atraso)
+            for pedaco in ([] if modo == "vazio" else PEDACOS):
+                if gemini:
+                    evento = {"candidates": [{"content": {"parts": [{"text": pedaco}], "role": "model"}}]}
+                else:
+                    evento = {"choices": [{"delta": {"content": pedaco}}]}
+                yield f"data: {json.dumps(evento)}\n\n".encode("utf-8")
+                await asyncio.sleep(0.01)
+            if not gemini:
+                yield b"data: [DONE]\n\n"
+            completo = True
+        finally:
+            if not completo:
+                self.cancelados[modo] += 1
+
+
+def provedor(api, modo, nome=None, classe=provedores_llm.ProvedorOpenAI):
+    return classe(nome or modo, "modelo-teste", f"http://api.teste/{modo}", "chave-teste",
+                  transporte=httpx.MockTransport(api))
+
+
+def rodar(provedores, **opcoes):
+    """(Transmissao, texto ou exceção, segundos)"""
+    inicio = time.perf_counter()
+    transmissao = provedores_llm.transmitir(provedores, "Instrução.", MENSAGENS, max_tokens=50, **opcoes)
+    try:
+        resultado = "".join(transmissao)
+    except Exception as e:
+        resultado = e
+    return transmissao, resultado, time.perf_counter() - inicio
+
+
+def esperar(condicao, limite=1.0):
+    """Espera condicao() ficar verdadeira (cancelamentos terminam no laço de eventos, em segundo plano)"""
+    fim = time.perf_counter() + limite
+    while not condicao() and time.perf_counter() < fim:
+        time.sleep(0.01)
+    return condicao()
+
+
+def cenario_ok(api):
+    prov = provedor(api, "ok")
+    t, texto, segundos = rodar([prov])
+    return [
+        ("texto completo", texto == "".join(PEDACOS)),
+        ("respondeu o provedor", t.provedor == "ok"),
+        ("sem falhas", not t.falhas),
+        ("TTFT e duração registrados", prov.estatisticas()["ttft"]["p50"] is not None and t.duracao is not None),
+    ], segundos
+
+
+def cenario_gemini(api):
+    t, texto, segundos = rodar([provedor(api, "ok", "gemini", provedores_llm.ProvedorGemini)])
+    return [("texto completo no formato do Gemini", texto == "".join(PEDACOS) and t.provedor == "gemini")], segundos
+
+
+def cenario_retry_429(api):
+    prov = provedor(api, "falha2")
+    t, texto, segundos = rodar([prov])
+    return [
+        ("texto depois de 2 respostas 429", texto == "".join(PEDACOS)),
+        ("3 requisições, 2 tentativas extras", api.requisicoes["falha2"] == 3 and prov.tentativas_extras == 2),
+        ("sem troca de provedor", t.provedor == "falha2" and not t.falhas),
+    ], segundos
+
+
+def cenario_retry_conexao(api):
+    prov = provedor(api, "conexao1")
+    provedores_llm.ESPERA_BASE, base = 0.01, provedores_llm.ESPERA_BASE
+    try:
+        t, texto, segundos = rodar([prov])
+    finally:
+        provedores_llm.ESPERA_BASE = base
+    return [
+        ("texto depois de 1 falha de conexão", texto == "".join(PEDACOS)),
+        ("1 tentativa extra", prov.tentativas_extras == 1),
+    ], segundos
+
+
+def cenario_failover_401(api):
+    t, texto, segundos = rodar([provedor(api, "erro401"), provedor(api, "ok")])
+    erros = [e for _, e in t.falhas]
+    return [
+        ("reserva respondeu", t.provedor == "ok" and texto == "".join(PEDACOS)),
+        ("401 registrado", len(erros) == 1 and isinstance(erros[0], provedores_llm.ErroAPI) and erros[0].status == 401),
+        ("401 sem novas tentativas", api.requisicoes["erro401"] == 1),
+    ], segundos
+
+
+def cenario_failover_503(api):
+    principal = provedor(api, "erro503")
+    principal.tentativas = 1
+    t, texto, segundos = rodar([principal, provedor(api, "ok")])
+    return [
+        ("reserva respondeu depois das novas tentativas", t.provedor == "ok" and texto == "".join(PEDACOS)),
+        ("2 requisições ao principal", api.requisicoes["erro503"] == 2),
+    ], segundos
+
+
+def cenario_failover_vazio(api):
+    t, texto, segundos = rodar([provedor(api, "vazio"), provedor(api, "ok")])
+    return [
+        ("reserva respondeu", t.provedor == "ok" and texto == "".join(PEDACOS)),
+        ("resposta vazia registrada", [nome for nome, _ in t.falhas] == ["vazio"]),
+    ], segundos
+
+
+def cenario_todos_falham(api):
+    t, erro, segundos = rodar([provedor(api, "erro401"), provedor(api, "erro402")])
+    return [
+        ("ErroProvedores com as duas falhas", isinstance(erro, provedores_llm.ErroProvedores) and len(erro.falhas) == 2),
+        ("dica do erro para o usuário", "API Key" in provedores_llm.descrever_erro(erro)),
+    ], segundos
+
+
+def cenario_prazo_ttft(api):
+    t, texto, segundos = rodar([provedor(api, "lento2"), provedor(api, "ok")], prazo_ttft=0.3)
+    erros = [e for _, e in t.falhas]
+    return [
+        ("reserva respondeu", t.provedor == "ok" and texto == "".join(PEDACOS)),
+        ("troca no prazo (< 1 s)", segundos < 1.0),
+        ("TimeoutError registrado", len(erros) == 1 and isinstance(erros[0], TimeoutError)),
+        ("pedido lento cancelado", esperar(lambda: api.cancelados["lento2"] == 1)),
+    ], segundos
+
+
+def cenario_prazo_ultimo(api):
+    # Sem reserva, o último provedor não tem prazo: a resposta lenta vale
+    t, texto, segundos = rodar([provedor(api, "lento0.5")], prazo_ttft=0.1)
+    return [("último provedor esperado além do prazo", t.provedor == "lento0.5" and texto == "".join(PEDACOS))], segundos
+
+
+def cenario_hedge_reserva(api):
+    t, texto, segundos = rodar([provedor(api, "lento1"), provedor(api, "ok")], atraso_hedge=0.2)
+    return [
+        ("reserva (pedido paralelo) respondeu", t.provedor == "ok" and texto == "".join(PEDACOS)),
+        ("sem esperar o principal (< 0.6 s)", segundos < 0.6),
+        ("principal cancelado", esperar(lambda: api.cancelados["lento1"] == 1)),
+    ], segundos
+
+
+def cenario_hedge_principal(api):
+    t, texto, segundos = rodar([provedor(api, "lento0.3"), provedor(api, "lento1")], atraso_hedge=0.1)
+    return [
+        ("principal respondeu", t.provedor == "lento0.3" and texto == "".join(PEDACOS)),
+        ("reserva acionada e cancelada", api.requisicoes["lento1"] == 1 and esperar(lambda: api.cancelados["lento1"] == 1)),
+    ], segundos
+
+
+def cenario_parar_cedo(api):
+    inicio = time.perf_counter()
+    t = provedores_llm.transmitir([provedor(api, "lento0.2")], "Instrução.", MENSAGENS)
+    iterador = iter(t)
+    next(iterador)
+    iterador.close()
+    return [("parar de iterar cancela o pedido", esperar(lambda: api.cancelados["lento0.2"] == 1))], time.perf_counter() - inicio
+
+
+CENARIOS = [
+    ("resposta direta", cenario_ok),
+    ("formato Gemini", cenario_gemini),
+    ("novas tentativas em 429", cenario_retry_429),
+    ("nova tentativa em falha de conexão", cenario_retry_conexao),
+    ("troca em 401", cenario_failover_401),
+    ("troca em 503 depois das tentativas", cenario_failover_503),
+    ("troca em resposta vazia", cenario_failover_vazio),
+    ("todos os provedores falham", cenario_todos_falham),
+    ("prazo do primeiro token", cenario_prazo_ttft),
+    ("prazo não vale para o último", cenario_prazo_ultimo),
+    ("hedge: reserva vence", cenario_hedge_reserva),
+    ("hedge: principal vence", cenario_hedge_principal),
+    ("parar de iterar", cenario_parar_cedo),
+]
+
+
+def main():
+    falhas = 0
+    for nome, cenario in CENARIOS:
+        verificacoes, segundos = cenario(APISimulada())
+        erradas = [descricao for descricao, ok in verificacoes if not ok]
+        falhas += bool(erradas)
+        print(f"{'ok' if not erradas else 'FALHOU':<7} {nome:<38} {segundos:>6.2f} s"
+              + (f"  ({'; '.join(erradas)})" if erradas else ""))
+    if falhas:
+        sys.exit(f"Erro: {falhas} de {len(CENARIOS)} cenários falharam.")
+    print(f"{len(CENARIOS)} cenários ok.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+# busca_hibrida.py
+
+"""
+    Busca esparsa (BM25) sobre os chunks do chatbot e fusão com a busca densa.
+
+    Termos exatos (símbolos de nutrientes, nomes de cultivares, siglas como NFT e
+    EC) se perdem nos embeddings; o BM25 os recupera. O índice invertido é montado
+    pelo treinar.py a partir do docstore e gravado em faiss_index/bm25/ como
+    arrays numpy (termos como hashes de 64 bits ordenados, listas de ocorrência
+    em formato CSR), abertos mapeados em memória pelo chatbot. Os resultados
+    das duas buscas são combinados por reciprocal rank fusion (RRF).
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import unicodedata
+from collections import Counter
+
+import numpy as np
+
+PASTA_BM25 = "bm25"
+ARQUIVOS = ("termos", "inicio", "docs", "tf", "comprimentos", "ids")
+
+# Parâmetros usuais do BM25 e constante do RRF
+K1 = 1.2
+B = 0.75
+K_RRF = 60
+# Candidatos de cada busca levados à fusão
+K_CANDIDATOS = 20
+DOCS_POR_BLOCO = 5000
+
+
+def remover_acentos(texto):
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii")
+
+
+STOPWORDS = {remover_acentos(p) for p in """
+    a o e os as um uma uns umas de da do das dos em na no nas nos ao aos à às
+    para por pela pelo pelas pelos com sem que se ou mas como mais menos muito
+    é são ser ter tem qual quais quando onde sua seu suas seus isso este esta
+    entre sobre também já não foi há ela ele elas eles lhe
+""".split()}
+
+
+def tokenizar(texto):
+    """Termos em minúsculas e sem acentos; letras isoladas (N, P, K) são mantidas"""
+    termos = re.findall(r"\w+", remover_acentos(texto.lower()))
+    return [t for t in termos if t not in STOPWORDS]
+
+
+def hash_termos(termos):
+    """Hash de 64 bits de cada termo (o vocabulário não é gravado em texto)"""
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest(), "little") for t in termos],
+        dtype=np.uint64
+    )
+
+
+def _bloco(termos, docs, tfs):
+    tf = np.minimum(np.array(tfs, dtype=np.int64), np.iinfo(np.uint16).max).astype(np.uint16)
+    return hash_termos(termos), np.array(docs, dtype=np.int32), tf
+
+
+def construir_bm25(chunks, pasta):
+    """
+    Monta o índice invertido a partir de (id, texto) dos chunks e grava em
+    pasta/bm25 (numa pasta temporária, trocada no final). Retorna o número de chunks.
+    """
+    blocos = []
+    comprimentos, ids = [], []
+    termos, docs, tfs = [], [], []
+    for chunk_id, texto in chunks:
+        contagem = Counter(tokenizar(texto))
+        posicao = len(ids)
+        ids.append(chunk_id)
+        comprimentos.append(sum(contagem.values()))
+        termos.extend(contagem)
+        docs.extend([posicao] * len(contagem))
+        tfs.extend(contagem.values())
+        # Listas de ocorrência convertidas em arrays a cada bloco de chunks
+        if len(ids) % DOCS_POR_BLOCO == 0:
+            blocos.append(_bloco(termos, docs, tfs))
+            termos, docs, tfs = [], [], []
+    blocos.append(_bloco(termos, docs, tfs))
+
+    hashes, docs, tf = (np.concatenate(partes) for partes in zip(*blocos))
+    ordem = np.lexsort((docs, hashes))
+    hashes, docs, tf = hashes[ordem], docs[ordem], tf[ordem]
+    vocabulario, inicio = np.unique(hashes, return_index=True)
+    arrays = {
+        "termos": vocabulario,
+        "inicio": np.append(inicio, len(hashes)).astype(np.int64),
+        "docs": docs,
+        "tf": tf,
+        "comprimentos": np.array(comprimentos, dtype=np.float32),
+        "ids": np.array(ids, dtype=np.int64),
+    }
+
+    destino = os.path.join(pasta, PASTA_BM25)
+    temporaria = destino + ".tmp"
+    shutil.rmtree(temporaria, ignore_errors=True)
+    os.makedirs(temporaria)
+    for nome, valores in arrays.items():
+        np.save(os.path.join(temporaria, f"{nome}.npy"), valores)
+    shutil.rmtree(destino, ignore_errors=True)
+    os.replace(temporaria, destino)
+    return len(ids)
+
+
+def existe_bm25(pasta):
+    return all(os.path.exists(os.path.join(pasta, PASTA_BM25, f"{nome}.npy")) for nome in ARQUIVOS)
+
+
+class IndiceBM25:
+    """Índice BM25 gravado por construir_bm25, aberto mapeado em memória"""
+
+    def __init__(self, pasta):
+        base = os.path.join(pasta, PASTA_BM25)
+        for nome in ARQUIVOS:
+            setattr(self, nome, np.load(os.path.join(base, f"{nome}.npy"), mmap_mode="r"))
+        self.n = len(self.ids)
+        self.media_comprimento = float(np.mean(self.comprimentos)) if self.n else 0.0
+
+    def buscar(self, texto, k=K_CANDIDATOS):
+        """Ids dos k chunks com maior pontuação BM25 para o texto (sem os de pontuação zero)"""
+        consulta = np.unique(hash_termos(tokenizar(texto)))
+        if not self.n or not len(consulta):
+            return []
+        linhas = np.searchsorted(self.termos, consulta)
+        dentro = linhas < len(self.termos)
+        linhas, consulta = linhas[dentro], consulta[dentro]
+        linhas = linhas[self.termos[linhas] == consulta]
+        if not len(linhas):
+            return []
+
+        partes_docs, partes_pesos = [], []
+        for linha in linhas:
+            ini, fim = self.inicio[linha], self.inicio[linha + 1]
+            docs = np.asarray(self.docs[ini:fim])
+            tf = np.asarray(self.tf[ini:fim], dtype=np.float32)
+            idf = np.log((self.n - len(docs) + 0.5) / (len(docs) + 0.5) + 1.0)
+            normalizacao = K1 * (1 - B + B * self.comprimentos[docs] / self.media_comprimento)
+            partes_docs.append(docs)
+            partes_pesos.append(idf * tf * (K1 + 1) / (tf + normalizacao))
+
+        docs = np.concatenate(partes_docs)
+        pontos = np.bincount(docs, weights=np.concatenate(partes_pesos), minlength=self.n)
+        candidatos = np.flatnonzero(pontos)
+        if len(candidatos) > k:
+            candidatos = candidatos[np.argpartition(-pontos[candidatos], k - 1)[:k]]
+        candidatos = candidatos[np.argsort(-pontos[candidatos], kind="stable")]
+        return [int(i) for i in self.ids[candidatos]]
+
+
+def fundir_rrf(listas, k, k_rrf=K_RRF):
+    """Reciprocal rank fusion: soma de 1 / (k_rrf + posição) de cada id em cada lista"""
+    pontos = {}
+    for lista in listas:
+        for posicao, chunk_id in enumerate(lista, start=1):
+            pontos[chunk_id] = pontos.get(chunk_id, 0.0) + 1.0 / (k_rrf + posicao)
+    return sorted(pontos, key=lambda i: -pontos[i])[:k]
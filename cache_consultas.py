@@ -0,0 +1,225 @@
+# cache_consultas.py
+
+"""
+    Cache de consultas do chatbot em dois níveis, compartilhado entre as sessões
+    do servidor Streamlit.
+
+    1. pergunta normalizada -> embedding (evita rodar o modelo de embeddings);
+    2. embedding -> ids dos k chunks mais próximos (evita a busca no FAISS e a
+       fusão com o BM25).
+
+    Os dois níveis têm uma parte em memória com remoção LRU. Só o primeiro tem
+    também uma parte em disco (tbl_cache_embeddings em hidroponia.db, separada
+    por modelo de embeddings), que sobrevive a reinícios do servidor: o modelo
+    leva dezenas de ms por pergunta, bem mais que uma leitura no SQLite. A busca
+    custa pouco mais que essa leitura e fica só em memória, válida para o índice
+    carregado neste processo.
+
+    O disco é acessado por uma única conexão, aberta com o cache. As gravações
+    não atrasam a consulta: vão para uma fila, gravada em lotes (um commit por
+    lote) por uma thread em segundo plano.
+"""
+
+import hashlib
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+DB_NAME = "./dados/hidroponia.db"
+
+TAMANHO_MEMORIA = 512
+TAMANHO_DISCO = 20000
+# A limpeza do disco (mais antigas primeiro) roda a cada tantas gravações
+LIMPEZA_A_CADA = 100
+
+SQL_CRIAR_TABELA = """
+    CREATE TABLE IF NOT EXISTS tbl_cache_embeddings (
+        cem_modelo TEXT NOT NULL,
+        cem_pergunta TEXT NOT NULL,
+        cem_vetor BLOB NOT NULL,
+        cem_criado_em REAL,
+        PRIMARY KEY (cem_modelo, cem_pergunta)
+    )
+"""
+
+
+def criar_tabelas(conn):
+    """Cria a tabela do cache de consultas, se ainda não existir"""
+    conn.execute(SQL_CRIAR_TABELA)
+    # Versões anteriores gravavam também as buscas em disco
+    conn.execute("DROP TABLE IF EXISTS tbl_cache_buscas")
+
+
+def normalizar_pergunta(pergunta):
+    """Chave do primeiro nível: sem diferença de maiúsculas, espaços e pontuação final"""
+    pergunta = re.sub(r"\s+", " ", pergunta.strip().lower())
+    return pergunta.rstrip(" ?!.;:")
+
+
+def chave_busca(vetor, k):
+    """Chave do segundo nível: hash dos bytes do embedding (float32) e k"""
+    return f"{hashlib.sha1(np.asarray(vetor, dtype=np.float32).tobytes()).hexdigest()}:{int(k)}"
+
+
+class NivelCache:
+    """Um nível do cache: LRU em memória, seguro entre threads, com contadores de acerto"""
+
+    def __init__(self, tamanho_maximo=TAMANHO_MEMORIA):
+        self.tamanho_maximo = tamanho_maximo
+        self._itens = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos_memoria = 0
+        self.acertos_disco = 0
+        self.falhas = 0
+
+    def __len__(self):
+        return len(self._itens)
+
+    def obter(self, chave):
+        with self._trava:
+            valor = self._itens.get(chave)
+            if valor is not None:
+                self._itens.move_to_end(chave)
+                self.acertos_memoria += 1
+            return valor
+
+    def contar(self, disco):
+        """Registra um acerto no disco (disco=True) ou uma falha"""
+        with self._trava:
+            if disco:
+                self.acertos_disco += 1
+            else:
+                self.falhas += 1
+
+    def guardar(self, chave, valor):
+        with self._trava:
+            self._itens[chave] = valor
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_maximo:
+                self._itens.popitem(last=False)
+
+    def estatisticas(self):
+        total = self.acertos_memoria + self.acertos_disco + self.falhas
+        return {
+            "entradas": len(self._itens),
+            "acertos_memoria": self.acertos_memoria,
+            "acertos_disco": self.acertos_disco,
+            "falhas": self.falhas,
+            "taxa_acerto": (self.acertos_memoria + self.acertos_disco) / total if total else 0.0,
+        }
+
+
+class CacheConsultas:
+    """
+    Cache de dois níveis do chatbot. modelo identifica o modelo de embeddings.
+    Falhas de acesso ao disco não interrompem a consulta: o cache segue só em
+    memória.
+    """
+
+    def __init__(self, modelo, db=DB_NAME, tamanho_memoria=TAMANHO_MEMORIA, tamanho_disco=TAMANHO_DISCO):
+        self.modelo = modelo
+        self.db = db
+        self.tamanho_disco = tamanho_disco
+        self.embeddings = NivelCache(tamanho_memoria)
+        self.buscas = NivelCache(tamanho_memoria)
+        self._gravacoes = 0
+        self._fila = queue.Queue()
+        # A conexão é usada pela thread da consulta (leituras) e pela de gravação
+        self._trava_conn = threading.Lock()
+        self._conn = self._abrir()
+        if self._conn is not None:
+            threading.Thread(target=self._gravar_em_lotes, name="cache-consultas", daemon=True).start()
+
+    def _abrir(self):
+        try:
+            conn = sqlite3.connect(self.db, timeout=1.0, check_same_thread=False)
+            with conn:
+                criar_tabelas(conn)
+            return conn
+        except sqlite3.Error:
+            return None
+
+    def _limpar(self):
+        """Mantém no disco só as tamanho_disco entradas mais recentes"""
+        self._conn.execute("""
+            DELETE FROM tbl_cache_embeddings WHERE rowid IN (
+                SELECT rowid FROM tbl_cache_embeddings ORDER BY cem_criado_em DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.tamanho_disco,))
+
+    def _gravar_em_lotes(self):
+        """Thread de gravação: espera uma entrada na fila e grava, num só commit, todas as que estiverem lá"""
+        while True:
+            lote = [self._fila.get()]
+            while True:
+                try:
+                    lote.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            antes = self._gravacoes
+            self._gravacoes += len(lote)
+            try:
+                with self._trava_conn, self._conn:
+                    self._conn.executemany("INSERT OR REPLACE INTO tbl_cache_embeddings VALUES (?, ?, ?, ?)", lote)
+                    if antes == 0 or antes // LIMPEZA_A_CADA != self._gravacoes // LIMPEZA_A_CADA:
+                        self._limpar()
+            except sqlite3.Error:
+                # Gravações perdidas só custam um novo cálculo do embedding
+                pass
+            for _ in lote:
+                self._fila.task_done()
+
+    def esperar_gravacoes(self):
+        """Bloqueia até as gravações pendentes chegarem ao disco (ou falharem)"""
+        if self._conn is not None:
+            self._fila.join()
+
+    def _ler(self, sql, parametros):
+        if self._conn is None:
+            return None
+        try:
+            with self._trava_conn:
+                linha = self._conn.execute(sql, parametros).fetchone()
+        except sqlite3.Error:
+            return None
+        return linha[0] if linha else None
+
+    def embedding(self, pergunta, calcular):
+        """Embedding da pergunta; calcular(pergunta) só é chamado nas falhas da memória e do disco"""
+        chave = normalizar_pergunta(pergunta)
+        vetor = self.embeddings.obter(chave)
+        if vetor is not None:
+            return vetor
+        bruto = self._ler(
+            "SELECT cem_vetor FROM tbl_cache_embeddings WHERE cem_modelo = ? AND cem_pergunta = ?",
+            (self.modelo, chave)
+        )
+        if bruto is not None:
+            vetor = np.frombuffer(bruto, dtype=np.float32).copy()
+            self.embeddings.contar(disco=True)
+        else:
+            vetor = np.asarray(calcular(pergunta), dtype=np.float32)
+            self.embeddings.contar(disco=False)
+            if self._conn is not None:
+                self._fila.put((self.modelo, chave, vetor.tobytes(), time.time()))
+        self.embeddings.guardar(chave, vetor)
+        return vetor
+
+    def busca(self, vetor, k, buscar):
+        """Ids dos k chunks mais próximos; buscar(vetor, k) só é chamado nas falhas da memória"""
+        chave = chave_busca(vetor, k)
+        ids = self.buscas.obter(chave)
+        if ids is not None:
+            return ids
+        ids = tuple(int(i) for i in buscar(vetor, k))
+        self.buscas.contar(disco=False)
+        self.buscas.guardar(chave, ids)
+        return ids
+
+    def estatisticas(self):
+        return {"embeddings": self.embeddings.estatisticas(), "buscas": self.buscas.estatisticas()}
@@ -0,0 +1,198 @@
+# cache_curvas.py
+
+"""
+    Cache das tabelas de crescimento esperado (curva teórica) compartilhado entre
+    as sessões do servidor Streamlit.
+
+    A tabela de um plantio depende de (p_inicial, p_final, dias) e do deslocamento
+    dado pela data do plantio. A parte cara (parâmetros, pesos e fases) fica no
+    cache com remoção LRU; a data é aplicada na leitura como uma soma vetorizada
+    de dias, de modo que plantios em datas diferentes reaproveitam a mesma entrada.
+    O cache pode ser pré-aquecido com as curvas de todos os cultivares.
+
+    Quando o cultivar tem uma família de curva escolhida por selecao_modelos, a
+    tabela usa essa família (parte da chave do cache), reescalada para atingir o
+    peso de colheita informado no fim do período.
+"""
+
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import ajuste_crescimento
+import modelo_crescimento
+import selecao_modelos
+
+DB_NAME = "./dados/hidroponia.db"
+
+P_INICIAL_PADRAO = 5.0
+TAMANHO_MAXIMO = 256
+
+COLUNAS = ["Dia", "Data", "Fase", "Peso previsto (g)", "Peso real (g)", "_fase_id"]
+
+
+def _chave(p_inicial, p_final, dias, modelo=None):
+    if modelo is not None:
+        nome, *parametros = modelo
+        modelo = (nome, *(None if p is None else round(float(p), 6) for p in parametros))
+    return (round(float(p_inicial), 4), round(float(p_final), 4), int(dias), modelo)
+
+
+def curva_esperada(p_inicial, p_final, dias, t, modelo=None):
+    """
+    Avalia a curva esperada em tempos t quaisquer (inclusive fracionários).
+    Sem modelo, é a logística teórica de modelo_crescimento; com modelo =
+    (nome, K, r, t0, nu), a família escolhida para o cultivar, escalada para
+    que o peso no dia `dias` seja p_final. Retorna (pesos, K).
+    """
+    if modelo is None:
+        K, r, t0 = modelo_crescimento.calcular_parametros(p_inicial, p_final, dias)
+        return modelo_crescimento.avaliar_logistica(t, K, r, t0), K
+    nome, K, r, t0, nu = modelo
+    no_fim = ajuste_crescimento.avaliar_modelo(nome, dias, K, r, t0, nu)
+    escala = p_final / no_fim if no_fim > 0 else 1.0
+    return ajuste_crescimento.avaliar_modelo(nome, t, K, r, t0, nu) * escala, K * escala
+
+
+def _curva_modelo(p_final, dias, modelo):
+    """Curva diária da família escolhida para o cultivar"""
+    dias_arr = np.arange(1, dias + 1)
+    pesos, K = curva_esperada(None, p_final, dias, dias_arr, modelo)
+    return dias_arr, pesos, modelo_crescimento.classificar_fases(pesos, K)
+
+
+def _montar_tabela(dias_arr, pesos, fase_ids):
+    """Tabela sem datas (a coluna Data é aplicada na leitura)"""
+    fase_ids = np.asarray(fase_ids, dtype=np.int64)
+    return pd.DataFrame({
+        "Dia": np.asarray(dias_arr, dtype=np.int64),
+        "Fase": pd.Series(fase_ids).map(modelo_crescimento.FASES).astype("object"),
+        "Peso previsto (g)": np.round(np.asarray(pesos, dtype=np.float64), 2),
+        "Peso real (g)": np.full(len(fase_ids), np.nan),
+        "_fase_id": fase_ids,
+    })
+
+
+class CacheCurvas:
+    """Cache LRU, seguro entre threads, das tabelas de curvas teóricas"""
+
+    def __init__(self, tamanho_maximo=TAMANHO_MAXIMO):
+        self.tamanho_maximo = tamanho_maximo
+        self._tabelas = OrderedDict()
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def __len__(self):
+        return len(self._tabelas)
+
+    def _guardar(self, chave, tabela):
+        self._tabelas[chave] = tabela
+        self._tabelas.move_to_end(chave)
+        while len(self._tabelas) > self.tamanho_maximo:
+            self._tabelas.popitem(last=False)
+
+    def tabela(self, p_inicial, p_final, dias, modelo=None):
+        """Tabela sem datas da curva; calcula e guarda se ainda não estiver no cache"""
+        chave = _chave(p_inicial, p_final, dias, modelo)
+        with self._trava:
+            tabela = self._tabelas.get(chave)
+            if tabela is not None:
+                self._tabelas.move_to_end(chave)
+                self.acertos += 1
+                return tabela
+            self.falhas += 1
+
+        if chave[3] is None:
+            dias_arr, pesos, fase_ids, _, _ = modelo_crescimento.gerar_curva(*chave[:3])
+        else:
+            dias_arr, pesos, fase_ids = _curva_modelo(*chave[1:])
+        tabela = _montar_tabela(dias_arr, pesos, fase_ids)
+        with self._trava:
+            self._guardar(chave, tabela)
+        return tabela
+
+    def registros(self, p_inicial, p_final, dias, data_plantio, modelo=None):
+        """DataFrame pronto para o editor (cópia própria, com as datas do plantio)"""
+        df = self.tabela(p_inicial, p_final, dias, modelo).copy()
+        inicio = np.datetime64(pd.Timestamp(data_plantio).date(), "D")
+        datas = inicio + (df["Dia"].to_numpy() - 1).astype("timedelta64[D]")
+        df.insert(1, "Data", datas.astype("datetime64[ns]"))
+        return df[COLUNAS]
+
+    def pre_aquecer(self, parametros):
+        """
+        Calcula as curvas de vários (p_inicial, p_final, dias[, modelo]) ainda
+        ausentes do cache: as logísticas teóricas em lote e as de família
+        escolhida uma a uma. Retorna quantas curvas foram adicionadas.
+        """
+        with self._trava:
+            faltantes = list(dict.fromkeys(
+                _chave(*p) for p in parametros if _chave(*p) not in self._tabelas
+            ))
+        faltantes = [c for c in faltantes if c[2] > 0]
+        if not faltantes:
+            return 0
+
+        logisticas = [c for c in faltantes if c[3] is None]
+        tabelas = {}
+        if logisticas:
+            p_inicial, p_final, dias, _ = (np.array(v) for v in zip(*logisticas))
+            pesos, fases, _, _, _ = modelo_crescimento.gerar_curvas_lote(p_inicial, p_final, dias)
+            for i, chave in enumerate(logisticas):
+                n = chave[2]
+                tabelas[chave] = _montar_tabela(np.arange(1, n + 1), pesos[i, :n], fases[i, :n])
+        for chave in faltantes:
+            if chave[3] is not None:
+                tabelas[chave] = _montar_tabela(*_curva_modelo(*chave[1:]))
+        with self._trava:
+            for chave, tabela in tabelas.items():
+                self._guardar(chave, tabela)
+        return len(tabelas)
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            "entradas": len(self._tabelas),
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+        }
+
+
+# Instância única do processo: compartilhada por todas as sessões
+cache = CacheCurvas()
+
+
+def obter_registros(p_final, dias, data_plantio, p_inicial=P_INICIAL_PADRAO, modelo=None):
+    """
+    Registros de crescimento esperado de um plantio, a partir do cache.
+    modelo = (nome, K, r, t0, nu) usa a família escolhida para o cultivar.
+    """
+    return cache.registros(p_inicial, p_final, dias, data_plantio, modelo)
+
+
+def pre_aquecer_cultivares(p_inicial=P_INICIAL_PADRAO):
+    """
+    Pré-aquece o cache com a curva de cada cultivar de tbl_cultivares: a família
+    escolhida por selecao_modelos (mesma chave que obter_registros recebe da
+    página) ou, se o cultivar ainda não foi avaliado, a logística teórica
+    """
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        selecao_modelos.criar_tabela(conn)
+        cultivares = conn.execute("""
+            SELECT c.clt_peso_colheita, c.clt_periodo, m.cmo_modelo, m.cmo_K, m.cmo_r, m.cmo_t0, m.cmo_nu
+            FROM tbl_cultivares c
+            LEFT JOIN tbl_cultivares_modelos m ON m.cmo_cultivar_id = c.clt_id
+            WHERE c.clt_periodo > 0 AND c.clt_peso_colheita > 0
+        """).fetchall()
+    finally:
+        conn.close()
+    return cache.pre_aquecer(
+        (p_inicial, peso, periodo, tuple(modelo) if modelo[0] is not None else None)
+        for peso, periodo, *modelo in cultivares
+    )
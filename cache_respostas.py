@@ -0,0 +1,247 @@
+# cache_respostas.py
+
+"""
+    Cache semântico das respostas pagas dos chatbots com LLM remoto
+    (chatbot_ollama.py e chatbot_deepseek.py).
+
+    A pergunta vira um embedding com o mesmo modelo do chatbot.py (o da carga
+    em recursos_chatbot, sem carregar outra cópia) e, se uma pergunta já
+    respondida estiver a uma similaridade de cosseno >= LIMIAR_SIMILARIDADE,
+    para a mesma instrução do sistema e o mesmo provedor e modelo, a resposta
+    guardada é mostrada sem chamar a API. Só entram perguntas que abrem a
+    conversa (sem mensagens anteriores do usuário nem resumo): as seguintes
+    dependem do histórico.
+
+    As entradas vencem depois de VALIDADE segundos, ficam em memória e na
+    tabela tbl_cache_respostas de hidroponia.db (sobrevivem a reinícios do
+    servidor) e, acima de TAMANHO_MAXIMO, saem as usadas há mais tempo. Cada
+    entrada guarda o custo estimado e a duração da chamada original, para as
+    estatísticas de economia.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import contexto_chat
+import provedores_llm
+import recursos_chatbot
+
+DB_NAME = "./dados/hidroponia.db"
+
+LIMIAR_SIMILARIDADE = 0.92
+VALIDADE = 7 * 24 * 3600
+TAMANHO_MAXIMO = 2000
+
+SQL_CRIAR_TABELA = """
+    CREATE TABLE IF NOT EXISTS tbl_cache_respostas (
+        crs_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        crs_escopo TEXT NOT NULL,
+        crs_pergunta TEXT NOT NULL,
+        crs_vetor BLOB NOT NULL,
+        crs_resposta TEXT NOT NULL,
+        crs_custo REAL,
+        crs_duracao REAL,
+        crs_criado_em REAL,
+        crs_usado_em REAL
+    )
+"""
+
+
+def criar_tabelas(conn):
+    """Cria a tabela do cache de respostas, se ainda não existir"""
+    conn.execute(SQL_CRIAR_TABELA)
+
+
+def escopo(instrucao, provedor):
+    """Identifica a instrução do sistema e o provedor/modelo: respostas só valem dentro do mesmo escopo"""
+    return hashlib.sha1(f"{provedor.nome}|{provedor.modelo}|{instrucao}".encode("utf-8")).hexdigest()
+
+
+def normalizar(vetor):
+    vetor = np.asarray(vetor, dtype=np.float32)
+    return vetor / (np.linalg.norm(vetor) or 1.0)
+
+
+def embeddings_chatbot():
+    """Modelo de embeddings do chatbot.py, se a carga em segundo plano já terminou (senão None)"""
+    carga = recursos_chatbot.iniciar()
+    return carga.recursos.vector_store.embeddings if carga.pronto else None
+
+
+class Consulta:
+    """
+    Resultado de CacheRespostas.consultar: resposta (e similaridade) em caso
+    de acerto; senão, guardar() grava a resposta que vier da API, se ela veio
+    do provedor consultado (não de um reserva).
+    """
+
+    def __init__(self, cache, provedor=None, escopo=None, pergunta=None, vetor=None, entrada=None, similaridade=None):
+        self.cache = cache
+        self.provedor = provedor
+        self.escopo = escopo
+        self.pergunta = pergunta
+        self.vetor = vetor
+        self.resposta = entrada["resposta"] if entrada else None
+        self.similaridade = similaridade
+
+    def guardar(self, resposta, transmissao, tokens_prompt):
+        """Grava a resposta da Transmissao, com o custo estimado pelos tokens do prompt e da resposta"""
+        if self.vetor is None or self.resposta is not None or transmissao.provedor != self.provedor.nome or not resposta.strip():
+            return
+        custo = provedores_llm.custo(self.provedor, tokens_prompt, contexto_chat.contar_tokens(resposta))
+        self.cache.guardar(self.escopo, self.pergunta, self.vetor, resposta, custo, transmissao.duracao)
+
+
+class CacheRespostas:
+    """
+    Cache semântico das respostas, compartilhado entre as sessões do processo.
+    Falhas de acesso ao disco não interrompem a consulta: o cache segue só em
+    memória.
+    """
+
+    def __init__(self, db=DB_NAME, limiar=LIMIAR_SIMILARIDADE, validade=VALIDADE, tamanho_maximo=TAMANHO_MAXIMO):
+        self.db = db
+        self.limiar = limiar
+        self.validade = validade
+        self.tamanho_maximo = tamanho_maximo
+        self._entradas = OrderedDict()  # crs_id -> entrada, da usada há mais tempo para a mais recente
+        self._trava = threading.Lock()
+        self._proximo_id = -1  # ids negativos: entradas que não chegaram ao disco
+        self.acertos = 0
+        self.falhas = 0
+        self.custo_economizado = 0.0
+        self.tempo_economizado = 0.0
+        for linha in self._executar(self._carregar) or []:
+            id_, esc, pergunta, vetor, resposta, custo, duracao, criado_em = linha
+            self._entradas[id_] = {
+                "escopo": esc, "pergunta": pergunta, "vetor": np.frombuffer(vetor, dtype=np.float32).copy(),
+                "resposta": resposta, "custo": custo or 0.0, "duracao": duracao or 0.0, "criado_em": criado_em,
+            }
+
+    def _executar(self, funcao, *args):
+        try:
+            conn = sqlite3.connect(self.db, timeout=1.0)
+            try:
+                resultado = funcao(conn, *args)
+                conn.commit()
+                return resultado
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            return None
+
+    def _carregar(self, conn):
+        """Entradas ainda válidas do disco (as tamanho_maximo usadas mais recentemente), apagando as vencidas"""
+        criar_tabelas(conn)
+        conn.execute("DELETE FROM tbl_cache_respostas WHERE crs_criado_em < ?", (time.time() - self.validade,))
+        linhas = conn.execute("""
+            SELECT crs_id, crs_escopo, crs_pergunta, crs_vetor, crs_resposta, crs_custo, crs_duracao, crs_criado_em
+            FROM tbl_cache_respostas ORDER BY crs_usado_em DESC LIMIT ?
+        """, (self.tamanho_maximo,)).fetchall()
+        return list(reversed(linhas))
+
+    def consultar(self, instrucao, provedor, mensagens, resumo=""):
+        """
+        Consulta pela última mensagem de mensagens (a pergunta), no escopo da
+        instrução e do provedor principal. Sem o modelo de embeddings pronto ou
+        com histórico na conversa, retorna uma Consulta vazia (nada é lido nem
+        gravado).
+        """
+        embeddings = embeddings_chatbot()
+        if embeddings is None or resumo or any(m["role"] == "user" for m in mensagens[:-1]):
+            return Consulta(self)
+        pergunta = mensagens[-1]["content"]
+        vetor = normalizar(embeddings.embed_query(pergunta))
+        esc = escopo(instrucao, provedor)
+        entrada, similaridade = self.buscar(esc, vetor)
+        return Consulta(self, provedor, esc, pergunta, vetor, entrada, similaridade)
+
+    def buscar(self, escopo, vetor):
+        """(entrada, similaridade) da pergunta mais parecida do escopo, se passar do limiar; senão (None, None)"""
+        limite = time.time() - self.validade
+        with self._trava:
+            candidatos = [(id_, e) for id_, e in self._entradas.items() if e["escopo"] == escopo and e["criado_em"] >= limite]
+            if candidatos:
+                similaridades = np.stack([e["vetor"] for _, e in candidatos]) @ vetor
+                melhor = int(np.argmax(similaridades))
+                if similaridades[melhor] >= self.limiar:
+                    id_, entrada = candidatos[melhor]
+                    self._entradas.move_to_end(id_)
+                    self.acertos += 1
+                    self.custo_economizado += entrada["custo"]
+                    self.tempo_economizado += entrada["duracao"]
+                    acerto = (id_, entrada, float(similaridades[melhor]))
+                else:
+                    acerto = None
+            else:
+                acerto = None
+            if acerto is None:
+                self.falhas += 1
+        if acerto is None:
+            return None, None
+        id_, entrada, similaridade = acerto
+        if id_ >= 0:
+            self._executar(lambda conn: conn.execute(
+                "UPDATE tbl_cache_respostas SET crs_usado_em = ? WHERE crs_id = ?", (time.time(), id_)
+            ))
+        return entrada, similaridade
+
+    def guardar(self, escopo, pergunta, vetor, resposta, custo=0.0, duracao=0.0):
+        agora = time.time()
+        vetor = normalizar(vetor)
+        id_ = self._executar(lambda conn: conn.execute(
+            "INSERT INTO tbl_cache_respostas (crs_escopo, crs_pergunta, crs_vetor, crs_resposta, crs_custo, "
+            "crs_duracao, crs_criado_em, crs_usado_em) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (escopo, pergunta, vetor.tobytes(), resposta, custo, duracao, agora, agora)
+        ).lastrowid)
+        with self._trava:
+            if id_ is None:
+                id_ = self._proximo_id
+                self._proximo_id -= 1
+            self._entradas[id_] = {
+                "escopo": escopo, "pergunta": pergunta, "vetor": vetor, "resposta": resposta,
+                "custo": custo, "duracao": duracao, "criado_em": agora,
+            }
+            removidas = []
+            while len(self._entradas) > self.tamanho_maximo:
+                removidas.append(self._entradas.popitem(last=False)[0])
+        removidas = [(i,) for i in removidas if i >= 0]
+        if removidas:
+            self._executar(lambda conn: conn.executemany("DELETE FROM tbl_cache_respostas WHERE crs_id = ?", removidas))
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            "entradas": len(self._entradas),
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "custo_economizado": self.custo_economizado,
+            "tempo_economizado": self.tempo_economizado,
+        }
+
+    def descrever(self):
+        est = self.estatisticas()
+        return (
+            f"{est['taxa_acerto']:.0%} de acertos ({est['acertos']} acertos, {est['falhas']} falhas, "
+            f"{est['entradas']} respostas guardadas) · US$ {est['custo_economizado']:.4f} e "
+            f"{est['tempo_economizado']:.1f} s economizados"
+        )
+
+
+_cache = None
+_trava_cache = threading.Lock()
+
+
+def obter_cache():
+    """Cache de respostas do processo (aberto na primeira chamada)"""
+    global _cache
+    with _trava_cache:
+        if _cache is None:
+            _cache = CacheRespostas()
+        return _cache
@@ -1,93 +1,228 @@
 import streamlit as st
-import os
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from transformers import AutoModelForQuestionAnswering, AutoTokenizer, pipeline
 # import torch
 import re
+import time
+import recursos_chatbot
 
-# --- Configurações ---
-SAFE_SOURCE = True
-# MODELO DE EMBEDDING: DEVE SER O MESMO QUE EM 'treinar.py'!
-EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
-# Modelo de QA para português (ainda carregado para obter a confiança, mas não para extração de resposta).
-QA_MODEL = "pierreguillou/bert-base-cased-squad-v1.1-portuguese"
+# Carga dos modelos e índices em segundo plano (já iniciada pelo app.py); a página não espera por ela
+carga = recursos_chatbot.iniciar()
 
 # --- Funções Auxiliares ---
-def preprocess_question(question):
+def montar_resposta(prompt, docs, result):
+    """Texto final da resposta a partir do resultado do QA e a confiança (menor quando a resposta vem do documento mais relevante)"""
+    extracted_answer = result['answer'].strip()
+    confianca = result['score']
+
+    # --- Prioritize the QA model's extracted answer if it's confident enough ---
+    # If the confidence is low, consider fallback strategies or combining information.
+    if extracted_answer and confianca > 0.3: # Threshold for considering the QA answer "good enough"
+        resposta = extracted_answer
+        # Further refine extracted_answer:
+        # Remove leading prompt if it was extracted by mistake
+        if resposta.lower().startswith(prompt.lower()):
+            resposta = re.sub(r"^" + re.escape(prompt) + r"\s*", "", resposta, count=1, flags=re.IGNORECASE).strip()
+        # Remove "Tópico:" or similar labels if the QA model extracted them
+        resposta = re.sub(r"^(Tópico: .*?\n\n|\w+:\s*)", "", resposta, count=1, flags=re.IGNORECASE).strip()
+
+        # If after cleaning, the extracted answer is too short or doesn't seem complete,
+        # you might consider appending more from the most relevant source.
+        # This is a heuristic and needs careful tuning.
+        # Example: If extracted_answer is < 50 chars and source 1 is > 100 chars,
+        # it might be useful to append the beginning of source 1.
+        # For now, let's just make sure the `resposta` is the `extracted_answer`.
+
+    elif docs: # Fallback if QA model isn't confident or no direct answer was extracted
+        # Use the most relevant part of the first document as a fallback.
+        # You might want to summarize it or just take a section.
+        # For simplicity, taking the content of the first doc.
+        # You could also try to generate a summary using another model here.
+
+        # If `extracted_answer` is empty or confidence is too low,
+        # provide the beginning of the most relevant chunk.
+        resposta = docs[0].page_content.strip()
+        # Clean the fallback response too if it contains "Tópico:" etc.
+        resposta = re.sub(r"^(Tópico: .*?\n\n|\w+:\s*)", "", resposta, count=1, flags=re.IGNORECASE).strip()
+
+        if not resposta: # If even the first doc is empty after stripping
+            resposta = "Não consegui encontrar uma resposta direta. As fontes podem ajudar."
+        confianca = 0.1 # Lower confidence for fallback
+
+    else: # No documents found, already handled above, but keeping for clarity
+        resposta = "Não consegui encontrar documentos relevantes no PDF para esta pergunta. Tente reformular."
+        confianca = 0.0
+
+    # Opcional: Limitar o tamanho da resposta final como um "hard cap"
+    MAX_FINAL_RESPONSE_LENGTH = 1200
+    if len(resposta) > MAX_FINAL_RESPONSE_LENGTH:
+        resposta = resposta[:MAX_FINAL_RESPONSE_LENGTH] + "..."
+
+    # --- Mensagem final com base na confiança ---
+    if confianca < 0.1:
+        resposta_display = f"{resposta}\n\n*Minha confiança nesta resposta é muito baixa ({confianca*100:.1f}%). Considere reformular a pergunta ou verificar as fontes completas.*"
+    elif confianca < 0.3:
+        resposta_display = f"{resposta}\n\n*(Confiança na resposta: {confianca*100:.1f}%)*"
+    else:
+        resposta_display = resposta
+
+    return resposta_display, confianca
+
+ETAPAS = {"busca": "busca", "qa": "QA", "total": "total"}
+
+def formatar_tempos(tempos):
+    return "⏱️ " + " · ".join(f"{ETAPAS[etapa]} {segundos:.2f} s" for etapa, segundos in tempos.items())
+
+def mostrar_fontes(fontes):
+    with st.expander("🔍 Fontes usadas na resposta"):
+        for i, fonte in enumerate(fontes):
+            st.caption(f"**Fonte {i+1}**:")
+            st.code(fonte, language="text")
+
+ERRO_RESPOSTA = "Desculpe, tive um problema ao processar sua pergunta. Tente novamente."
+
+def mostrar_erro(e):
+    st.error(f"**Erro DETALHADO durante a busca ou Geração de Resposta:**\n`{str(e)}`")
+
+def iniciar_resposta(prompt, recursos):
     """
-    Prepara a pergunta do usuário para a busca e para o modelo de QA.
-    A regex DEVE SER CONSISTENTE com a usada em treinar.py.
+    Faz a busca e envia o QA para a thread de QA, sem esperar por ele: a resposta
+    fica em st.session_state.resposta_pendente e é concluída por
+    mostrar_resposta_pendente. Sem QA a fazer (nenhum documento ou erro na busca),
+    retorna direto a mensagem do histórico; senão, None.
     """
-    question = question.strip()
-    question = re.sub(r'\s+', ' ', question)
-    # Mantém letras (incluindo acentuadas), números, espaços, e pontuação essencial
-    question = re.sub(r'[^\w\s.,!?;:\-–()\[\]{}<>/=+\*#@&%$\^|~`áéíóúâêîôûàèìòùãõäëïöüçÁÉÍÓÚÂÊÎÔÛÀÈÌÒÙÃÕÄËÏÖÜÇ]', '', question)
-    return question
-
-@st.cache_resource # Armazena os recursos em cache para não recarregar a cada interação
-def carregar_recursos():
-    """Carrega o modelo de embeddings, o banco de vetores FAISS e o pipeline de QA."""
+    inicio = time.perf_counter()
+    tempos = {}
+    espaco = st.empty()
+    with espaco.container():
+        with st.chat_message("assistant"):
+            espaco_resposta = st.empty()
+            espaco_resposta.markdown("🔎 Buscando nos documentos...")
+            try:
+                # Pré-processar a pergunta do usuário (o mesmo usado pelo avaliar_chatbot.py)
+                clean_prompt = recursos_chatbot.preprocess_question(prompt)
+
+                # Buscar documentos relevantes no banco de vetores FAISS (com cache)
+                k_docs = 5 # Buscar os 5 chunks mais similares
+                docs = recursos.buscar_documentos(clean_prompt, k_docs)
+                tempos["busca"] = time.perf_counter() - inicio
+
+                # --- Cada documento recuperado é um contexto, na ordem de relevância ---
+                contextos = [doc.page_content for doc in docs if doc.page_content.strip()]
+
+                if not docs:
+                    resposta = "Não consegui encontrar documentos relevantes no PDF para esta pergunta. Tente reformular."
+                elif not contextos: # Fallback caso o contexto esteja vazio (improvável com docs)
+                    resposta = "Não consegui extrair um contexto útil dos documentos encontrados. Tente reformular a pergunta."
+                else:
+                    # --- Executar o QA (lotes de janelas, com saída antecipada) para obter a *resposta extraída* e a confiança ---
+                    pendente = {
+                        "prompt": prompt, "docs": docs, "fontes": [doc.page_content for doc in docs],
+                        "tempos": tempos, "inicio": inicio, "inicio_qa": time.perf_counter(),
+                    }
+                    pendente["futuro"] = recursos.extrair_resposta(prompt, contextos)
+                    # Hora em que o QA terminou (a página só percebe na próxima verificação)
+                    pendente["futuro"].add_done_callback(lambda _: pendente.setdefault("fim_qa", time.perf_counter()))
+                    st.session_state.resposta_pendente = pendente
+                    espaco.empty()
+                    return None
+
+            except Exception as e:
+                resposta = ERRO_RESPOSTA
+                mostrar_erro(e)
+
+            tempos["total"] = time.perf_counter() - inicio
+            espaco_resposta.markdown(resposta)
+            st.caption(formatar_tempos(tempos))
+
+    return {"role": "assistant", "content": resposta, "fontes": [], "tempos": tempos}
+
+@st.fragment(run_every=0.3)
+def mostrar_resposta_pendente():
+    """
+    Fontes da pergunta em andamento e, quando o QA termina, a resposta extraída.
+    Só este trecho roda de novo enquanto o QA não termina, e a página segue
+    respondendo; ao concluir, a mensagem vai para o histórico e a página roda
+    de novo (para a próxima pergunta da fila).
+    """
+    pendente = st.session_state.resposta_pendente
+    futuro = pendente["futuro"]
+    with st.chat_message("assistant"):
+        espaco_resposta = st.empty()
+        mostrar_fontes(pendente["fontes"])
+        if not futuro.done():
+            espaco_resposta.markdown("✍️ Extraindo a resposta das fontes...")
+            return
+
+    tempos = pendente["tempos"]
+    fim_qa = pendente.get("fim_qa", time.perf_counter())
     try:
-        # --- 1. Verificação do diretório FAISS ---
-        faiss_index_path = "faiss_index"
-        if not os.path.exists(faiss_index_path) or not os.path.isdir(faiss_index_path):
-            st.error(f"""
-                **Erro: O diretório '{faiss_index_path}' não foi encontrado.**
-                Por favor, execute `python treinar.py` primeiro para criar o índice FAISS.
-                Certifique-se de que ele esteja no mesmo diretório deste script (`{os.getcwd()}`).
-                """)
-            st.stop()
-        # Verifique se os arquivos essenciais estão dentro da pasta
-        if not os.path.exists(os.path.join(faiss_index_path, "index.faiss")) or \
-           not os.path.exists(os.path.join(faiss_index_path, "index.pkl")):
-            st.error(f"""
-                **Erro: Arquivos do índice FAISS (index.faiss ou index.pkl) ausentes ou corrompidos em '{faiss_index_path}'.**
-                Por favor, re-execute `python treinar.py` para garantir que o índice seja criado corretamente.
-                """)
-            st.stop()
-
-        # --- 2. Carregamento do Modelo de Embeddings ---
-        embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-
-        # --- 3. Carregamento do Banco de Vetores FAISS ---
-        vector_store = FAISS.load_local(
-            faiss_index_path,
-            embeddings,
-            allow_dangerous_deserialization=SAFE_SOURCE
-        )
+        result = futuro.result() or {'answer': '', 'score': 0.0}
+        tempos["qa"] = fim_qa - pendente["inicio_qa"]
+        resposta, confianca = montar_resposta(pendente["prompt"], pendente["docs"], result)
+        st.toast(f"Confiança na resposta: {confianca*100:.1f}%", icon="🤖")
+    except Exception as e:
+        resposta = ERRO_RESPOSTA
+        mostrar_erro(e)
+    tempos["total"] = fim_qa - pendente["inicio"]
+
+    st.session_state.messages.append({"role": "assistant", "content": resposta, "fontes": pendente["fontes"], "tempos": tempos})
+    st.session_state.fila_perguntas.pop(0)
+    del st.session_state.resposta_pendente
+    st.rerun()
 
-        # --- 4. Carregamento do Modelo de QA (apenas para obter score de confiança, não para extração) ---
-        tokenizer = AutoTokenizer.from_pretrained(QA_MODEL, clean_up_tokenization_spaces=True)
-        model = AutoModelForQuestionAnswering.from_pretrained(QA_MODEL)
-
-        # --- 5. Inicialização do Pipeline de QA ---
-        device = -1 # if torch.cuda.is_available() else -1
-        qa_pipeline = pipeline(
-            "question-answering",
-            model=model,
-            tokenizer=tokenizer,
-            device=device
+def mostrar_estatisticas_cache(cache):
+    with st.sidebar.expander("⚡ Cache de consultas"):
+        est = cache.embeddings.estatisticas()
+        st.caption(
+            f"**Embeddings**: {est['taxa_acerto']:.0%} de acertos "
+            f"({est['acertos_memoria']} em memória, {est['acertos_disco']} em disco, {est['falhas']} falhas)"
         )
-        return vector_store, qa_pipeline
-    except Exception as e:
-        st.error(f"Erro ao carregar recursos: {e}") # Adicionado para melhor depuração
-        st.stop()
+        # As buscas ficam só em memória
+        est = cache.buscas.estatisticas()
+        st.caption(f"**Buscas**: {est['taxa_acerto']:.0%} de acertos ({est['acertos_memoria']} acertos, {est['falhas']} falhas)")
 
-vector_store, qa_pipeline = carregar_recursos()
+def mostrar_tempos_carga():
+    with st.sidebar.expander("⏱️ Carga dos modelos"):
+        for etapa, segundos in carga.tempos.items():
+            st.caption(f"**{etapa}**: {segundos:.1f} s")
+
+# Enquanto a carga não termina, o aviso se atualiza a cada segundo; no fim da
+# carga, a página roda de novo para responder às perguntas que ficaram na fila
+aguardando_carga = not carga.concluido
+
+@st.fragment(run_every=1 if aguardando_carga else None)
+def mostrar_prontidao():
+    if aguardando_carga and carga.concluido:
+        st.rerun()
+    if carga.erro:
+        st.error(carga.erro)
+    elif carga.pronto:
+        st.caption(f"✅ Modelos prontos (carregados em {carga.duracao:.1f} s).")
+    else:
+        st.info(
+            f"⏳ Carregando os modelos ({carga.etapa or 'iniciando'})... "
+            "Você já pode perguntar: a resposta vem assim que a carga terminar."
+        )
 
 # --- Interface do Streamlit ---
 st.title("🤖 ChatBot")
 st.markdown("Faça suas perguntas sobre Hidroponia.")
+mostrar_prontidao()
 
 # Inicializa o histórico de mensagens
 if "messages" not in st.session_state:
     st.session_state.messages = []
+# Perguntas ainda não respondidas (feitas durante a carga ou interrompidas por um novo envio)
+if "fila_perguntas" not in st.session_state:
+    st.session_state.fila_perguntas = []
 
 # Exibe mensagens anteriores
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
         st.markdown(message.get("content", ""))
+        if message.get("fontes"):
+            mostrar_fontes(message["fontes"])
+        if message.get("tempos"):
+            st.caption(formatar_tempos(message["tempos"]))
 
 def main():
 
@@ -95,110 +230,36 @@ def main():
     prompt = st.chat_input("Pergunte algo...")
 
     if prompt:
-        # Adiciona a pergunta do usuário ao histórico
+        # Adiciona a pergunta do usuário ao histórico e à fila de respostas
         st.session_state.messages.append({"role": "user", "content": prompt})
+        st.session_state.fila_perguntas.append(prompt)
         with st.chat_message("user"):
             st.markdown(prompt)
 
-        with st.spinner("Buscando e gerando resposta..."):
-            try:
-                # Pré-processar a pergunta do usuário
-                clean_prompt = preprocess_question(prompt)
+    fila = st.session_state.fila_perguntas
+    if fila and not carga.concluido:
+        st.caption(f"🕒 {len(fila)} pergunta(s) na fila, aguardando a carga dos modelos.")
 
-                # Buscar documentos relevantes no banco de vetores FAISS
-                k_docs = 5 # Buscar os 5 chunks mais similares
-                docs = vector_store.similarity_search(clean_prompt, k=k_docs)
+    # Responde às perguntas da fila, em ordem; cada uma só sai da fila depois de respondida.
+    # Com o QA de uma pergunta em andamento, as seguintes esperam por ele
+    while fila and carga.concluido and "resposta_pendente" not in st.session_state:
+        if carga.erro:
+            mensagem = {"role": "assistant", "content": "Desculpe, o chatbot não está disponível no momento. Tente novamente mais tarde."}
+            with st.chat_message("assistant"):
+                st.markdown(mensagem["content"])
+        else:
+            mensagem = iniciar_resposta(fila[0], carga.recursos)
+            if mensagem is None:
+                break
+        st.session_state.messages.append(mensagem)
+        fila.pop(0)
 
-                if not docs:
-                    resposta = "Não consegui encontrar documentos relevantes no PDF para esta pergunta. Tente reformular."
-                    confianca = 0.0 # Sem documentos, sem confiança
-                    fontes = []
-                else:
-                    # --- Construir o contexto a partir de TODOS os documentos recuperados ---
-                    # Isso dá ao modelo de QA mais informações para extrair a melhor resposta
-                    context = " ".join([doc.page_content for doc in docs if doc.page_content.strip()])
-
-                    if not context.strip(): # Fallback caso o contexto esteja vazio (improvável com docs)
-                        resposta = "Não consegui extrair um contexto útil dos documentos encontrados. Tente reformular a pergunta."
-                        confianca = 0.0
-                        fontes = []
-                    else:
-                        # --- Executar o pipeline de QA para obter a *resposta extraída* e a confiança ---
-                        qa_input = {'question': prompt, 'context': context}
-                        result = qa_pipeline(qa_input)
-
-                        extracted_answer = result['answer'].strip()
-                        confianca = result['score']
-
-                        # --- Prioritize the QA model's extracted answer if it's confident enough ---
-                        # If the confidence is low, consider fallback strategies or combining information.
-                        if extracted_answer and confianca > 0.3: # Threshold for considering the QA answer "good enough"
-                            resposta = extracted_answer
-                            # Further refine extracted_answer:
-                            # Remove leading prompt if it was extracted by mistake
-                            if resposta.lower().startswith(prompt.lower()):
-                                resposta = re.sub(r"^" + re.escape(prompt) + r"\s*", "", resposta, count=1, flags=re.IGNORECASE).strip()
-                            # Remove "Tópico:" or similar labels if the QA model extracted them
-                            resposta = re.sub(r"^(Tópico: .*?\n\n|\w+:\s*)", "", resposta, count=1, flags=re.IGNORECASE).strip()
-                            
-                            # If after cleaning, the extracted answer is too short or doesn't seem complete,
-                            # you might consider appending more from the most relevant source.
-                            # This is a heuristic and needs careful tuning.
-                            # Example: If extracted_answer is < 50 chars and source 1 is > 100 chars,
-                            # it might be useful to append the beginning of source 1.
-                            # For now, let's just make sure the `resposta` is the `extracted_answer`.
-
-                        elif docs: # Fallback if QA model isn't confident or no direct answer was extracted
-                            # Use the most relevant part of the first document as a fallback.
-                            # You might want to summarize it or just take a section.
-                            # For simplicity, taking the content of the first doc.
-                            # You could also try to generate a summary using another model here.
-
-                            # If `extracted_answer` is empty or confidence is too low,
-                            # provide the beginning of the most relevant chunk.
-                            resposta = docs[0].page_content.strip()
-                            # Clean the fallback response too if it contains "Tópico:" etc.
-                            resposta = re.sub(r"^(Tópico: .*?\n\n|\w+:\s*)", "", resposta, count=1, flags=re.IGNORECASE).strip()
-
-                            if not resposta: # If even the first doc is empty after stripping
-                                resposta = "Não consegui encontrar uma resposta direta. As fontes podem ajudar."
-                            confianca = 0.1 # Lower confidence for fallback
-
-                        else: # No documents found, already handled above, but keeping for clarity
-                            resposta = "Não consegui encontrar documentos relevantes no PDF para esta pergunta. Tente reformular."
-                            confianca = 0.0
-
-                        fontes = [doc.page_content for doc in docs]
-
-                        # Opcional: Limitar o tamanho da resposta final como um "hard cap"
-                        MAX_FINAL_RESPONSE_LENGTH = 1200
-                        if len(resposta) > MAX_FINAL_RESPONSE_LENGTH:
-                            resposta = resposta[:MAX_FINAL_RESPONSE_LENGTH] + "..."
-
-                        # --- Mensagem final com base na confiança ---
-                        if confianca < 0.1:
-                            resposta_display = f"{resposta}\n\n*Minha confiança nesta resposta é muito baixa ({confianca*100:.1f}%). Considere reformular a pergunta ou verificar as fontes completas.*"
-                        elif confianca < 0.3:
-                            resposta_display = f"{resposta}\n\n*(Confiança na resposta: {confianca*100:.1f}%)*"
-                        else:
-                            resposta_display = resposta
-
-                        resposta = resposta_display
-                        st.toast(f"Confiança na resposta: {confianca*100:.1f}%", icon="🤖")
+    if "resposta_pendente" in st.session_state:
+        mostrar_resposta_pendente()
 
-            except Exception as e:
-                resposta = "Desculpe, tive um problema ao processar sua pergunta. Tente novamente."
-                fontes = []
-                st.error(f"**Erro DETALHADO durante a busca ou Geração de Resposta:**\n`{str(e)}`")
-
-        # Exibir a resposta final do assistente
-        with st.chat_message("assistant"):
-            st.markdown(resposta)
-            if fontes:
-                with st.expander("🔍 Fontes usadas na resposta"):
-                    for i, fonte in enumerate(fontes):
-                        st.caption(f"**Fonte {i+1}**:")
-                        st.code(fonte, language="text")
+    if carga.pronto:
+        mostrar_estatisticas_cache(carga.recursos.cache)
+    mostrar_tempos_carga()
 
 if __name__ == '__main__':
    main()
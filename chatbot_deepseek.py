@@ -1,7 +1,9 @@
 # chatbot_deepseek.py
 import streamlit as st
-import openai
 import time
+import cache_respostas
+import contexto_chat
+import provedores_llm
 
 # Configuração inicial da página
 st.set_page_config(
@@ -104,38 +106,15 @@ def main():
     )
 
     # --- CONFIGURAÇÃO DOS MODELOS ---
-    DEEPSEEK_CONFIGURADO = False
-    OPENAI_CONFIGURADO = False
-    
-    # Cliente DeepSeek
-    client_deepseek = None
-    model_name_deepseek = "deepseek-chat"
-    
-    # Cliente OpenAI
-    client_openai = None
-    model_name_openai = "gpt-3.5-turbo"  # Modelo padrão da OpenAI
-    
-    try:
-        # Configuração DeepSeek
-        client_deepseek = openai.OpenAI(
-            api_key=st.secrets["DEEPSEEK_API_KEY"],
-            base_url="https://api.deepseek.com/v1",
-        )
-        DEEPSEEK_CONFIGURADO = True
-    except KeyError:
+    # DeepSeek (deepseek-chat) e OpenAI (gpt-3.5-turbo), pela camada comum de provedores
+    configurados = [p.nome for p in provedores_llm.provedores_configurados(st.secrets, ["DeepSeek", "OpenAI"])]
+    if "DeepSeek" not in configurados:
         st.warning("DeepSeek não configurado. Adicione DEEPSEEK_API_KEY em secrets.toml")
-    
-    try:
-        # Configuração OpenAI
-        client_openai = openai.OpenAI(
-            api_key=st.secrets["OPENAI_API_KEY"],
-        )
-        OPENAI_CONFIGURADO = True
-    except KeyError:
+    if "OpenAI" not in configurados:
         st.warning("OpenAI não configurada. Adicione OPENAI_API_KEY em secrets.toml")
     
     # Verificar se pelo menos um serviço está configurado
-    if not DEEPSEEK_CONFIGURADO and not OPENAI_CONFIGURADO:
+    if not configurados:
         st.error("Nenhum serviço de API configurado. Adicione pelo menos uma chave API.")
         st.stop()
 
@@ -153,6 +132,9 @@ def main():
             st.session_state.mensagens.append(
                 {"role": "system", "content": instrucao}
             )
+        # Resumo das mensagens antigas e janela de contexto de cada conversa
+        if 'contextos' not in st.session_state:
+            st.session_state.contextos = {}
 
     # --- INICIALIZAÇÃO DO ESTADO ---
     inicializar_estado()
@@ -219,6 +201,7 @@ def main():
                 {"role": "system", "content": instrucao}
             ]
             st.session_state.mensagens = st.session_state.historico_chat[id_conversa]
+            st.session_state.contextos[id_conversa] = contexto_chat.ContextoConversa()
             st.rerun()
 
         st.markdown("---")
@@ -244,6 +227,7 @@ def main():
                 with col2:
                     if st.button("🗑️", key=f"del_{id_conversa}", use_container_width=True):
                         del st.session_state.historico_chat[id_conversa]
+                        st.session_state.contextos.pop(id_conversa, None)
                         if st.session_state.conversa_atual == id_conversa:
                             st.session_state.conversa_atual = None
                             st.session_state.mensagens = []
@@ -253,6 +237,7 @@ def main():
         with st.expander("⚙️ **Configurações avançadas**", expanded=False):
             temperature = st.slider("Criatividade", 0.0, 1.0, 0.7, key="temperature")
             max_tokens = st.slider("Comprimento máximo", 100, 4096, 2000)
+            orcamento = st.slider("Memória da conversa (tokens)", 500, 8000, contexto_chat.ORCAMENTO_TOKENS, step=250)
             
             # Seletor de provedor de API
             api_provider = st.selectbox(
@@ -260,6 +245,14 @@ def main():
                 ["DeepSeek (recomendado)", "OpenAI"],
                 index=0
             )
+            hedge = st.checkbox("Pedir também ao outro provedor se o primeiro demorar")
+
+        with st.expander("⏱️ Latência da API"):
+            for linha in provedores_llm.descrever_latencias(provedores_llm.provedores_configurados(st.secrets, ["DeepSeek", "OpenAI"])):
+                st.caption(linha)
+
+        with st.expander("💾 Cache de respostas"):
+            st.caption(cache_respostas.obter_cache().descrever())
 
 
     # --- INTERFACE PRINCIPAL DO CHAT ---
@@ -276,7 +269,7 @@ def main():
 
         # Entrada do usuário
         if prompt := st.chat_input("Digite sua mensagem..."):
-            if not DEEPSEEK_CONFIGURADO and not OPENAI_CONFIGURADO:
+            if not configurados:
                 st.error("Nenhum serviço de API configurado. Verifique suas chaves de API.")
             else:
                 with st.chat_message("user"):
@@ -290,75 +283,65 @@ def main():
                         placeholder = st.empty()
                         resposta_completa = ""
 
-                        # Prepara o histórico para a API
-                        messages_for_api = []
-                        # Inclui a instrução do sistema
-                        messages_for_api.append({"role": "system", "content": instrucao})
-                        # Adiciona o histórico do chat (últimas 10 mensagens)
-                        for msg in st.session_state.mensagens[-10:]:
-                            if msg["role"] == "user":
-                                messages_for_api.append({"role": "user", "content": msg["content"]})
-                            elif msg["role"] == "assistant":
-                                messages_for_api.append({"role": "assistant", "content": msg["content"]})
-
-                        # Seleciona o provedor de API baseado na escolha do usuário
-                        usar_openai = False
-                        client = None
-                        model_name = ""
-                        
-                        # Verifica qual provedor usar
-                        if api_provider == "DeepSeek (recomendado)" and DEEPSEEK_CONFIGURADO:
-                            client = client_deepseek
-                            model_name = model_name_deepseek
-                        elif api_provider == "OpenAI" and OPENAI_CONFIGURADO:
-                            client = client_openai
-                            model_name = model_name_openai
-                            usar_openai = True
-                        else:
-                            # Fallback automático se a primeira opção falhar
-                            if DEEPSEEK_CONFIGURADO:
-                                client = client_deepseek
-                                model_name = model_name_deepseek
-                            elif OPENAI_CONFIGURADO:
-                                client = client_openai
-                                model_name = model_name_openai
-                                usar_openai = True
-
-                        # Chama a API com streaming usando o cliente configurado
-                        stream = client.chat.completions.create(
-                            model=model_name,
-                            messages=messages_for_api,
-                            max_tokens=max_tokens,
-                            temperature=temperature,
-                            stream=True,
+                        # Provedor escolhido primeiro; o outro (se configurado) é a reserva em caso de erro ou demora
+                        ordem = ["OpenAI", "DeepSeek"] if api_provider == "OpenAI" else ["DeepSeek", "OpenAI"]
+                        provedores = provedores_llm.provedores_configurados(st.secrets, ordem)
+                        opcoes_provedores = {"atraso_hedge": provedores_llm.ATRASO_HEDGE if hedge else None}
+
+                        def completar(instrucao_resumo, texto):
+                            """Resposta completa (resumo das mensagens antigas)"""
+                            return provedores_llm.completar(
+                                provedores, instrucao_resumo, texto, max_tokens=contexto_chat.TOKENS_RESUMO, temperature=0.3
+                            )
+
+                        # Prepara o histórico para a API: instrução do sistema com o resumo das
+                        # mensagens antigas e as mensagens recentes que cabem no orçamento de tokens
+                        contexto = st.session_state.contextos.setdefault(
+                            st.session_state.conversa_atual, contexto_chat.ContextoConversa()
                         )
-
-                        for chunk in stream:
-                            if chunk.choices[0].delta.content is not None:
-                                resposta_completa += chunk.choices[0].delta.content
+                        contexto.orcamento = orcamento
+                        conversa = [
+                            {"role": msg["role"], "content": msg["content"]}
+                            for msg in st.session_state.mensagens if msg["role"] in ("user", "assistant")
+                        ]
+                        _, recentes = contexto.montar(instrucao, conversa, contexto_chat.resumir_com(completar))
+
+                        # Primeira pergunta da conversa: resposta guardada se já houve uma parecida (mesma instrução e modelo)
+                        consulta = cache_respostas.obter_cache().consultar(instrucao, provedores[0], recentes, contexto.resumo)
+                        if consulta.resposta is not None:
+                            resposta_completa = consulta.resposta
+                            placeholder.markdown(resposta_completa)
+                        else:
+                            # Chama a API com streaming
+                            transmissao = provedores_llm.transmitir(
+                                provedores, contexto.instrucao_com_resumo(instrucao), recentes,
+                                max_tokens=max_tokens, temperature=temperature, **opcoes_provedores
+                            )
+                            for pedaco in transmissao:
+                                resposta_completa += pedaco
                                 placeholder.markdown(resposta_completa + "▌")
-                        # Exibe a resposta final sem o cursor
-                        placeholder.markdown(resposta_completa)
+                            # Exibe a resposta final sem o cursor
+                            placeholder.markdown(resposta_completa)
+                            consulta.guardar(resposta_completa, transmissao, contexto.tokens_prompt)
                         # Adiciona a resposta completa do modelo ao histórico
                         st.session_state.mensagens.append({"role": "assistant", "content": resposta_completa})
                         # Atualiza o histórico da conversa no estado da sessão
                         st.session_state.historico_chat[st.session_state.conversa_atual] = st.session_state.mensagens
                         
                         # Mostra qual provedor foi usado
-                        provider = "OpenAI" if usar_openai else "DeepSeek"
-                        st.caption(f"Resposta gerada por: {provider}")
-                        
-                    except openai.NotFoundError:
-                        st.error("Modelo ou endpoint não encontrado. Verifique o nome do modelo e a URL da API.")
-                    except openai.AuthenticationError:
-                        st.error("Falha na autenticação. Verifique sua chave API.")
-                    except openai.APIError as api_error:
-                        if api_error.status_code == 402:
-                            st.warning("Saldo insuficiente no DeepSeek. Recarregue sua conta ou use outro provedor.")
+                        if consulta.resposta is not None:
+                            st.caption(
+                                f"💾 Resposta do cache ({provedores[0].nome}, similaridade {consulta.similaridade:.2f})"
+                                f" · {contexto.descrever()}"
+                            )
                         else:
-                            st.error(f"Erro na API: {str(api_error)}")
+                            st.caption(
+                                f"Resposta gerada por: {transmissao.provedor} · {contexto.descrever()}"
+                                f" · primeiro token em {transmissao.ttft or transmissao.duracao:.2f} s"
+                            )
+                        
                     except Exception as e:
-                        st.error(f"Ocorreu um erro ao se comunicar com a API: {str(e)}")
+                        st.error(provedores_llm.descrever_erro(e))
 
     else:
         st.info("⬅️ Inicie uma nova conversa no menu lateral para começar.")
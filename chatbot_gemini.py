@@ -1,8 +1,12 @@
 # chatbot_gemini.py
 
 import streamlit as st
-import google.generativeai as genai
 import time
+import contexto_chat
+import provedores_llm
+
+# Gemini e, como reserva, os outros provedores com chave em secrets.toml
+PROVEDORES = ["Gemini", "DeepSeek", "OpenAI", "Together"]
 
 # Configuração inicial da página
 st.set_page_config(
@@ -33,31 +37,11 @@ f.close()
 
 def main():
     # --- CONFIGURAÇÃO DO MODELO GEMINI ---
-    try:
-        # Configurando a API Key a partir dos secrets do Streamlit
-        genai.configure(api_key=st.secrets["GOOGLE_API_KEY"])
-        # Configurações de geração e segurança
-        generation_config = {
-            "candidate_count": 1,
-            "temperature": 0.7,
-        }
-        safety_settings = {
-            'HATE': 'BLOCK_NONE',
-            'HARASSMENT': 'BLOCK_NONE',
-            'SEXUAL': 'BLOCK_NONE',
-            'DANGEROUS': 'BLOCK_NONE'
-        }
-        # Inicializando o modelo
-        # model_name='gemini-1.5-flash-latest',
-        model = genai.GenerativeModel(
-            model_name='gemini-1.5-pro-latest',
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
-        GEMINI_CONFIGURADO = True
-    except (KeyError, AttributeError):
+    # gemini-1.5-flash-latest (API REST, pela camada comum de provedores; segurança em BLOCK_NONE)
+    provedores = provedores_llm.provedores_configurados(st.secrets, PROVEDORES)
+    GEMINI_CONFIGURADO = any(p.nome == "Gemini" for p in provedores)
+    if not GEMINI_CONFIGURADO:
         st.error("A GOOGLE_API_KEY não foi encontrada. Por favor, configure-a em .streamlit/secrets.toml")
-        GEMINI_CONFIGURADO = False
     
     # --- FUNÇÕES AUXILIARES ---
     
@@ -73,6 +57,9 @@ def main():
             st.session_state.mensagens.append(
                 {"role": "model", "parts": [{"text": instrucao}]}
             )
+        # Resumo das mensagens antigas e janela de contexto de cada conversa
+        if 'contextos' not in st.session_state:
+            st.session_state.contextos = {}
     
     # --- INICIALIZAÇÃO DO ESTADO ---
     inicializar_estado()
@@ -90,6 +77,7 @@ def main():
                 {"role": "model", "parts": [{"text": instrucao}]}
             ]
             st.session_state.mensagens = st.session_state.historico_chat[id_conversa]
+            st.session_state.contextos[id_conversa] = contexto_chat.ContextoConversa()
             st.rerun()
             
         st.subheader("Recentes")
@@ -113,6 +101,7 @@ def main():
                 with col2:
                     if st.button("🗑️", key=f"del_{id_conversa}", use_container_width=True):
                         del st.session_state.historico_chat[id_conversa]
+                        st.session_state.contextos.pop(id_conversa, None)
                         if st.session_state.conversa_atual == id_conversa:
                             st.session_state.conversa_atual = None
                             st.session_state.mensagens = []
@@ -122,6 +111,12 @@ def main():
             temperature = st.slider("Criatividade", 0.0, 1.0, 0.7, key="temperature")
             # max_tokens = st.slider("Comprimento máximo", 100, 4096, 1000, key="max_tokens")
             max_tokens = st.slider("Comprimento máximo", 100, 8192, 2000)
+            orcamento = st.slider("Memória da conversa (tokens)", 500, 8000, contexto_chat.ORCAMENTO_TOKENS, step=250)
+            hedge = st.checkbox("Pedir também ao provedor reserva se o Gemini demorar")
+
+        with st.expander("⏱️ Latência da API"):
+            for linha in provedores_llm.descrever_latencias(provedores):
+                st.caption(linha)
 
         # Adiciona espaço para empurrar os botões para o rodapé
         st.markdown("<div style='flex-grow: 1;'></div>", unsafe_allow_html=True)
@@ -143,83 +138,71 @@ def main():
 
     # --- INTERFACE PRINCIPAL DO CHAT ---
     if st.session_state.conversa_atual:
-        # Atualize as configurações com os valores dos sliders
-        #generation_config = {
-        #    "candidate_count": 1,
-        #    "temperature": temperature,  # Valor do slider
-        #    "max_output_tokens": max_tokens,  # Valor do slider
-        #}
+        # Configurações de geração com os valores dos sliders
         generation_config = {
-            "candidate_count": 1,
             "temperature": temperature,
-            "max_output_tokens": max_tokens,
-            "top_p": 0.95,        # Novos parâmetros
-            "top_k": 40           # Novos parâmetros
-        }
-    
-        safety_settings = {
-            'HATE': 'BLOCK_NONE',
-            'HARASSMENT': 'BLOCK_NONE',
-            'SEXUAL': 'BLOCK_NONE',
-            'DANGEROUS': 'BLOCK_NONE'
+            "max_tokens": max_tokens,
+            "top_p": 0.95,
+            "top_k": 40,
+            "atraso_hedge": provedores_llm.ATRASO_HEDGE if hedge else None,
         }
-    
-        model = genai.GenerativeModel(
-            model_name='gemini-1.5-flash-latest',
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
-
-        # O histórico do Gemini espera 'parts' em vez de 'content'
-        # O papel do assistente é 'model'
-        #chat = model.start_chat(
-        #    history=[
-        #        {"role": msg["role"], "parts": msg["parts"]}
-        #        for msg in st.session_state.mensagens
-        #    ]
-        #)
-        chat = model.start_chat(
-            history=[
-                {"role": msg["role"], "parts": msg["parts"]}
-                for msg in st.session_state.mensagens[-10:]  # Manter apenas as últimas 10 mensagens
-            ]
-        )
-        
+
+        def completar(instrucao_resumo, texto):
+            """Resposta completa (resumo das mensagens antigas)"""
+            return provedores_llm.completar(
+                provedores, instrucao_resumo, texto, max_tokens=contexto_chat.TOKENS_RESUMO, temperature=0.3
+            )
+
+        contexto = st.session_state.contextos.setdefault(st.session_state.conversa_atual, contexto_chat.ContextoConversa())
+        contexto.orcamento = orcamento
+
         # Exibe as mensagens da conversa atual (ignorando a primeira mensagem do sistema)
-        for msg in chat.history[1:]:
-            with st.chat_message(msg.role if msg.role == 'user' else 'assistant'):
-                st.markdown(msg.parts[0].text)
+        for msg in st.session_state.mensagens[1:]:
+            with st.chat_message(msg["role"] if msg["role"] == 'user' else 'assistant'):
+                st.markdown(msg["parts"][0]["text"])
     
         # Entrada do usuário
         if prompt := st.chat_input("Digite sua mensagem..."):
-            if not GEMINI_CONFIGURADO:
+            if not provedores:
                 st.error("A API do Gemini não está configurada. Verifique o Passo 2.")
             else:
                 with st.chat_message("user"):
                     st.markdown(prompt)
                 # Adiciona mensagem do usuário ao histórico local
                 st.session_state.mensagens.append({"role": "user", "parts": [{"text": prompt}]})
+
+                # O histórico guardado usa 'parts' em vez de 'content' e o papel 'model' para o assistente.
+                # Vão a instrução com o resumo das mensagens antigas e as recentes que cabem no orçamento de tokens
+                conversa = [
+                    {"role": "assistant" if msg["role"] == "model" else "user", "content": msg["parts"][0]["text"]}
+                    for msg in st.session_state.mensagens[1:]
+                ]
     
                 # Envia para o Gemini e exibe a resposta em streaming
                 with st.chat_message("assistant"):
                     try:
                         placeholder = st.empty()
                         resposta_completa = ""
+                        _, recentes = contexto.montar(instrucao, conversa, contexto_chat.resumir_com(completar))
                         # Chama a API com streaming
-                        respostas_stream = chat.send_message(prompt, stream=True)
-                        for pedaco in respostas_stream:
-                            # Ocasionalmente, um pedaço pode vir vazio
-                            if pedaco.text:
-                                resposta_completa += pedaco.text
-                                placeholder.markdown(resposta_completa + "▌")
+                        transmissao = provedores_llm.transmitir(
+                            provedores, contexto.instrucao_com_resumo(instrucao), recentes, **generation_config
+                        )
+                        for pedaco in transmissao:
+                            resposta_completa += pedaco
+                            placeholder.markdown(resposta_completa + "▌")
                         # Exibe a resposta final sem o cursor
                         placeholder.markdown(resposta_completa)
                         # Adiciona a resposta completa do modelo ao histórico
                         st.session_state.mensagens.append({"role": "model", "parts": [{"text": resposta_completa}]})
                         # Atualiza o histórico da conversa no estado da sessão
                         st.session_state.historico_chat[st.session_state.conversa_atual] = st.session_state.mensagens
+                        st.caption(
+                            f"Resposta gerada por: {transmissao.provedor} · {contexto.descrever()}"
+                            f" · primeiro token em {transmissao.ttft or transmissao.duracao:.2f} s"
+                        )
                     except Exception as e:
-                        st.error(f"Ocorreu um erro ao se comunicar com a API do Gemini: {e}")
+                        st.error(provedores_llm.descrever_erro(e))
     
     else:
         st.info("⬅️ Inicie uma nova conversa no menu lateral para começar.")
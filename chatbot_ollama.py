@@ -1,11 +1,12 @@
 # chatbot_ollama.py
 
 import streamlit as st
-import requests
-import json
+import cache_respostas
+import contexto_chat
+import provedores_llm
 
-# Configurações da API
-API_URL = "https://api.together.xyz/v1/chat/completions"
+# Configurações da API: Together e, como reserva, os outros provedores com chave em secrets.toml
+PROVEDORES = ["Together", "DeepSeek", "OpenAI", "Gemini"]
 DEFAULT_MODEL = "mistralai/Mistral-7B-Instruct-v0.1"
 
 # Configuração da página
@@ -41,8 +42,12 @@ except Exception as e:
     st.error(f"Erro ao ler instruções: {str(e)}")
     SYSTEM_INSTRUCTION = "Você é um assistente prestativo."
 
-# API Key
-API_KEY = "d5091edfe2b28cc56a5bc0ad8b2743131d7f31631554a91711c1990359d87bf9"
+def mostrar_latencias(provedores):
+    with st.sidebar.expander("⏱️ Latência da API"):
+        for linha in provedores_llm.descrever_latencias(provedores):
+            st.caption(linha)
+    with st.sidebar.expander("💾 Cache de respostas"):
+        st.caption(cache_respostas.obter_cache().descrever())
 
 def main():
     if "model_select" not in st.session_state:
@@ -57,11 +62,14 @@ def main():
         max_tokens = st.slider("Tamanho da resposta", 128, 4096, 1024, key="max_tokens_slider")
         temperature = st.slider("Criatividade", 0.0, 1.0, 0.7, key="temperature_slider")
         top_p = st.slider("Foco", 0.0, 1.0, 0.9, key="top_p_slider")
+        orcamento = st.slider("Memória da conversa (tokens)", 500, 8000, contexto_chat.ORCAMENTO_TOKENS, step=250, key="orcamento_slider")
+        hedge = st.checkbox("Pedir também ao provedor reserva se o primeiro demorar", key="hedge_checkbox")
         
         if st.button("🧹 Limpar histórico", key="clear_history_btn", use_container_width=True):
             st.session_state.messages = [
                 {"role": "assistant", "content": "Histórico limpo! Como posso ajudar com agricultura ou hidroponia?"}
             ]
+            st.session_state.contexto_conversa = contexto_chat.ContextoConversa()
             st.rerun()
                 
         col1, col2 = st.columns([1, 1])
@@ -77,11 +85,27 @@ def main():
                 st.session_state.current_page = "login"
                 st.rerun()
 
+    # Provedores com chave em .streamlit/secrets.toml, na ordem de preferência
+    provedores = provedores_llm.provedores_configurados(st.secrets, PROVEDORES, {"Together": st.session_state.model_select})
+    if not provedores:
+        st.error("A TOGETHER_API_KEY não foi encontrada. Por favor, configure-a em .streamlit/secrets.toml")
+        st.stop()
+    opcoes_provedores = {"atraso_hedge": provedores_llm.ATRASO_HEDGE if hedge else None}
+
+    def completar(instrucao, texto):
+        """Resposta completa (usada para resumir as mensagens antigas da conversa)"""
+        return provedores_llm.completar(provedores, instrucao, texto, max_tokens=contexto_chat.TOKENS_RESUMO, temperature=0.3)
+
     # Inicializar histórico de mensagens
     if "messages" not in st.session_state:
         st.session_state.messages = [
             {"role": "assistant", "content": "Olá! Sou especialista em agricultura e hidroponia. Como posso ajudar?"}
         ]
+    # Resumo das mensagens antigas e janela de contexto da conversa
+    if "contexto_conversa" not in st.session_state:
+        st.session_state.contexto_conversa = contexto_chat.ContextoConversa()
+    contexto = st.session_state.contexto_conversa
+    contexto.orcamento = orcamento
 
     # Exibir histórico de mensagens
     for message in st.session_state.messages:
@@ -103,82 +127,44 @@ def main():
             full_response = ""
             
             try:
-                # Preparar cabeçalhos e payload
-                headers = {
-                    "Authorization": f"Bearer {API_KEY}",
-                    "Content-Type": "application/json"
-                }
-                
-                # Preparar mensagens para a API - INCLUIR SYSTEM INSTRUCTION CORRETAMENTE
-                api_messages = [
-                    {"role": "system", "content": SYSTEM_INSTRUCTION}
-                ]
-                
-                # Adicionar histórico de conversa (apenas as últimas 10 mensagens)
-                for message in st.session_state.messages[-10:]:
-                    api_messages.append(message)
-                
-                payload = {
-                    "model": st.session_state.model_select,
-                    "messages": api_messages,
-                    "max_tokens": max_tokens,
-                    "temperature": temperature,
-                    "top_p": top_p,
-                    "stream": True,
-                    "stop": ["<|eot_id|>", "<|end_of_text|>", "[INST]", "[/INST]"]
-                }
-                
-                # Fazer requisição com streaming
-                response = requests.post(
-                    API_URL,
-                    headers=headers,
-                    json=payload,
-                    stream=True
-                )
-                
-                # Verificar erros na resposta
-                if response.status_code != 200:
-                    error = response.json().get("error", {}).get("message", "Erro desconhecido")
-                    raise Exception(f"Erro na API ({response.status_code}): {error}")
-                
-                # Processar streaming de resposta
-                for line in response.iter_lines():
-                    if line:
-                        decoded_line = line.decode('utf-8')
-                        if decoded_line.startswith('data: '):
-                            json_str = decoded_line[6:]
-                            if json_str != '[DONE]':
-                                try:
-                                    data = json.loads(json_str)
-                                    if 'choices' in data and len(data['choices']) > 0:
-                                        delta = data['choices'][0].get('delta', {})
-                                        if 'content' in delta:
-                                            token = delta['content']
-                                            full_response += token
-                                            message_placeholder.markdown(full_response + "▌")
-                                except json.JSONDecodeError:
-                                    continue
-                
-                # Exibir resposta final
-                message_placeholder.markdown(full_response)
+                # Histórico dentro do orçamento de tokens; as mensagens antigas vão para o resumo
+                _, recentes = contexto.montar(SYSTEM_INSTRUCTION, st.session_state.messages, contexto_chat.resumir_com(completar))
+
+                # Pergunta que abre a conversa: resposta guardada se já houve uma parecida (mesma instrução e modelo)
+                consulta = cache_respostas.obter_cache().consultar(SYSTEM_INSTRUCTION, provedores[0], recentes, contexto.resumo)
+                if consulta.resposta is not None:
+                    full_response = consulta.resposta
+                    message_placeholder.markdown(full_response)
+                    st.caption(f"💾 Resposta do cache ({provedores[0].nome}, similaridade {consulta.similaridade:.2f}) · {contexto.descrever()}")
+                else:
+                    # Resposta em streaming (troca de provedor em erro ou demora; 429/5xx são repetidos)
+                    transmissao = provedores_llm.transmitir(
+                        provedores, contexto.instrucao_com_resumo(SYSTEM_INSTRUCTION), recentes,
+                        max_tokens=max_tokens, temperature=temperature, top_p=top_p,
+                        stop=["<|eot_id|>", "<|end_of_text|>", "[INST]", "[/INST]"], **opcoes_provedores
+                    )
+                    for token in transmissao:
+                        full_response += token
+                        message_placeholder.markdown(full_response + "▌")
+
+                    # Exibir resposta final
+                    message_placeholder.markdown(full_response)
+                    consulta.guardar(full_response, transmissao, contexto.tokens_prompt)
+                    st.caption(
+                        f"{transmissao.provedor} · {contexto.descrever()} · primeiro token em {transmissao.ttft or transmissao.duracao:.2f} s"
+                        f" · resposta em {transmissao.duracao:.2f} s"
+                    )
             
             except Exception as e:
-                error_msg = f"⚠️ **Erro na API:** {str(e)}"
-                if "401" in str(e):
-                    error_msg += "\n\n🔐 Verifique sua API Key"
-                elif "402" in str(e):
-                    error_msg += "\n\n💳 Você pode ter excedido seu crédito gratuito"
-                elif "400" in str(e) and "non-serverless" in str(e):
-                    error_msg += "\n\n🔧 Este modelo requer endpoint dedicado. Tente outro modelo."
-                elif "rate limit" in str(e).lower():
-                    error_msg += "\n\n⏳ Limite de requisições excedido, tente novamente mais tarde"
-                
+                error_msg = provedores_llm.descrever_erro(e)
                 message_placeholder.markdown(error_msg)
                 full_response = error_msg
         
         # Adicionar resposta ao histórico
         st.session_state.messages.append({"role": "assistant", "content": full_response})
 
+    mostrar_latencias(provedores)
+
 if __name__ == "__main__":
     main()
     
@@ -0,0 +1,169 @@
+# contexto_chat.py
+
+"""
+    Janela de contexto dos chatbots com LLM remoto (chatbot_ollama.py,
+    chatbot_deepseek.py e chatbot_gemini.py).
+
+    Em vez de mandar as últimas N mensagens, seja qual for o tamanho delas, cada
+    conversa tem um orçamento de tokens para o prompt (instrução do sistema +
+    resumo + histórico). As mensagens mais recentes entram inteiras enquanto
+    couberem; quando alguma fica de fora, as mais antigas são condensadas num
+    resumo acumulado (por uma chamada ao próprio LLM ou, sem ela, por extração
+    das primeiras frases), até sobrar só parte do orçamento. O resumo fica
+    guardado na conversa e só é refeito quando outras mensagens saem da janela,
+    de modo que o tamanho do prompt fica quase constante conforme a conversa
+    cresce, com uma chamada de resumo a cada poucas perguntas.
+
+    Os tokens são estimados localmente (sem o tokenizer de cada provedor), com
+    folga para o português.
+"""
+
+import math
+import re
+from functools import lru_cache
+
+# Tokens do prompt (instrução + resumo + histórico) e tamanho máximo do resumo
+ORCAMENTO_TOKENS = 3000
+TOKENS_RESUMO = 400
+# Parte do espaço do histórico que fica ocupada logo depois de um resumo: a
+# folga evita resumir de novo a cada pergunta
+FRACAO_APOS_RESUMO = 0.6
+# Tokens de formatação de cada mensagem (papel e separadores)
+TOKENS_POR_MENSAGEM = 4
+
+PAPEIS = {"user": "Usuário", "assistant": "Assistente"}
+
+PROMPT_RESUMO = (
+    "Você resume conversas entre um usuário e um assistente de agricultura e hidroponia. "
+    "Atualize o resumo com as novas mensagens, em português do Brasil, em no máximo "
+    "{palavras} palavras. Mantenha as perguntas do usuário, os dados concretos (culturas, "
+    "medidas, valores, datas) e as conclusões do assistente; omita saudações e repetições. "
+    "Responda só com o resumo."
+)
+
+
+@lru_cache(maxsize=4096)
+def contar_tokens(texto):
+    """
+    Estimativa dos tokens do texto: palavras longas e acentuadas se partem em
+    vários tokens (cerca de 4 caracteres cada) e cada sinal de pontuação conta
+    como um. Tende a ficar um pouco acima da contagem real.
+    """
+    return sum(max(1, math.ceil(len(peca) / 4)) for peca in re.findall(r"\w+|[^\w\s]", texto))
+
+
+def tokens_mensagem(mensagem):
+    return contar_tokens(mensagem["content"]) + TOKENS_POR_MENSAGEM
+
+
+def mensagens_que_cabem(mensagens, limite):
+    """Quantas mensagens do fim da lista cabem em limite tokens (ao menos a última)"""
+    total = 0
+    for quantidade, mensagem in enumerate(reversed(mensagens)):
+        total += tokens_mensagem(mensagem)
+        if total > limite:
+            return max(quantidade, 1)
+    return len(mensagens)
+
+
+def formatar_mensagens(mensagens):
+    return "\n\n".join(f"{PAPEIS.get(m['role'], m['role'])}: {m['content']}" for m in mensagens)
+
+
+def cortar(texto, limite):
+    """Texto reduzido a cerca de limite tokens, do fim para o começo (fica o mais recente)"""
+    linhas = texto.splitlines()
+    while len(linhas) > 1 and contar_tokens("\n".join(linhas)) > limite:
+        linhas.pop(0)
+    texto = "\n".join(linhas)
+    if contar_tokens(texto) > limite:
+        texto = texto[-limite * 4:]
+    return texto
+
+
+def resumo_extrativo(resumo, mensagens, limite=TOKENS_RESUMO):
+    """Resumo sem LLM: a primeira frase de cada mensagem, somada ao resumo anterior"""
+    linhas = [resumo] if resumo else []
+    for m in mensagens:
+        frase = re.split(r"(?<=[.!?])\s", " ".join(m["content"].split()), maxsplit=1)[0]
+        linhas.append(f"{PAPEIS.get(m['role'], m['role'])}: {frase[:300]}")
+    return cortar("\n".join(linhas), limite)
+
+
+class ContextoConversa:
+    """
+    Resumo acumulado e janela de mensagens de uma conversa. Guardado no
+    st.session_state junto com a conversa; as mensagens são dicionários
+    {"role": "user" | "assistant", "content": texto}, em ordem, e a lista só
+    cresce (resumidas conta quantas do começo já estão no resumo).
+    """
+
+    def __init__(self, orcamento=ORCAMENTO_TOKENS, tokens_resumo=TOKENS_RESUMO):
+        self.orcamento = orcamento
+        self.tokens_resumo = tokens_resumo
+        self.resumo = ""
+        self.resumidas = 0
+        self.resumos = 0
+        self.tokens_prompt = 0
+
+    def _espaco(self, instrucao):
+        """Tokens que sobram para o histórico depois da instrução e do resumo"""
+        return self.orcamento - contar_tokens(instrucao) - contar_tokens(self.resumo) - 2 * TOKENS_POR_MENSAGEM
+
+    def _resumir(self, mensagens, resumir):
+        if resumir is not None:
+            try:
+                self.resumo = cortar(resumir(self.resumo, mensagens).strip(), self.tokens_resumo)
+                return
+            except Exception as e:
+                print(f"[contexto_chat] Resumo pelo LLM falhou, usando o extrativo: {e}")
+        self.resumo = resumo_extrativo(self.resumo, mensagens, self.tokens_resumo)
+
+    def montar(self, instrucao, mensagens, resumir=None):
+        """
+        (resumo, mensagens recentes) para o próximo prompt. resumir(resumo,
+        mensagens) -> novo resumo é chamada só quando mensagens saem da janela.
+        """
+        recentes = mensagens[self.resumidas:]
+        while mensagens_que_cabem(recentes, self._espaco(instrucao)) < len(recentes):
+            # As mensagens que ficam são escolhidas já com o resumo no tamanho
+            # máximo, para caberem ao lado do resumo novo; se ainda assim não
+            # couberem, a volta seguinte resume as excedentes (nada sai do prompt
+            # sem entrar no resumo)
+            espaco = self._espaco(instrucao) + contar_tokens(self.resumo) - self.tokens_resumo
+            ficam = min(mensagens_que_cabem(recentes, int(espaco * FRACAO_APOS_RESUMO)), len(recentes) - 1)
+            self._resumir(recentes[:len(recentes) - ficam], resumir)
+            self.resumidas += len(recentes) - ficam
+            self.resumos += 1
+            recentes = mensagens[self.resumidas:]
+        self.tokens_prompt = (contar_tokens(instrucao) + contar_tokens(self.resumo) + 2 * TOKENS_POR_MENSAGEM
+                              + sum(tokens_mensagem(m) for m in recentes))
+        return self.resumo, recentes
+
+    def instrucao_com_resumo(self, instrucao):
+        """Instrução do sistema seguida do resumo da conversa, se houver"""
+        if not self.resumo:
+            return instrucao
+        return f"{instrucao}\n\nResumo da conversa até aqui:\n{self.resumo}"
+
+    def descrever(self):
+        texto = f"Contexto: ~{self.tokens_prompt} de {self.orcamento} tokens"
+        if self.resumidas:
+            texto += f" · {self.resumidas} mensagens antigas resumidas"
+        return texto
+
+
+def resumir_com(gerar, palavras=None):
+    """
+    Função de resumo para ContextoConversa.montar a partir de gerar(instrucao,
+    texto) -> resposta do LLM, a chamada sem streaming de cada chatbot.
+    """
+    palavras = palavras or int(TOKENS_RESUMO * 0.6)
+
+    def resumir(resumo, mensagens):
+        texto = formatar_mensagens(mensagens)
+        if resumo:
+            texto = f"Resumo anterior:\n{resumo}\n\nNovas mensagens:\n{texto}"
+        return gerar(PROMPT_RESUMO.format(palavras=palavras), texto)
+
+    return resumir
@@ -10,11 +10,11 @@
 
 import streamlit as st
 import sqlite3
-import math
 from datetime import datetime, timedelta, date
 import plotly.express as px
 import pandas as pd
 import numpy as np
+import modelo_crescimento
 
 # Configuração inicial da página
 st.set_page_config(
@@ -278,62 +278,10 @@ def criar_grafico(registros_df, cultivar_nome="Desconhecido"):
 
     return fig
 
-def calcular_parametros(p_inicial, p_final, dias):
-    """Calcula parâmetros da curva sigmoidal de forma robusta"""
-    t0 = dias / 2.0
-    K = p_final * 1.05
-    tolerancia = 0.01
-    max_iter = 1000
-    
-    for _ in range(max_iter):
-        try:
-            if K <= p_inicial:
-                K = p_inicial * 1.1
-                continue
-                
-            arg = (K / p_inicial) - 1
-            if arg <= 0:
-                K *= 1.1
-                continue
-                
-            r = -math.log(arg) / (1 - t0)
-            
-            exp_term = math.exp(-r * (dias - t0))
-            p_final_calculado = K / (1 + exp_term)
-            
-            if abs(p_final_calculado - p_final) < tolerancia:
-                return K, r, t0
-            
-            K *= p_final / p_final_calculado
-            
-        except (ValueError, ZeroDivisionError):
-            K *= 1.1
-            continue
-    
-    return K, 0.1, t0
-
-def classificar_fase(peso, K):
-    """Classifica a fase de crescimento de forma eficiente"""
-    ratio = peso / K
-    return "Lenta" if ratio < 0.1 else "Saturação" if ratio > 0.9 else "Acelerada"
-
 def gerar_dados_sigmoidal(p_inicial=5.0, p_final=260.0, dias=35):
     """Gera dados para curva de crescimento"""
     try:
-        K, r, t0 = calcular_parametros(p_inicial, p_final, dias)
-        dias_list = list(range(1, dias + 1))
-        pesos_list = []
-        
-        for t in dias_list:
-            try:
-                exp_term = math.exp(-r * (t - t0))
-                peso = K / (1 + exp_term)
-                pesos_list.append(peso)
-            except:
-                pesos_list.append(0)
-        
-        fases_list = [classificar_fase(p, K) for p in pesos_list]
-        return dias_list, pesos_list, fases_list, K, r
+        return modelo_crescimento.gerar_dados_sigmoidal(p_inicial, p_final, dias)
     except Exception as e:
         st.error(f"Erro no cálculo: {e}")
         return None, None, None, None, None
@@ -10,11 +10,15 @@
 
 import streamlit as st
 import sqlite3
-import math
-from datetime import datetime, timedelta, date
-import plotly.express as px
+from datetime import datetime, date
 import pandas as pd
 import numpy as np
+import cache_curvas
+import ajuste_crescimento
+import selecao_modelos
+import tempo_termico
+import grafico_crescimento
+import crescimento_db
 
 # Configuração inicial da página
 st.set_page_config(
@@ -126,257 +130,53 @@ def verificar_cultivar(cultivar_id):
         st.error(f"Erro ao obter informações do cultivar: {e}")
         return (0, 0.0)
 
-def criar_grafico(registros_df, cultivar_nome="Desconhecido"):
-    """Cria um gráfico de crescimento com os dados reais"""
-    if registros_df.empty:
+@st.cache_data(max_entries=32, show_spinner=False)
+def carregar_ajuste(bancada_id, cultivar_id, data_plantio):
+    """
+    Obtém a curva ajustada aos pesos reais do plantio (recalculada se os pesos
+    mudaram); fica em cache por plantio até o próximo salvamento
+    """
+    try:
+        return ajuste_crescimento.obter_ajuste(bancada_id, cultivar_id, data_plantio)
+    except Exception as e:
+        st.warning(f"Não foi possível ajustar a curva aos pesos reais: {e}")
         return None
-        
-    # Processar o DataFrame para o gráfico
-    df = registros_df.copy()
-    df["Data"] = pd.to_datetime(df["Data"])
-
-    # Criar o gráfico com ambas as linhas
-    fig = px.line(
-        df,
-        x="Data",
-        y=["Peso previsto (g)", "Peso real (g)"],
-        color_discrete_sequence=["#81C784", "#FF5252"],
-        labels={"value": "Peso (g)", "variable": ""},
-    )
-    
-    # Mapear os nomes das colunas para os nomes desejados na legenda
-    new_names = {'Peso previsto (g)':'Peso Previsto', 'Peso real (g)':'Peso Real'}
-    fig.for_each_trace(lambda t: t.update(name = new_names[t.name]))
-    
-    # Configurar tooltips individuais para cada linha
-    fig.update_traces(
-        selector={"name": "Peso Previsto"},
-        hovertemplate="<b>Data</b>: %{x|%d/%m/%Y}<br><b>Peso previsto</b>: %{y:.2f} g<extra></extra>",
-        hoverlabel=dict(bgcolor="#ECF5E7", font_size=12)
-    )
-    
-    fig.update_traces(
-        selector={"name": "Peso Real"},
-        hovertemplate="<b>Data</b>: %{x|%d/%m/%Y}<br><b>Peso real</b>: %{y:.2f} g<extra></extra>",
-        hoverlabel=dict(bgcolor="#FCE4D6", font_size=12)
-    )
-
-    # Adicionar pontos para ambas as linhas
-    for i, row in df.iterrows():
-        # Pontos para Peso Real
-        fig.add_scatter(
-            x=[row["Data"]],
-            y=[row["Peso real (g)"]],
-            mode='markers',
-            marker=dict(color="#FF5252", size=8),
-            showlegend=False,
-            hoverinfo="skip"
-        )
-        
-        # Pontos para Peso Previsto
-        fig.add_scatter(
-            x=[row["Data"]],
-            y=[row["Peso previsto (g)"]],
-            mode='markers',
-            marker=dict(color="#81C784", size=8),
-            showlegend=False,
-            hoverinfo="skip"
-        )
-
-    # Configuração do eixo X
-    meses_pt = {
-        1: "Jan", 2: "Fev", 3: "Mar", 4: "Abr", 5: "Mai", 6: "Jun",
-        7: "Jul", 8: "Ago", 9: "Set", 10: "Out", 11: "Nov", 12: "Dez"
-    }
-    ticktext = [f"{d.day}/{meses_pt[d.month]}" for d in df["Data"]]
-
-    # Personalização do layout
-    fig.update_layout(
-        height=600,
-        xaxis=dict(
-            tickvals=df["Data"],
-            ticktext=ticktext,
-            tickangle=90,
-            tickfont=dict(size=12),
-            title=dict(standoff=10)
-        ),
-        yaxis=dict(title="Peso (g)"),
-        plot_bgcolor='white',
-        legend=dict(
-            orientation="h",
-            yanchor="top",
-            y=-0.15,
-            xanchor="center",
-            x=0.5,
-            font=dict(size=12)
-        ),
-        hovermode="closest",
-        spikedistance=-1,
-        hoverdistance=-1,
-        margin=dict(t=40, b=40, l=40, r=40),
-        title=dict(
-            text=f"Evolução do Crescimento: {cultivar_nome}",
-            y=0.98,
-            x=0.5,
-            xanchor='center',
-            yanchor='top',
-            font=dict(
-                size=20,
-                family="Arial",
-                color="#333333",
-                weight="normal"
-            )
-        )
-    )
-
-    phase_intervals = []
-    current_phase = None
-    start_date = None
-    
-    for i, row in df.iterrows():
-        if row["Fase"] != current_phase:
-            if current_phase is not None:
-                phase_intervals.append({
-                    "phase": current_phase,
-                    "start": start_date,
-                    "end": row["Data"]
-                })
-            current_phase = row["Fase"]
-            start_date = row["Data"]
-    
-    if current_phase is not None:
-        phase_intervals.append({
-            "phase": current_phase,
-            "start": start_date,
-            "end": df.iloc[-1]["Data"]
-        })
-
-    for interval in phase_intervals:
-        fig.add_vrect(
-            x0=interval["start"],
-            x1=interval["end"],
-            fillcolor={
-                "Lenta": "#ECF4FA",
-                "Acelerada": "#ECF5E7",
-                "Saturação": "#FFF5D9"
-            }[interval["phase"]],
-            opacity=0.7,
-            layer="below",
-            line_width=0,
-            annotation_text=interval["phase"],
-            annotation_position="top left"
-        )
-
-    for date in df["Data"]:
-        fig.add_vline(
-            x=date,
-            line_dash="dot",
-            line_color="gray",
-            line_width=1,
-            opacity=0.3
-        )
-
-    return fig
 
-def calcular_parametros(p_inicial, p_final, dias):
-    """Calcula parâmetros da curva sigmoidal de forma robusta"""
-    t0 = dias / 2.0
-    K = p_final * 1.05
-    tolerancia = 0.01
-    max_iter = 1000
-    
-    for _ in range(max_iter):
-        try:
-            if K <= p_inicial:
-                K = p_inicial * 1.1
-                continue
-                
-            arg = (K / p_inicial) - 1
-            if arg <= 0:
-                K *= 1.1
-                continue
-                
-            r = -math.log(arg) / (1 - t0)
-            
-            exp_term = math.exp(-r * (dias - t0))
-            p_final_calculado = K / (1 + exp_term)
-            
-            if abs(p_final_calculado - p_final) < tolerancia:
-                return K, r, t0
-            
-            K *= p_final / p_final_calculado
-            
-        except (ValueError, ZeroDivisionError):
-            K *= 1.1
-            continue
-    
-    return K, 0.1, t0
+@st.cache_data(max_entries=32, show_spinner=False)
+def criar_grafico(registros_df, cultivar_nome="Desconhecido", ajuste=None):
+    """Cria o gráfico de crescimento; a figura fica em cache pelo hash dos dados"""
+    return grafico_crescimento.criar_grafico(registros_df, cultivar_nome=cultivar_nome, ajuste=ajuste)
 
-def classificar_fase(peso, K):
-    """Classifica a fase de crescimento de forma eficiente"""
-    ratio = peso / K
-    return "Lenta" if ratio < 0.1 else "Saturação" if ratio > 0.9 else "Acelerada"
+def carregar_modelo_cultivar(cultivar_id):
+    """Família de curva escolhida para o cultivar (None: logística teórica)"""
+    try:
+        return selecao_modelos.obter_modelo_cultivar(cultivar_id)
+    except Exception as e:
+        st.warning(f"Não foi possível obter o modelo do cultivar: {e}")
+        return None
 
-def gerar_dados_sigmoidal(p_inicial=5.0, p_final=260.0, dias=35):
-    """Gera dados para curva de crescimento"""
+def gerar_registros_previstos(peso_final, periodo, data_plantio, modelo=None):
+    """Gera os registros do crescimento esperado a partir do cache de curvas teóricas"""
     try:
-        K, r, t0 = calcular_parametros(p_inicial, p_final, dias)
-        dias_list = list(range(1, dias + 1))
-        pesos_list = []
-        
-        for t in dias_list:
-            try:
-                exp_term = math.exp(-r * (t - t0))
-                peso = K / (1 + exp_term)
-                pesos_list.append(peso)
-            except:
-                pesos_list.append(0)
-        
-        fases_list = [classificar_fase(p, K) for p in pesos_list]
-        return dias_list, pesos_list, fases_list, K, r
+        return cache_curvas.obter_registros(peso_final, periodo, data_plantio, modelo=modelo)
     except Exception as e:
         st.error(f"Erro no cálculo: {e}")
-        return None, None, None, None, None
+        return pd.DataFrame()
 
-def gerar_registros_df(dados_sigmoidal, data_plantio):
-    dias = dados_sigmoidal[0]
-    pesos_previstos = dados_sigmoidal[1]
-    fases = dados_sigmoidal[2]
-    
-    fase_para_id = {
-        "Lenta": 1,
-        "Acelerada": 2,
-        "Saturação": 3
-    }
-    
-    registros = []
-    
-    for i in range(len(dias)):
-        dia = dias[i]
-        data = data_plantio + timedelta(days=dia-1)
-        fase = fases[i]
-        peso_previsto = round(pesos_previstos[i], 2)
-        
-        registros.append({
-            "Dia": dia,
-            "Data": data,
-            "Fase": fase,
-            "Peso previsto (g)": peso_previsto,
-            "Peso real (g)": None,
-            "_fase_id": fase_para_id[fase],
-        })
-    
-    df = pd.DataFrame(registros)
-    df = df.astype({
-        "Dia": "int64",
-        "Data": "datetime64[ns]",
-        "Fase": "object",
-        "Peso previsto (g)": "float64",
-        "Peso real (g)": "float64",
-        "_fase_id": "int64",
-    })
-
-    return df
+def aplicar_tempo_termico(registros_df, bancada_id, data_plantio, peso_final, periodo, modelo=None):
+    """
+    Reindexa o peso previsto pelos graus-dia da estufa da bancada.
+    Retorna (registros, dias com leitura); sem leituras, devolve os registros sem alteração.
+    """
+    try:
+        termico = tempo_termico.dias_termicos_plantio(bancada_id, data_plantio, len(registros_df))
+        if termico is None:
+            return registros_df, 0
+        tempo, medidos = termico
+        return tempo_termico.reindexar_registros(registros_df, tempo, peso_final, periodo, modelo=modelo), medidos
+    except Exception as e:
+        st.warning(f"Não foi possível aplicar os graus-dia: {e}")
+        return registros_df, 0
 
 def get_periodo(periodo, chave):
     col1, col2 = st.columns([1, 1])
@@ -457,6 +257,7 @@ def main():
         periodo_default, peso_default = verificar_cultivar(cultivar_id)
         periodo_input = get_periodo(periodo_default, "periodo_dias")
         peso_input = get_peso(peso_default, "peso_esperado")
+        usar_graus_dia = st.checkbox("🌡️ Corrigir pela temperatura (graus-dia)", value=False, key="usar_graus_dia")
 
         #if bancada_id and cultivar_id and data_plantio:
         #    registros_existentes = verificar_crescimento(bancada_id, cultivar_id, data_plantio)
@@ -475,16 +276,24 @@ def main():
         
         mostrar_grafico = st.sidebar.button("📈 Mostrar Gráfico", use_container_width=True)
       
-        current_config = (bancada_id, cultivar_id, data_plantio, periodo_input, peso_input)
+        current_config = (bancada_id, cultivar_id, data_plantio, periodo_input, peso_input, usar_graus_dia)
 
         if mostrar_grafico:
             st.session_state.show_graph = True
             registros_existentes = verificar_crescimento(bancada_id, cultivar_id, data_plantio)
+            modelo = carregar_modelo_cultivar(cultivar_id)
             if registros_existentes:
                 st.session_state.registros_df = pd.DataFrame(registros_existentes)
+                # Pesos já gravados, para salvar depois apenas o que mudou
+                st.session_state.pesos_salvos = st.session_state.registros_df["Peso real (g)"].copy()
             else:
-                dados_sigmoidal = gerar_dados_sigmoidal(5.0, peso_input, periodo_input)
-                st.session_state.registros_df = gerar_registros_df(dados_sigmoidal, data_plantio)
+                st.session_state.registros_df = gerar_registros_previstos(peso_input, periodo_input, data_plantio, modelo)
+                st.session_state.pesos_salvos = None
+            st.session_state.dias_graus_dia = 0
+            if usar_graus_dia and not st.session_state.registros_df.empty:
+                st.session_state.registros_df, st.session_state.dias_graus_dia = aplicar_tempo_termico(
+                    st.session_state.registros_df, bancada_id, data_plantio, peso_input, periodo_input, modelo
+                )
             st.session_state.last_config = current_config
         elif st.session_state.get('last_config') != current_config:
             st.session_state.show_graph = False
@@ -492,9 +301,21 @@ def main():
         if st.session_state.show_graph and not st.session_state.registros_df.empty:
             cultivar_nome = next((c[1] for c in cultivares if c[0] == cultivar_id), "Desconhecido")
 
-            fig = criar_grafico(st.session_state.registros_df, cultivar_nome=cultivar_nome)
+            ajuste = carregar_ajuste(bancada_id, cultivar_id, data_plantio)
+            fig = criar_grafico(st.session_state.registros_df, cultivar_nome=cultivar_nome, ajuste=ajuste)
             if fig:
                 st.plotly_chart(fig, use_container_width=True)
+            if usar_graus_dia:
+                dias_lidos = st.session_state.get('dias_graus_dia', 0)
+                st.sidebar.caption(
+                    f"Graus-dia: {dias_lidos} dias com leitura de temperatura."
+                    if dias_lidos else "Sem leituras de temperatura para a estufa desta bancada."
+                )
+            if ajuste:
+                st.sidebar.caption(
+                    f"Ajuste {ajuste['modelo']}: K = {ajuste['K']:.1f} g, "
+                    f"RMSE = {ajuste['rmse']:.2f} g ({ajuste['n_medicoes']} medições)"
+                )
 
             col1, col2, col3 = st.columns([2, 6, 2])
             with col2:
@@ -529,55 +350,21 @@ def main():
     if st.button("Salvar Alterações", key="btn_salvar"):
         if 'registros_df' in st.session_state and not st.session_state.registros_df.empty:
             try:
-                conn = sqlite3.connect(DB_NAME)
-                cursor = conn.cursor()
-                
-                for index, row in st.session_state.registros_df.iterrows():
-                    # Verifica se o registro já existe
-                    cursor.execute("""
-                        SELECT cre_id FROM tbl_crescimento
-                        WHERE cre_bancada_id = ?
-                        AND cre_cultivar_id = ?
-                        AND cre_data_plantio = ?
-                        AND cre_data = ?
-                    """, (
-                        bancada_id,
-                        cultivar_id,
-                        data_plantio.strftime('%Y-%m-%d'),
-                        row["Data"].strftime('%Y-%m-%d')
-                    ))
-                    existing_record = cursor.fetchone()
-                    
-                    if existing_record:
-                        # Atualiza o registro existente
-                        cursor.execute("""
-                            UPDATE tbl_crescimento
-                            SET cre_peso_real = ?
-                            WHERE cre_id = ?
-                        """, (
-                            round(row["Peso real (g)"], 2),
-                            existing_record[0]
-                        ))
-                    else:
-                        # Insere novo registro
-                        cursor.execute("""
-                            INSERT INTO tbl_crescimento (
-                                cre_bancada_id, cre_cultivar_id, cre_data_plantio, cre_data,
-                                cre_fase_id, cre_peso_esperado, cre_peso_real
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """, (
-                            bancada_id,
-                            cultivar_id,
-                            data_plantio.strftime('%Y-%m-%d'),
-                            row["Data"].strftime('%Y-%m-%d'),
-                            row["_fase_id"],
-                            round(row["Peso previsto (g)"], 2),
-                            round(row["Peso real (g)"], 2)
-                        ))
-                
-                conn.commit()
-                conn.close()
-                st.success("Alterações salvas com sucesso!")
+                # Grava apenas as linhas cujo peso real mudou, em um único UPSERT
+                qtd = crescimento_db.salvar_registros(
+                    bancada_id,
+                    cultivar_id,
+                    data_plantio,
+                    st.session_state.registros_df,
+                    st.session_state.get('pesos_salvos')
+                )
+                st.session_state.pesos_salvos = st.session_state.registros_df["Peso real (g)"].copy()
+                if qtd:
+                    # Pesos novos: o ajuste do plantio é recalculado na próxima exibição
+                    carregar_ajuste.clear(bancada_id, cultivar_id, data_plantio)
+                    st.success(f"Alterações salvas com sucesso! ({qtd} registros)")
+                else:
+                    st.info("Nenhuma alteração para salvar.")
                 
             except Exception as e:
                 st.error(f"Erro ao salvar alterações: {e}")
@@ -0,0 +1,105 @@
+# crescimento_db.py
+
+"""
+    Gravação dos registros de crescimento (tbl_crescimento).
+
+    A tabela recebe uma chave única em (bancada, cultivar, data_plantio, data) e as
+    alterações são gravadas com um único executemany de UPSERT, contendo apenas as
+    linhas cujo "Peso real (g)" mudou no editor.
+"""
+
+import sqlite3
+
+import pandas as pd
+
+DB_NAME = "./dados/hidroponia.db"
+
+SQL_INDICE_UNICO = """
+    CREATE UNIQUE INDEX IF NOT EXISTS idx_crescimento_plantio_data
+    ON tbl_crescimento (cre_bancada_id, cre_cultivar_id, cre_data_plantio, cre_data)
+"""
+
+# De cada dia duplicado fica a linha com peso real (o laço de gravação antigo
+# atualizava a primeira linha encontrada, a de menor cre_id) ou, sem peso real
+# em nenhuma, a de menor cre_id
+SQL_REMOVER_DUPLICADOS = """
+    DELETE FROM tbl_crescimento
+    WHERE cre_id NOT IN (
+        SELECT COALESCE(MIN(CASE WHEN cre_peso_real IS NOT NULL THEN cre_id END), MIN(cre_id))
+        FROM tbl_crescimento
+        GROUP BY cre_bancada_id, cre_cultivar_id, cre_data_plantio, cre_data
+    )
+"""
+
+SQL_UPSERT = """
+    INSERT INTO tbl_crescimento (
+        cre_bancada_id, cre_cultivar_id, cre_data_plantio, cre_data,
+        cre_fase_id, cre_peso_esperado, cre_peso_real
+    ) VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (cre_bancada_id, cre_cultivar_id, cre_data_plantio, cre_data)
+    DO UPDATE SET cre_peso_real = excluded.cre_peso_real
+"""
+
+
+def garantir_chave_unica(conn):
+    """
+    Cria a chave única de tbl_crescimento. Se a tabela tiver registros
+    duplicados, mantém de cada dia o que tem peso real gravado (ou, sem peso
+    real, o mais antigo).
+    """
+    try:
+        conn.execute(SQL_INDICE_UNICO)
+    except sqlite3.IntegrityError:
+        conn.execute(SQL_REMOVER_DUPLICADOS)
+        conn.execute(SQL_INDICE_UNICO)
+    conn.commit()
+
+
+def linhas_alteradas(registros_df, pesos_salvos=None):
+    """
+    Máscara das linhas cujo "Peso real (g)" difere do valor já gravado.
+    Sem pesos_salvos (plantio ainda não gravado), todas as linhas são novas.
+    """
+    if pesos_salvos is None:
+        return pd.Series(True, index=registros_df.index)
+    atual = registros_df["Peso real (g)"].astype("float64").round(2)
+    antes = pesos_salvos.reindex(registros_df.index).astype("float64").round(2)
+    return ~((atual == antes) | (atual.isna() & antes.isna()))
+
+
+def _montar_linhas(bancada_id, cultivar_id, data_plantio, registros_df):
+    datas = pd.to_datetime(registros_df["Data"]).dt.strftime('%Y-%m-%d')
+    previstos = registros_df["Peso previsto (g)"].astype("float64").round(2)
+    reais = registros_df["Peso real (g)"].astype("float64").round(2)
+    plantio = data_plantio.strftime('%Y-%m-%d')
+    return [
+        (bancada_id, cultivar_id, plantio, data, int(fase_id),
+         None if pd.isna(previsto) else float(previsto),
+         None if pd.isna(real) else float(real))
+        for data, fase_id, previsto, real in zip(
+            datas, registros_df["_fase_id"], previstos, reais
+        )
+    ]
+
+
+def salvar_registros(bancada_id, cultivar_id, data_plantio, registros_df, pesos_salvos=None, conn=None):
+    """
+    Grava as linhas alteradas do plantio com um único executemany de UPSERT.
+
+    Retorna o número de linhas enviadas ao banco.
+    """
+    alteradas = registros_df[linhas_alteradas(registros_df, pesos_salvos)]
+    if alteradas.empty:
+        return 0
+
+    fechar = conn is None
+    if fechar:
+        conn = sqlite3.connect(DB_NAME)
+    try:
+        garantir_chave_unica(conn)
+        with conn:
+            conn.executemany(SQL_UPSERT, _montar_linhas(bancada_id, cultivar_id, data_plantio, alteradas))
+        return len(alteradas)
+    finally:
+        if fechar:
+            conn.close()
@@ -0,0 +1,248 @@
+# crescimento_lote.py
+
+"""
+    Geração em lote, sem interface, das curvas de crescimento esperado e dos
+    ajustes aos pesos reais de muitos plantios (versão não interativa de sigmoid.py).
+
+    Os plantios vêm do banco (tbl_crescimento + tbl_cultivares) ou de um CSV e são
+    divididos em blocos processados em paralelo por um pool de processos. Cada
+    bloco calcula as curvas em lote (modelo_crescimento), ajusta os pesos reais
+    (ajuste_crescimento) e, se pedido, salva um PNG por plantio com o gráfico de
+    sigmoid.py (backend Agg, sem janela).
+
+    Uso (ex.: cron):
+        python crescimento_lote.py --saida relatorios [--todos] [--graficos]
+        python crescimento_lote.py --csv plantios.csv [--medicoes medicoes.csv] --formato parquet
+
+    CSV de plantios: id, p_final, dias e, opcionalmente, p_inicial e data_plantio.
+    CSV de medições: id, dia, peso_real.
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import matplotlib
+matplotlib.use("Agg")
+
+import numpy as np
+import pandas as pd
+
+import ajuste_crescimento
+import modelo_crescimento
+import sigmoid
+
+DB_NAME = "./dados/hidroponia.db"
+
+P_INICIAL_PADRAO = 5.0
+TAMANHO_BLOCO = 250
+# Medições mínimas para tentar o ajuste (o AICc da logística pede parâmetros + 2)
+MIN_MEDICOES = ajuste_crescimento.MODELOS["logistico"] + 2
+
+CHAVE = ["cre_bancada_id", "cre_cultivar_id", "cre_data_plantio"]
+
+
+def carregar_plantios_db(apenas_ativos=True, data_ref=None):
+    """
+    Plantios de tbl_crescimento, com período e peso de colheita do cultivar.
+    Retorna (plantios, medicoes); as medições já trazem a coluna id do plantio.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        medicoes = ajuste_crescimento.carregar_medicoes(conn, apenas_ativos=apenas_ativos, data_ref=data_ref)
+        cultivares = pd.read_sql("""
+            SELECT clt_id AS cre_cultivar_id, clt_nome, clt_periodo, clt_peso_colheita
+            FROM tbl_cultivares
+        """, conn)
+    finally:
+        conn.close()
+    if medicoes.empty:
+        return pd.DataFrame(columns=["id", "p_inicial", "p_final", "dias", "data_plantio", "titulo"]), medicoes
+
+    medicoes["id"] = (
+        "b" + medicoes["cre_bancada_id"].astype(str) + "_c" + medicoes["cre_cultivar_id"].astype(str)
+        + "_" + medicoes["cre_data_plantio"].astype(str)
+    )
+    grupos = medicoes.groupby("id", sort=True)
+    plantios = grupos[CHAVE].first().reset_index().merge(cultivares, on="cre_cultivar_id", how="left")
+    plantios = plantios.set_index("id")
+
+    esperado = medicoes.dropna(subset=["cre_peso_esperado"]).groupby("id")["cre_peso_esperado"]
+    plantios["p_inicial"] = esperado.first().reindex(plantios.index).fillna(P_INICIAL_PADRAO)
+    plantios["p_final"] = plantios["clt_peso_colheita"].where(
+        plantios["clt_peso_colheita"] > 0, esperado.last().reindex(plantios.index)
+    )
+    plantios["dias"] = plantios["clt_periodo"].where(plantios["clt_periodo"] > 0, grupos["dia"].max())
+    plantios["data_plantio"] = plantios["cre_data_plantio"]
+    plantios["titulo"] = (
+        plantios["clt_nome"].fillna("Cultivar " + plantios["cre_cultivar_id"].astype(str))
+        + " · bancada " + plantios["cre_bancada_id"].astype(str) + " · " + plantios["cre_data_plantio"].astype(str)
+    )
+    plantios = plantios.reset_index().dropna(subset=["p_final", "dias"])
+    return plantios[["id", "p_inicial", "p_final", "dias", "data_plantio", "titulo"]], medicoes
+
+
+def carregar_plantios_csv(arquivo, arquivo_medicoes=None):
+    """Plantios (e medições opcionais) a partir de CSVs; mesmo formato de carregar_plantios_db"""
+    plantios = pd.read_csv(arquivo)
+    faltando = {"p_final", "dias"} - set(plantios.columns)
+    if faltando:
+        raise ValueError(f"Colunas ausentes em {arquivo}: {', '.join(sorted(faltando))}")
+    if "id" not in plantios:
+        plantios["id"] = [f"plantio_{i + 1}" for i in range(len(plantios))]
+    if "p_inicial" not in plantios:
+        plantios["p_inicial"] = P_INICIAL_PADRAO
+    if "data_plantio" not in plantios:
+        plantios["data_plantio"] = None
+    plantios["id"] = plantios["id"].astype(str)
+    plantios["p_inicial"] = plantios["p_inicial"].fillna(P_INICIAL_PADRAO)
+    plantios["titulo"] = None
+
+    if arquivo_medicoes:
+        medicoes = pd.read_csv(arquivo_medicoes).rename(columns={"peso_real": "cre_peso_real"})
+        medicoes["id"] = medicoes["id"].astype(str)
+        medicoes["cre_peso_esperado"] = np.nan
+    else:
+        medicoes = pd.DataFrame(columns=["id", "dia", "cre_peso_real", "cre_peso_esperado"])
+    return plantios[["id", "p_inicial", "p_final", "dias", "data_plantio", "titulo"]], medicoes
+
+
+def _curvas(plantios):
+    """Curvas esperadas do bloco em formato longo (uma linha por plantio e dia)"""
+    dias = plantios["dias"].to_numpy(dtype=np.int64)
+    pesos, fases, K, r, t0 = modelo_crescimento.gerar_curvas_lote(
+        plantios["p_inicial"].to_numpy(dtype=np.float64),
+        plantios["p_final"].to_numpy(dtype=np.float64),
+        dias
+    )
+    validos = fases > 0
+    linha, coluna = np.nonzero(validos)
+    curvas = pd.DataFrame({
+        "id": plantios["id"].to_numpy()[linha],
+        "dia": coluna + 1,
+        "fase": pd.Series(fases[validos]).map(modelo_crescimento.FASES).to_numpy(),
+        "peso_previsto": np.round(pesos[validos], 2),
+    })
+    data_plantio = pd.to_datetime(plantios["data_plantio"]).to_numpy()[linha]
+    curvas.insert(2, "data", data_plantio + (coluna).astype("timedelta64[D]"))
+    parametros = pd.DataFrame({"id": plantios["id"].to_numpy(), "K": K, "r": r, "t0": t0})
+    return curvas, parametros, pesos, fases
+
+
+def _ajustes(plantios, medicoes):
+    """Ajuste (menor AICc entre as famílias) de cada plantio com medições suficientes"""
+    medidas = medicoes[medicoes["cre_peso_real"].notna() & (medicoes["cre_peso_real"] > 0)]
+    contagem = medidas.groupby("id").size()
+    aptos = [i for i in plantios["id"] if contagem.get(i, 0) >= MIN_MEDICOES]
+    if not aptos:
+        return pd.DataFrame()
+    grupos = dict(tuple(medicoes[medicoes["id"].isin(aptos)].groupby("id")))
+    # Peso de colheita no fim do ciclo de cada plantio, não no último dia medido
+    dias = plantios.set_index("id").loc[aptos, "dias"].to_numpy(dtype=np.int64)
+    ajustes = ajuste_crescimento.ajustar_plantios([grupos[i] for i in aptos], dias=dias)
+    ajustes.insert(0, "id", aptos)
+    return ajustes
+
+
+def processar_bloco(plantios, medicoes, pasta_graficos=None):
+    """
+    Processa um bloco de plantios (executado em um processo do pool).
+    Retorna (curvas, parametros, ajustes).
+    """
+    curvas, parametros, pesos, fases = _curvas(plantios)
+    if not medicoes.empty:
+        curvas = curvas.merge(
+            medicoes[["id", "dia", "cre_peso_real"]].rename(columns={"cre_peso_real": "peso_real"}),
+            on=["id", "dia"], how="left"
+        )
+    ajustes = _ajustes(plantios, medicoes)
+
+    if pasta_graficos:
+        for i, p in enumerate(plantios.itertuples(index=False)):
+            n = int(p.dias)
+            fases_list = [modelo_crescimento.FASES[int(f)] for f in fases[i, :n]]
+            sigmoid.plotar_grafico(
+                list(range(1, n + 1)), pesos[i, :n].tolist(), fases_list, parametros["K"].iloc[i],
+                p.p_inicial, p.p_final, n,
+                arquivo=os.path.join(pasta_graficos, f"{p.id}.png"), mostrar=False, titulo=p.titulo
+            )
+    return curvas, parametros, ajustes
+
+
+def _blocos(plantios, medicoes, tamanho):
+    por_id = dict(tuple(medicoes.groupby("id"))) if not medicoes.empty else {}
+    for ini in range(0, len(plantios), tamanho):
+        bloco = plantios.iloc[ini:ini + tamanho]
+        partes = [por_id[i] for i in bloco["id"] if i in por_id]
+        yield bloco, pd.concat(partes) if partes else medicoes.iloc[:0]
+
+
+def gravar(df, pasta, nome, formato):
+    caminho = os.path.join(pasta, f"{nome}.{formato}")
+    if formato == "parquet":
+        df.to_parquet(caminho, index=False)
+    else:
+        df.to_csv(caminho, index=False)
+    return caminho
+
+
+def executar(plantios, medicoes, pasta, formato="csv", graficos=False, processos=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Processa todos os plantios em paralelo e grava curvas, parâmetros e ajustes"""
+    os.makedirs(pasta, exist_ok=True)
+    pasta_graficos = os.path.join(pasta, "graficos") if graficos else None
+    if pasta_graficos:
+        os.makedirs(pasta_graficos, exist_ok=True)
+
+    blocos = list(_blocos(plantios, medicoes, tamanho_bloco))
+    if processos == 1:
+        resultados = [processar_bloco(b, m, pasta_graficos) for b, m in blocos]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            resultados = list(pool.map(
+                processar_bloco, [b for b, _ in blocos], [m for _, m in blocos], [pasta_graficos] * len(blocos)
+            ))
+
+    curvas, parametros, ajustes = (pd.concat(partes, ignore_index=True) for partes in zip(*resultados))
+    arquivos = [
+        gravar(curvas, pasta, "curvas", formato),
+        gravar(parametros, pasta, "parametros", formato),
+    ]
+    if not ajustes.empty:
+        arquivos.append(gravar(ajustes, pasta, "ajustes", formato))
+    return arquivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Curvas de crescimento e ajustes em lote, sem interface")
+    parser.add_argument("--csv", help="CSV de plantios (padrão: plantios do banco)")
+    parser.add_argument("--medicoes", help="CSV de medições (id, dia, peso_real) para os plantios do --csv")
+    parser.add_argument("--todos", action="store_true", help="com o banco, inclui plantios encerrados")
+    parser.add_argument("--saida", default="relatorios", help="pasta de saída")
+    parser.add_argument("--formato", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--graficos", action="store_true", help="salva um PNG por plantio")
+    parser.add_argument("--processos", type=int, default=None, help="processos do pool (padrão: núcleos da CPU)")
+    parser.add_argument("--bloco", type=int, default=TAMANHO_BLOCO, help="plantios por tarefa do pool")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    if args.csv:
+        plantios, medicoes = carregar_plantios_csv(args.csv, args.medicoes)
+    else:
+        plantios, medicoes = carregar_plantios_db(apenas_ativos=not args.todos, data_ref=date.today())
+    if plantios.empty:
+        print("Nenhum plantio encontrado.")
+        return
+
+    arquivos = executar(plantios, medicoes, args.saida, args.formato, args.graficos, args.processos, args.bloco)
+    print(f"{len(plantios)} plantios processados em {time.perf_counter() - inicio:.1f} s:")
+    for arquivo in arquivos:
+        print(f"  {arquivo}")
+    if args.graficos:
+        print(f"  {os.path.join(args.saida, 'graficos')}/ ({len(plantios)} PNGs)")
+
+
+if __name__ == "__main__":
+    main()
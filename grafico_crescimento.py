@@ -0,0 +1,169 @@
+# grafico_crescimento.py
+
+"""
+    Gráfico Plotly da evolução do crescimento (usado por crescimento.py).
+
+    O número de traces é constante (peso previsto, peso real e, opcionalmente,
+    a curva ajustada): os pontos são marcadores das próprias linhas, as linhas
+    verticais vêm da grade do eixo X e as faixas de fase são shapes do layout,
+    calculadas uma única vez por sequência de fases.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+import ajuste_crescimento
+
+CORES_FASES = {
+    "Lenta": "#ECF4FA",
+    "Acelerada": "#ECF5E7",
+    "Saturação": "#FFF5D9"
+}
+
+MESES_PT = {
+    1: "Jan", 2: "Fev", 3: "Mar", 4: "Abr", 5: "Mai", 6: "Jun",
+    7: "Jul", 8: "Ago", 9: "Set", 10: "Out", 11: "Nov", 12: "Dez"
+}
+
+# Quantidade máxima de rótulos (e linhas de grade) no eixo X
+MAX_TICKS = 60
+
+
+@lru_cache(maxsize=128)
+def _faixas_fases(fases, datas):
+    """Intervalos contínuos de cada fase, como shapes e anotações do layout"""
+    fases = np.asarray(fases, dtype=object)
+    inicios = np.flatnonzero(np.r_[True, fases[1:] != fases[:-1]])
+    fins = np.r_[inicios[1:], len(fases) - 1]
+
+    shapes, anotacoes = [], []
+    for ini, fim in zip(inicios, fins):
+        fase = fases[ini]
+        shapes.append(dict(
+            type="rect", xref="x", yref="paper",
+            x0=datas[ini], x1=datas[fim], y0=0, y1=1,
+            fillcolor=CORES_FASES.get(fase, "#F5F5F5"),
+            opacity=0.7, layer="below", line_width=0
+        ))
+        anotacoes.append(dict(
+            x=datas[ini], xref="x", y=1, yref="paper",
+            text=fase, showarrow=False,
+            xanchor="left", yanchor="top"
+        ))
+    return tuple(shapes), tuple(anotacoes)
+
+
+def _eixo_x(datas):
+    """Rótulos do eixo X em português, espaçados para no máximo MAX_TICKS"""
+    passo = max(1, int(np.ceil(len(datas) / MAX_TICKS)))
+    tickvals = datas[::passo]
+    ticktext = [f"{d.day}/{MESES_PT[d.month]}" for d in tickvals]
+    return list(tickvals), ticktext
+
+
+def criar_grafico(registros_df, cultivar_nome="Desconhecido", ajuste=None):
+    """Cria um gráfico de crescimento com os dados reais e, se houver, a curva ajustada"""
+    if registros_df.empty:
+        return None
+
+    datas = pd.to_datetime(registros_df["Data"])
+    datas_py = tuple(datas.dt.to_pydatetime())
+
+    fig = go.Figure()
+    fig.add_scatter(
+        x=datas,
+        y=registros_df["Peso previsto (g)"],
+        mode="lines+markers",
+        name="Peso Previsto",
+        line=dict(color="#81C784"),
+        marker=dict(color="#81C784", size=8),
+        hovertemplate="<b>Data</b>: %{x|%d/%m/%Y}<br><b>Peso previsto</b>: %{y:.2f} g<extra></extra>",
+        hoverlabel=dict(bgcolor="#ECF5E7", font_size=12)
+    )
+    fig.add_scatter(
+        x=datas,
+        y=registros_df["Peso real (g)"],
+        mode="lines+markers",
+        name="Peso Real",
+        line=dict(color="#FF5252"),
+        marker=dict(color="#FF5252", size=8),
+        hovertemplate="<b>Data</b>: %{x|%d/%m/%Y}<br><b>Peso real</b>: %{y:.2f} g<extra></extra>",
+        hoverlabel=dict(bgcolor="#FCE4D6", font_size=12)
+    )
+
+    shapes, anotacoes = _faixas_fases(tuple(registros_df["Fase"]), datas_py)
+    anotacoes = list(anotacoes)
+
+    # Curva ajustada aos pesos reais e peso de colheita projetado
+    if ajuste:
+        fig.add_scatter(
+            x=datas,
+            y=ajuste_crescimento.avaliar_ajuste(ajuste, registros_df["Dia"].to_numpy()),
+            mode="lines",
+            name=f"Curva Ajustada ({ajuste['modelo']})",
+            line=dict(color="#5C6BC0", dash="dash", width=2),
+            hovertemplate="<b>Data</b>: %{x|%d/%m/%Y}<br><b>Peso ajustado</b>: %{y:.2f} g<extra></extra>",
+        )
+        if ajuste["peso_colheita_previsto"] is not None:
+            anotacoes.append(dict(
+                x=datas_py[-1],
+                y=ajuste["peso_colheita_previsto"],
+                text=f"Colheita projetada: {ajuste['peso_colheita_previsto']:.1f} g",
+                showarrow=True,
+                arrowhead=2,
+                ax=-80,
+                ay=-30,
+                font=dict(size=12, color="#5C6BC0")
+            ))
+
+    tickvals, ticktext = _eixo_x(datas_py)
+
+    fig.update_layout(
+        height=600,
+        xaxis=dict(
+            tickvals=tickvals,
+            ticktext=ticktext,
+            tickangle=90,
+            tickfont=dict(size=12),
+            title=dict(text="Data", standoff=10),
+            # A grade do eixo substitui uma linha vertical por data
+            showgrid=True,
+            gridcolor="rgba(128, 128, 128, 0.3)",
+            griddash="dot",
+            gridwidth=1
+        ),
+        yaxis=dict(title="Peso (g)"),
+        plot_bgcolor='white',
+        legend=dict(
+            orientation="h",
+            yanchor="top",
+            y=-0.15,
+            xanchor="center",
+            x=0.5,
+            font=dict(size=12)
+        ),
+        hovermode="closest",
+        spikedistance=-1,
+        hoverdistance=-1,
+        margin=dict(t=40, b=40, l=40, r=40),
+        title=dict(
+            text=f"Evolução do Crescimento: {cultivar_nome}",
+            y=0.98,
+            x=0.5,
+            xanchor='center',
+            yanchor='top',
+            font=dict(
+                size=20,
+                family="Arial",
+                color="#333333",
+                weight="normal"
+            )
+        ),
+        shapes=list(shapes),
+        annotations=anotacoes
+    )
+
+    return fig
@@ -0,0 +1,141 @@
+# indice_chatbot.py
+
+"""
+    Armazenamento do índice do chatbot sem pickle.
+
+    Os textos e metadados dos chunks ficam numa tabela SQLite (chunks.db, chave =
+    id do chunk, o mesmo id do vetor no FAISS) e são lidos sob demanda, só para
+    os chunks retornados por cada busca. O index.faiss é aberto mapeado em
+    memória: a abertura não depende do tamanho da biblioteca e vários processos
+    do chatbot compartilham as mesmas páginas pelo cache do sistema operacional.
+
+    treinar.py grava os dois arquivos; chatbot.py os abre com carregar_vector_store.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+from collections.abc import Mapping
+
+import faiss
+from langchain_community.docstore.base import AddableMixin, Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+DOCSTORE = "chunks.db"
+
+# Mapeia o arquivo inteiro (vetores do índice plano e do HNSW, códigos do IVF-PQ);
+# nas versões do faiss sem essa opção, só as listas do IVF são mapeadas
+FLAGS_MMAP = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+SQL_CRIAR_TABELA = """
+    CREATE TABLE IF NOT EXISTS tbl_chunks (
+        chk_id INTEGER PRIMARY KEY,
+        chk_texto TEXT NOT NULL,
+        chk_fonte TEXT
+    )
+"""
+
+
+class DocstoreSQLite(Docstore, AddableMixin):
+    """
+    Docstore da LangChain sobre tbl_chunks. As ids são as do FAISS, em texto.
+    As escritas ficam na transação aberta até salvar(); a conexão é compartilhada
+    entre threads (st.cache_resource), por isso os acessos passam por um lock.
+    """
+
+    def __init__(self, caminho, somente_leitura=False):
+        if somente_leitura:
+            self.conn = sqlite3.connect(f"file:{caminho}?mode=ro", uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(caminho, check_same_thread=False)
+            self.conn.execute(SQL_CRIAR_TABELA)
+        self.lock = threading.Lock()
+
+    def search(self, search):
+        with self.lock:
+            linha = self.conn.execute(
+                "SELECT chk_texto, chk_fonte FROM tbl_chunks WHERE chk_id = ?", (int(search),)
+            ).fetchone()
+        if linha is None:
+            return f"ID {search} não encontrado."
+        return Document(page_content=linha[0], metadata={"chunk_id": int(search), "fonte": linha[1]})
+
+    def add(self, texts):
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tbl_chunks (chk_id, chk_texto, chk_fonte) VALUES (?, ?, ?)",
+                [(int(i), doc.page_content, doc.metadata.get("fonte")) for i, doc in texts.items()]
+            )
+
+    def delete(self, ids):
+        with self.lock:
+            self.conn.executemany("DELETE FROM tbl_chunks WHERE chk_id = ?", [(int(i),) for i in ids])
+
+    def iterar(self, bloco=1000):
+        """(id, texto) de todos os chunks, em ordem de id, lidos em blocos"""
+        cursor = self.conn.execute("SELECT chk_id, chk_texto FROM tbl_chunks ORDER BY chk_id")
+        while True:
+            linhas = cursor.fetchmany(bloco)
+            if not linhas:
+                return
+            yield from linhas
+
+    def limpar(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM tbl_chunks")
+
+    def salvar(self):
+        with self.lock:
+            self.conn.commit()
+
+    def fechar(self):
+        self.conn.close()
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM tbl_chunks").fetchone()[0]
+
+
+class IdsDoIndice(Mapping):
+    """
+    index_to_docstore_id sem materializar o dicionário: no IndexIDMap2 (e no
+    IVF-PQ com ids) o rótulo devolvido pela busca já é o id do chunk.
+    """
+
+    def __init__(self, docstore):
+        self.docstore = docstore
+
+    def __getitem__(self, i):
+        if i < 0:
+            raise KeyError(i)
+        return str(int(i))
+
+    def __iter__(self):
+        with self.docstore.lock:
+            ids = [i for (i,) in self.docstore.conn.execute("SELECT chk_id FROM tbl_chunks ORDER BY chk_id")]
+        return iter(ids)
+
+    def __len__(self):
+        return len(self.docstore)
+
+
+def versao_indice(pasta):
+    """Identifica o conteúdo do índice gravado (muda a cada gravação do treinar.py)"""
+    partes = []
+    arquivos = ["index.faiss", DOCSTORE]
+    # Índice BM25 da busca híbrida (busca_hibrida), quando existe
+    if os.path.exists(os.path.join(pasta, "bm25", "ids.npy")):
+        arquivos.append(os.path.join("bm25", "ids.npy"))
+    for nome in arquivos:
+        info = os.stat(os.path.join(pasta, nome))
+        partes.append(f"{nome}:{info.st_size}:{info.st_mtime_ns}")
+    return hashlib.sha1("|".join(partes).encode("utf-8")).hexdigest()[:16]
+
+
+def carregar_vector_store(pasta, embeddings):
+    """FAISS da LangChain com o índice mapeado em memória e os textos em SQLite (somente leitura)"""
+    index = faiss.read_index(os.path.join(pasta, "index.faiss"), FLAGS_MMAP)
+    docstore = DocstoreSQLite(os.path.join(pasta, DOCSTORE), somente_leitura=True)
+    return FAISS(embeddings, index, docstore, IdsDoIndice(docstore))
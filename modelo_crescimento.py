@@ -0,0 +1,163 @@
+# modelo_crescimento.py
+
+"""
+    Motor de crescimento sigmoidal compartilhado por crescimento.py, cresc.py e sigmoid.py.
+
+    A curva logística W(t) = K / (1 + exp(-r * (t - t0))), com t0 = dias / 2, é
+    ajustada de forma que W(1) = p_inicial e W(dias) = p_final. Os parâmetros são
+    resolvidos por Newton vetorizado sobre r (com salvaguarda por bisseção), o que
+    permite calcular milhares de plantios de uma só vez como arrays NumPy.
+"""
+
+import numpy as np
+
+FASES = {
+    1: "Lenta",
+    2: "Acelerada",
+    3: "Saturação"
+}
+
+FASE_PARA_ID = {nome: fase_id for fase_id, nome in FASES.items()}
+
+# Valores usados quando a combinação (p_inicial, p_final, dias) não admite solução
+K_FATOR_FALLBACK = 1.05
+R_FALLBACK = 0.1
+
+MAX_ITER_NEWTON = 50
+TOLERANCIA_R = 1e-10
+
+
+def _log1pexp(x):
+    """ln(1 + e^x) numericamente estável"""
+    return np.logaddexp(0.0, x)
+
+
+def _sigmoide(x):
+    """1 / (1 + e^-x) numericamente estável"""
+    return 0.5 * (1.0 + np.tanh(0.5 * x))
+
+
+def calcular_parametros_lote(p_inicial, p_final, dias):
+    """
+    Calcula K, r e t0 para vários plantios de uma vez.
+
+    Aceita escalares ou arrays (com broadcasting) e devolve três arrays float64.
+    Como t0 = dias / 2, as condições de contorno reduzem-se a uma única equação
+    monótona em r:
+
+        g(r) = ln(p_i) + ln(1 + e^(r*c)) - ln(p_f) - ln(1 + e^(-r*h)) = 0
+
+    com h = dias / 2 e c = h - 1. Depois de obter r, K = p_f * (1 + e^(-r*h)).
+    """
+    p_i, p_f, d = np.broadcast_arrays(
+        np.asarray(p_inicial, dtype=np.float64),
+        np.asarray(p_final, dtype=np.float64),
+        np.asarray(dias, dtype=np.float64),
+    )
+    h = d / 2.0
+    c = h - 1.0
+    t0 = h.copy()
+
+    # Só existe solução com p_final > p_inicial > 0 e ao menos 3 dias (c > 0)
+    valido = (p_i > 0) & (p_f > p_i) & (c > 0)
+    log_razao = np.log(np.where(valido, p_f / np.where(valido, p_i, 1.0), 2.0))
+    c_seg = np.where(valido, c, 1.0)
+    h_seg = np.where(valido, h, 1.0)
+
+    # Intervalo que contém a raiz: g(0) < 0 e g(r_alto) > 0, pois
+    # ln(1 + e^(r*c)) >= r*c e ln(1 + e^(-r*h)) <= ln 2
+    r_baixo = np.zeros_like(log_razao)
+    r_alto = (log_razao + np.log(2.0)) / c_seg
+    r = 0.5 * (r_baixo + r_alto)
+
+    for _ in range(MAX_ITER_NEWTON):
+        g = _log1pexp(r * c_seg) - _log1pexp(-r * h_seg) - log_razao
+        r_baixo = np.where(g < 0, r, r_baixo)
+        r_alto = np.where(g > 0, r, r_alto)
+
+        derivada = c_seg * _sigmoide(r * c_seg) + h_seg * _sigmoide(-r * h_seg)
+        r_novo = r - g / derivada
+        # Passo de Newton fora do intervalo: recorre à bisseção
+        fora = (r_novo <= r_baixo) | (r_novo >= r_alto)
+        r_novo = np.where(fora, 0.5 * (r_baixo + r_alto), r_novo)
+
+        convergiu = np.abs(r_novo - r) < TOLERANCIA_R
+        r = r_novo
+        if np.all(convergiu | ~valido):
+            break
+
+    K = p_f * (1.0 + np.exp(-r * h_seg))
+
+    K = np.where(valido, K, p_f * K_FATOR_FALLBACK)
+    r = np.where(valido, r, R_FALLBACK)
+    return K, r, t0
+
+
+def calcular_parametros(p_inicial, p_final, dias):
+    """Calcula parâmetros da curva sigmoidal para um único plantio"""
+    K, r, t0 = calcular_parametros_lote(p_inicial, p_final, dias)
+    return float(K), float(r), float(t0)
+
+
+def avaliar_logistica(t, K, r, t0):
+    """Avalia W(t) = K / (1 + e^(-r(t - t0))) sem overflow (com broadcasting)"""
+    return K * _sigmoide(r * (np.asarray(t, dtype=np.float64) - t0))
+
+
+def classificar_fases(pesos, K):
+    """Devolve o id da fase (1, 2 ou 3) para cada peso, de forma vetorizada"""
+    ratio = np.asarray(pesos, dtype=np.float64) / K
+    return np.where(ratio < 0.1, 1, np.where(ratio > 0.9, 3, 2))
+
+
+def classificar_fase(peso, K):
+    """Classifica a fase de crescimento de um único peso"""
+    ratio = peso / K
+    return "Lenta" if ratio < 0.1 else "Saturação" if ratio > 0.9 else "Acelerada"
+
+
+def gerar_curvas_lote(p_inicial, p_final, dias):
+    """
+    Gera as curvas esperadas de vários plantios de uma vez.
+
+    Retorna (pesos, fases, K, r, t0), onde pesos e fases são matrizes
+    (n_plantios, max(dias)); as posições além do período de cada plantio
+    ficam com NaN em pesos e 0 em fases.
+    """
+    K, r, t0 = calcular_parametros_lote(p_inicial, p_final, dias)
+    K, r, t0 = np.atleast_1d(K), np.atleast_1d(r), np.atleast_1d(t0)
+    n_dias = np.broadcast_to(np.asarray(dias, dtype=np.int64), K.shape).ravel()
+    K, r, t0 = K.ravel(), r.ravel(), t0.ravel()
+
+    max_dias = int(n_dias.max()) if n_dias.size else 0
+    t = np.arange(1, max_dias + 1, dtype=np.float64)
+    pesos = avaliar_logistica(t[None, :], K[:, None], r[:, None], t0[:, None])
+    fases = classificar_fases(pesos, K[:, None])
+
+    dentro = t[None, :] <= n_dias[:, None]
+    pesos = np.where(dentro, pesos, np.nan)
+    fases = np.where(dentro, fases, 0)
+    return pesos, fases, K, r, t0
+
+
+def gerar_curva(p_inicial=5.0, p_final=260.0, dias=35):
+    """
+    Gera a curva de um único plantio como arrays.
+
+    Retorna (dias, pesos, fase_ids, K, r).
+    """
+    K, r, t0 = calcular_parametros(p_inicial, p_final, dias)
+    dias_arr = np.arange(1, int(dias) + 1)
+    pesos = avaliar_logistica(dias_arr, K, r, t0)
+    return dias_arr, pesos, classificar_fases(pesos, K), K, r
+
+
+def gerar_dados_sigmoidal(p_inicial=5.0, p_final=260.0, dias=35):
+    """
+    Gera dados para curva de crescimento no formato de listas usado pelas páginas.
+
+    Retorna (dias_list, pesos_list, fases_list, K, r).
+    """
+    dias_arr, pesos, fase_ids, K, r = gerar_curva(p_inicial, p_final, dias)
+    fases_list = [FASES[int(f)] for f in fase_ids]
+    return dias_arr.tolist(), pesos.tolist(), fases_list, K, r
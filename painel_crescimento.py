@@ -0,0 +1,334 @@
+"""
+    Programa: painel_crescimento.py
+    Função: Painel com todos os plantios ativos de todas as bancadas e estufas
+    Observações:
+        - Todos os plantios vêm de uma única consulta agregada;
+        - As séries longas são reduzidas no servidor (LTTB ou min/max) para um
+          número fixo de pontos por trace;
+        - A cada atualização automática só são recarregados os plantios cujos
+          registros mudaram.
+"""
+
+import streamlit as st
+import sqlite3
+from datetime import date
+import pandas as pd
+import numpy as np
+import plotly.graph_objects as go
+from streamlit_autorefresh import st_autorefresh
+import reducao_series
+import previsao_colheita
+import simulacao_safra
+
+# Configuração inicial da página
+st.set_page_config(
+    page_title="Painel de Crescimento",
+    page_icon="📊",
+    layout="wide",
+    initial_sidebar_state="expanded",
+    menu_items={
+        'About': None,
+        'Get help': None,
+        'Report a bug': None
+    }
+)
+
+DB_NAME = "./dados/hidroponia.db"
+
+CHAVE_PLANTIO = ["cre_bancada_id", "cre_cultivar_id", "cre_data_plantio"]
+
+CORES = ["#43A047", "#1E88E5", "#E53935", "#FB8C00", "#8E24AA", "#00ACC1", "#6D4C41", "#3949AB"]
+
+
+def carregar_assinaturas(conn, apenas_ativos, data_ref):
+    """
+    Resumo barato de cada plantio (quantidade, soma ponderada dos pesos, último dia),
+    usado para descobrir quais plantios mudaram desde a última atualização.
+    """
+    sql = """
+        SELECT cre_bancada_id, cre_cultivar_id, cre_data_plantio,
+               COUNT(*), COUNT(cre_peso_real),
+               TOTAL(cre_peso_real * julianday(cre_data)), MAX(cre_data)
+        FROM tbl_crescimento
+        GROUP BY cre_bancada_id, cre_cultivar_id, cre_data_plantio
+    """
+    params = ()
+    if apenas_ativos:
+        sql += " HAVING MAX(cre_data) >= ?"
+        params = (data_ref.strftime('%Y-%m-%d'),)
+    return {(b, c, d): tuple(resto) for b, c, d, *resto in conn.execute(sql, params)}
+
+
+def carregar_series(conn, chaves):
+    """Carrega, em uma única consulta, os registros e cadastros dos plantios pedidos"""
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS tmp_painel_plantios (
+            bancada_id INTEGER, cultivar_id INTEGER, data_plantio TEXT
+        )
+    """)
+    conn.execute("DELETE FROM tmp_painel_plantios")
+    conn.executemany("INSERT INTO tmp_painel_plantios VALUES (?, ?, ?)", chaves)
+    return pd.read_sql("""
+        SELECT c.cre_bancada_id, c.cre_cultivar_id, c.cre_data_plantio, c.cre_data,
+               c.cre_peso_esperado, c.cre_peso_real,
+               b.bcd_nome, b.bcd_estufa_id,
+               COALESCE(e.est_codigo, 'Sem estufa') AS est_codigo,
+               COALESCE(cv.clt_nome, 'Desconhecido') AS clt_nome
+        FROM tbl_crescimento c
+        JOIN tmp_painel_plantios p
+          ON p.bancada_id = c.cre_bancada_id
+         AND p.cultivar_id = c.cre_cultivar_id
+         AND p.data_plantio = c.cre_data_plantio
+        LEFT JOIN tbl_bancadas b ON b.bcd_id = c.cre_bancada_id
+        LEFT JOIN tbl_estufas e ON e.est_id = b.bcd_estufa_id
+        LEFT JOIN tbl_cultivares cv ON cv.clt_id = c.cre_cultivar_id
+        ORDER BY c.cre_bancada_id, c.cre_cultivar_id, c.cre_data_plantio, c.cre_data
+    """, conn)
+
+
+def resumir_plantio(grupo, n_pontos, metodo, data_ref):
+    """Reduz as séries de um plantio e calcula os indicadores do dia"""
+    datas = pd.to_datetime(grupo["cre_data"]).to_numpy()
+    previsto = grupo["cre_peso_esperado"].to_numpy(dtype=np.float64)
+    real = grupo["cre_peso_real"].to_numpy(dtype=np.float64)
+
+    x_prev, y_prev = reducao_series.reduzir(datas, previsto, n_pontos, metodo)
+    x_real, y_real = reducao_series.reduzir(datas, real, n_pontos, metodo)
+
+    medidos = ~np.isnan(real)
+    ultimo_real = real[medidos][-1] if medidos.any() else np.nan
+    previsto_no_dia = previsto[np.flatnonzero(medidos)[-1]] if medidos.any() else np.nan
+    dia_atual = (np.datetime64(data_ref) - datas[0]).astype("timedelta64[D]").astype(int) + 1
+
+    primeira = grupo.iloc[0]
+    return {
+        "estufa": primeira["est_codigo"],
+        "bancada": primeira["bcd_nome"] if pd.notna(primeira["bcd_nome"]) else f"Bancada {primeira['cre_bancada_id']}",
+        "cultivar": primeira["clt_nome"],
+        "plantio": primeira["cre_data_plantio"],
+        "dias": len(grupo),
+        "dia_atual": int(min(max(dia_atual, 0), len(grupo))),
+        "medicoes": int(medidos.sum()),
+        "ultimo_real": ultimo_real,
+        "desvio": (ultimo_real / previsto_no_dia - 1) * 100 if previsto_no_dia else np.nan,
+        "previsto": (x_prev, y_prev),
+        "real": (x_real, y_real),
+    }
+
+
+def atualizar_painel(apenas_ativos, n_pontos, metodo):
+    """
+    Atualiza o cache do painel na sessão, recarregando apenas os plantios novos
+    ou alterados. Retorna (series, quantidade de plantios recarregados).
+    """
+    config = (apenas_ativos, n_pontos, metodo)
+    cache = st.session_state.get("painel_cache")
+    if cache is None or cache["config"] != config:
+        cache = {"config": config, "assinaturas": {}, "series": {}}
+        st.session_state.painel_cache = cache
+
+    data_ref = date.today()
+    try:
+        conn = sqlite3.connect(DB_NAME)
+        try:
+            assinaturas = carregar_assinaturas(conn, apenas_ativos, data_ref)
+            alterados = [k for k, a in assinaturas.items() if cache["assinaturas"].get(k) != a]
+            df = carregar_series(conn, alterados) if alterados else pd.DataFrame()
+        finally:
+            conn.close()
+    except Exception as e:
+        st.error(f"Erro ao carregar plantios: {e}")
+        return cache["series"], 0
+
+    for chave in set(cache["series"]) - set(assinaturas):
+        del cache["series"][chave]
+    if not df.empty:
+        for chave, grupo in df.groupby(CHAVE_PLANTIO, sort=False):
+            cache["series"][chave] = resumir_plantio(grupo, n_pontos, metodo, data_ref)
+    cache["assinaturas"] = assinaturas
+    return cache["series"], len(alterados)
+
+
+def carregar_previsoes(apenas_ativos):
+    """Previsões de colheita (recalculadas só para os plantios alterados)"""
+    try:
+        df = previsao_colheita.obter_previsoes(apenas_ativos=apenas_ativos)
+    except Exception as e:
+        st.warning(f"Não foi possível calcular as previsões de colheita: {e}")
+        return {}
+    return {
+        (p.pvc_bancada_id, p.pvc_cultivar_id, p.pvc_data_plantio): p
+        for p in df.itertuples(index=False)
+    }
+
+
+def carregar_projecao_safra():
+    """
+    Projeção Monte Carlo por estufa e semana (simulada de novo só se as entradas
+    mudaram), a partir das previsões já atualizadas por carregar_previsoes
+    """
+    try:
+        projecao, _ = simulacao_safra.obter_projecao(atualizar=False)
+        return projecao
+    except Exception as e:
+        st.warning(f"Não foi possível calcular a projeção de safra: {e}")
+        return pd.DataFrame()
+
+
+def criar_grafico_safra(projecao):
+    """Barras com a mediana (P50) por semana e faixa P10-P90, uma série por estufa"""
+    fig = go.Figure()
+    for i, (estufa, df) in enumerate(projecao.groupby("estufa", sort=True)):
+        fig.add_bar(
+            x=pd.to_datetime(df["semana"]), y=df["p50_kg"], name=f"Estufa {estufa}",
+            marker_color=CORES[i % len(CORES)],
+            error_y=dict(
+                type="data", symmetric=False,
+                array=df["p90_kg"] - df["p50_kg"], arrayminus=df["p50_kg"] - df["p10_kg"]
+            ),
+            customdata=df[["p10_kg", "p90_kg"]].to_numpy(),
+            hovertemplate="<b>Semana de %{x|%d/%m/%Y}</b><br>P50: %{y:.1f} kg"
+                          "<br>P10-P90: %{customdata[0]:.1f}-%{customdata[1]:.1f} kg<extra></extra>"
+        )
+    fig.update_layout(
+        height=380,
+        barmode="group",
+        title=dict(text="Massa colhida por semana (P10/P50/P90)", x=0.5, xanchor="center"),
+        yaxis=dict(title="kg"),
+        xaxis=dict(tickformat="%d/%m"),
+        plot_bgcolor="white",
+        legend=dict(orientation="h", yanchor="top", y=-0.15, xanchor="center", x=0.5),
+        margin=dict(t=50, b=40, l=40, r=20)
+    )
+    return fig
+
+
+def criar_grafico_estufa(estufa, series):
+    """Um gráfico por estufa, com o peso real e o previsto de cada plantio"""
+    fig = go.Figure()
+    for i, s in enumerate(series):
+        cor = CORES[i % len(CORES)]
+        nome = f"{s['bancada']} · {s['cultivar']} ({s['plantio']})"
+        fig.add_scatter(
+            x=s["real"][0], y=s["real"][1],
+            mode="lines+markers", name=nome, legendgroup=nome,
+            line=dict(color=cor), marker=dict(size=5),
+            hovertemplate="<b>%{x|%d/%m/%Y}</b><br>Peso real: %{y:.1f} g<extra>" + nome + "</extra>"
+        )
+        fig.add_scatter(
+            x=s["previsto"][0], y=s["previsto"][1],
+            mode="lines", name=nome, legendgroup=nome, showlegend=False,
+            line=dict(color=cor, dash="dot", width=1),
+            hovertemplate="<b>%{x|%d/%m/%Y}</b><br>Peso previsto: %{y:.1f} g<extra>" + nome + "</extra>"
+        )
+    fig.update_layout(
+        height=420,
+        title=dict(text=f"Estufa {estufa}", x=0.5, xanchor="center"),
+        yaxis=dict(title="Peso (g)"),
+        xaxis=dict(tickformat="%d/%m"),
+        plot_bgcolor="white",
+        legend=dict(orientation="h", yanchor="top", y=-0.15, xanchor="center", x=0.5),
+        margin=dict(t=50, b=40, l=40, r=20)
+    )
+    return fig
+
+
+def main():
+    with st.sidebar:
+        st.markdown("<h2 style='margin:0; padding:0; margin-top:0; padding-top:0; margin-bottom:0;'>📊 Painel</h2>",
+                    unsafe_allow_html=True)
+
+        apenas_ativos = not st.checkbox("Incluir plantios encerrados", value=False, key="painel_encerrados")
+        n_pontos = st.slider("Pontos por curva", 20, 365, 120, step=10, key="painel_pontos")
+        metodo = st.selectbox(
+            "Redução das séries",
+            options=list(reducao_series.METODOS),
+            format_func=lambda m: {"lttb": "LTTB (forma da curva)", "minmax": "Mín./máx. por faixa"}[m],
+            key="painel_metodo"
+        )
+        intervalo = st.selectbox(
+            "Atualização automática",
+            options=[0, 30, 60, 300],
+            index=2,
+            format_func=lambda s: "Desligada" if s == 0 else f"A cada {s} s",
+            key="painel_intervalo"
+        )
+
+    if intervalo:
+        st_autorefresh(interval=intervalo * 1000, key="painel_autorefresh")
+
+    series, recarregados = atualizar_painel(apenas_ativos, n_pontos, metodo)
+    previsoes = carregar_previsoes(apenas_ativos)
+
+    st.sidebar.caption(f"{len(series)} plantios; {recarregados} recarregados nesta atualização.")
+
+    if not series:
+        st.info("Nenhum plantio ativo encontrado.")
+    else:
+        resumo = pd.DataFrame([
+            {
+                "Estufa": s["estufa"],
+                "Bancada": s["bancada"],
+                "Cultivar": s["cultivar"],
+                "Plantio": s["plantio"],
+                "Dia": f"{s['dia_atual']}/{s['dias']}",
+                "Medições": s["medicoes"],
+                "Último peso real (g)": s["ultimo_real"],
+                "Desvio do previsto (%)": s["desvio"],
+                "Colheita prevista": (previsoes[chave].pvc_data_colheita or "Abaixo do alvo") if chave in previsoes else None,
+                "Peso na colheita (g)": previsoes[chave].pvc_peso_colheita if chave in previsoes else None,
+            }
+            for chave, s in series.items()
+        ]).sort_values(["Estufa", "Bancada", "Plantio"])
+        st.dataframe(
+            resumo,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Último peso real (g)": st.column_config.NumberColumn(format="%.1f"),
+                "Desvio do previsto (%)": st.column_config.NumberColumn(format="%+.1f"),
+                "Peso na colheita (g)": st.column_config.NumberColumn(format="%.1f"),
+            }
+        )
+
+        por_estufa = {}
+        for s in series.values():
+            por_estufa.setdefault(s["estufa"], []).append(s)
+        for estufa in sorted(por_estufa):
+            st.plotly_chart(criar_grafico_estufa(estufa, por_estufa[estufa]),
+                            use_container_width=True, key=f"painel_estufa_{estufa}")
+
+    with st.expander("🎲 Projeção de safra (Monte Carlo)"):
+        projecao = carregar_projecao_safra()
+        if projecao.empty:
+            st.info("Sem plantios ativos com previsão de colheita.")
+        else:
+            st.plotly_chart(criar_grafico_safra(projecao), use_container_width=True, key="painel_safra")
+            st.dataframe(
+                projecao.rename(columns={
+                    "estufa": "Estufa", "semana": "Semana", "p10_kg": "P10 (kg)", "p50_kg": "P50 (kg)",
+                    "p90_kg": "P90 (kg)", "media_kg": "Média (kg)", "plantios": "Plantios",
+                }),
+                hide_index=True,
+                use_container_width=True,
+                column_config={c: st.column_config.NumberColumn(format="%.1f")
+                               for c in ["P10 (kg)", "P50 (kg)", "P90 (kg)", "Média (kg)"]}
+            )
+            st.caption(f"{simulacao_safra.N_CENARIOS} cenários por plantio; "
+                       "recalculado apenas quando plantios, previsões ou bancadas mudam.")
+
+    col1, col2 = st.sidebar.columns([1, 1])
+    with col1:
+        if st.button("← Voltar", key="btn_back_painel", use_container_width=True):
+            st.session_state.current_page = "home"
+            st.rerun()
+    with col2:
+        if st.button("🚪 Sair", key="btn_logout_painel", use_container_width=True):
+            st.session_state.logged_in = False
+            st.session_state.user_name = ""
+            st.session_state.user_id = None
+            st.session_state.current_page = "login"
+            st.rerun()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+# previsao_colheita.py
+
+"""
+    Previsão de colheita para todos os plantios ativos.
+
+    Para cada plantio projeta o dia em que o peso atinge clt_peso_colheita e o peso
+    esperado nesse dia. A curva base é a ajustada aos pesos reais (ajuste_crescimento)
+    ou, sem medições suficientes, a curva teórica de cre_peso_esperado; o nível da
+    curva é corrigido pelo desvio das medições mais recentes. O cálculo é feito em
+    lote (matriz plantios x dias) e gravado em tbl_previsoes_colheita, sendo refeito
+    apenas para os plantios cujas medições ou cultivar mudaram.
+
+    Uso em lote (ex.: cron):
+        python previsao_colheita.py [--todos] [--forcar]
+"""
+
+import argparse
+import hashlib
+import sqlite3
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import ajuste_crescimento
+import modelo_crescimento
+
+DB_NAME = "./dados/hidroponia.db"
+
+# Quantidade de medições recentes usadas para medir o desvio
+JANELA_DESVIO = 7
+# A projeção procura a colheita até FATOR_HORIZONTE x o período planejado
+FATOR_HORIZONTE = 2.0
+# Limites da correção de nível aplicada sobre a curva ajustada
+FATOR_MINIMO = 0.8
+FATOR_MAXIMO = 1.25
+
+SQL_CRIAR_TABELA = """
+    CREATE TABLE IF NOT EXISTS tbl_previsoes_colheita (
+        pvc_bancada_id INTEGER NOT NULL,
+        pvc_cultivar_id INTEGER NOT NULL,
+        pvc_data_plantio TEXT NOT NULL,
+        pvc_base TEXT,
+        pvc_peso_alvo REAL,
+        pvc_dia_colheita INTEGER,
+        pvc_data_colheita TEXT,
+        pvc_peso_colheita REAL,
+        pvc_desvio_recente REAL,
+        pvc_assinatura TEXT,
+        pvc_atualizado_em TEXT,
+        PRIMARY KEY (pvc_bancada_id, pvc_cultivar_id, pvc_data_plantio)
+    )
+"""
+
+CHAVE = ["aju_bancada_id", "aju_cultivar_id", "aju_data_plantio"]
+
+
+def criar_tabela(conn):
+    """Cria a tabela de previsões, se ainda não existir"""
+    conn.execute(SQL_CRIAR_TABELA)
+
+
+def _filtro_ativos(apenas_ativos, data_ref):
+    if not apenas_ativos:
+        return "", ()
+    return (
+        " WHERE date(a.aju_data_plantio, '+' || (a.aju_dias - 1) || ' days') >= ?",
+        (data_ref.strftime('%Y-%m-%d'),)
+    )
+
+
+def _carregar_pendentes(conn, apenas_ativos, data_ref, forcar):
+    """Plantios cuja assinatura (medições + cultivar) difere da previsão gravada"""
+    filtro, params = _filtro_ativos(apenas_ativos, data_ref)
+    df = pd.read_sql(f"""
+        SELECT a.aju_bancada_id, a.aju_cultivar_id, a.aju_data_plantio, a.aju_modelo,
+               a.aju_K, a.aju_r, a.aju_t0, a.aju_nu, a.aju_dias, a.aju_assinatura,
+               cv.clt_peso_colheita, p.pvc_assinatura
+        FROM tbl_crescimento_ajustes a
+        LEFT JOIN tbl_cultivares cv ON cv.clt_id = a.aju_cultivar_id
+        LEFT JOIN tbl_previsoes_colheita p
+          ON p.pvc_bancada_id = a.aju_bancada_id
+         AND p.pvc_cultivar_id = a.aju_cultivar_id
+         AND p.pvc_data_plantio = a.aju_data_plantio
+        {filtro}
+    """, conn, params=params)
+
+    df["assinatura"] = [
+        hashlib.sha1(f"{a}|{alvo}".encode("utf-8")).hexdigest()
+        for a, alvo in zip(df["aju_assinatura"], df["clt_peso_colheita"])
+    ]
+    if not forcar:
+        df = df[df["assinatura"] != df["pvc_assinatura"]]
+    return df.reset_index(drop=True)
+
+
+def _curvas_base(plantios, medicoes, t):
+    """
+    Matriz (plantios x dias) da curva base: a ajustada quando existe, senão a
+    curva teórica reconstruída a partir de cre_peso_esperado.
+    """
+    n = len(plantios)
+    base = np.full((n, len(t)), np.nan)
+    modelos = plantios["aju_modelo"].to_numpy(dtype=object)
+    K = plantios["aju_K"].to_numpy(dtype=np.float64)
+    r = plantios["aju_r"].to_numpy(dtype=np.float64)
+    t0 = plantios["aju_t0"].to_numpy(dtype=np.float64)
+    nu = plantios["aju_nu"].to_numpy(dtype=np.float64)
+
+    for modelo, n_param in ajuste_crescimento.MODELOS.items():
+        sel = modelos == modelo
+        if sel.any():
+            base[sel] = ajuste_crescimento.avaliar_modelo(
+                modelo, t[None, :], K[sel, None], r[sel, None], t0[sel, None],
+                nu[sel, None] if n_param == 4 else None
+            )
+
+    sem_ajuste = pd.isna(plantios["aju_modelo"]).to_numpy()
+    if sem_ajuste.any():
+        esperado = medicoes.dropna(subset=["cre_peso_esperado"]).groupby("idx")["cre_peso_esperado"]
+        p_inicial = esperado.first().reindex(range(n)).to_numpy()
+        p_final = esperado.last().reindex(range(n)).to_numpy()
+        dias = plantios["aju_dias"].to_numpy(dtype=np.float64)
+        K_t, r_t, t0_t = modelo_crescimento.calcular_parametros_lote(
+            np.nan_to_num(p_inicial[sem_ajuste], nan=5.0),
+            np.nan_to_num(p_final[sem_ajuste], nan=0.0),
+            dias[sem_ajuste]
+        )
+        base[sem_ajuste] = modelo_crescimento.avaliar_logistica(
+            t[None, :], K_t[:, None], r_t[:, None], t0_t[:, None]
+        )
+    return base, sem_ajuste
+
+
+def projetar(plantios, medicoes):
+    """
+    Projeta, em lote, dia e peso de colheita dos plantios informados.
+
+    plantios: linhas de tbl_crescimento_ajustes (+ clt_peso_colheita);
+    medicoes: registros de tbl_crescimento desses plantios (carregar_medicoes).
+    """
+    n = len(plantios)
+    dias_planejados = plantios["aju_dias"].to_numpy(dtype=np.int64)
+    horizonte = int(np.ceil(dias_planejados.max() * FATOR_HORIZONTE))
+    t = np.arange(1, horizonte + 1, dtype=np.float64)
+
+    # Índice do plantio em cada medição
+    indice = pd.DataFrame({
+        "cre_bancada_id": plantios["aju_bancada_id"],
+        "cre_cultivar_id": plantios["aju_cultivar_id"],
+        "cre_data_plantio": plantios["aju_data_plantio"],
+        "idx": np.arange(n),
+    })
+    medicoes = medicoes.merge(indice, on=["cre_bancada_id", "cre_cultivar_id", "cre_data_plantio"])
+
+    base, sem_ajuste = _curvas_base(plantios, medicoes, t)
+
+    # Desvio das últimas medições: em relação a cre_peso_esperado e à curva base
+    recentes = (
+        medicoes[medicoes["cre_peso_real"].notna() & (medicoes["dia"] <= horizonte)]
+        .groupby("idx").tail(JANELA_DESVIO)
+    )
+    idx = recentes["idx"].to_numpy()
+    real = recentes["cre_peso_real"].to_numpy(dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        razao_esperado = real / recentes["cre_peso_esperado"].to_numpy(dtype=np.float64)
+        razao_base = real / base[idx, recentes["dia"].to_numpy() - 1]
+    desvios = pd.DataFrame({"idx": idx, "esperado": razao_esperado, "base": razao_base})
+    desvios = desvios.replace([np.inf, -np.inf], np.nan).groupby("idx").median().reindex(range(n))
+    desvio_recente = desvios["esperado"].to_numpy() - 1.0
+
+    # A curva ajustada já segue as medições: só uma correção de nível limitada.
+    # A curva teórica é escalada pelo desvio observado em relação a cre_peso_esperado.
+    fator = np.where(
+        sem_ajuste,
+        np.nan_to_num(desvios["esperado"].to_numpy(), nan=1.0),
+        np.clip(np.nan_to_num(desvios["base"].to_numpy(), nan=1.0), FATOR_MINIMO, FATOR_MAXIMO)
+    )
+    projecao = base * fator[:, None]
+
+    alvo = plantios["clt_peso_colheita"].to_numpy(dtype=np.float64)
+    atinge = projecao >= np.where(alvo > 0, alvo, np.inf)[:, None]
+    alcancado = atinge.any(axis=1)
+    dia_colheita = np.where(alcancado, atinge.argmax(axis=1) + 1, dias_planejados)
+    peso_colheita = projecao[np.arange(n), dia_colheita - 1]
+
+    plantio = pd.to_datetime(plantios["aju_data_plantio"])
+    data_colheita = plantio + pd.to_timedelta(dia_colheita - 1, unit="D")
+
+    return pd.DataFrame({
+        "bancada_id": plantios["aju_bancada_id"].to_numpy(),
+        "cultivar_id": plantios["aju_cultivar_id"].to_numpy(),
+        "data_plantio": plantios["aju_data_plantio"].to_numpy(),
+        "base": np.where(sem_ajuste, "esperado", plantios["aju_modelo"].to_numpy(dtype=object)),
+        "peso_alvo": alvo,
+        "dia_colheita": np.where(alcancado, dia_colheita, -1),
+        "data_colheita": np.where(alcancado, data_colheita.dt.strftime('%Y-%m-%d'), None),
+        "peso_colheita": peso_colheita,
+        "desvio_recente": desvio_recente,
+    })
+
+
+def atualizar_previsoes(conn=None, apenas_ativos=True, forcar=False, data_ref=None):
+    """
+    Atualiza os ajustes e as previsões dos plantios com medições novas ou alteradas.
+
+    Retorna o número de previsões recalculadas.
+    """
+    data_ref = data_ref or date.today()
+    fechar = conn is None
+    if fechar:
+        conn = sqlite3.connect(DB_NAME)
+    try:
+        criar_tabela(conn)
+        ajuste_crescimento.atualizar_ajustes(conn, apenas_ativos=apenas_ativos, data_ref=data_ref)
+        pendentes = _carregar_pendentes(conn, apenas_ativos, data_ref, forcar)
+        if pendentes.empty:
+            return 0
+
+        medicoes = ajuste_crescimento.carregar_medicoes(
+            conn, plantios=pendentes[CHAVE].itertuples(index=False, name=None)
+        )
+        previsoes = projetar(pendentes, medicoes)
+        agora = datetime.now().isoformat(timespec="seconds")
+
+        def _valor(v):
+            return None if v is None or pd.isna(v) else float(v)
+
+        linhas = [
+            (
+                int(p.bancada_id), int(p.cultivar_id), p.data_plantio, p.base,
+                _valor(p.peso_alvo),
+                int(p.dia_colheita) if p.dia_colheita > 0 else None,
+                p.data_colheita,
+                _valor(p.peso_colheita),
+                _valor(p.desvio_recente),
+                assinatura,
+                agora
+            )
+            for p, assinatura in zip(previsoes.itertuples(index=False), pendentes["assinatura"])
+        ]
+        conn.executemany("""
+            INSERT OR REPLACE INTO tbl_previsoes_colheita (
+                pvc_bancada_id, pvc_cultivar_id, pvc_data_plantio, pvc_base, pvc_peso_alvo,
+                pvc_dia_colheita, pvc_data_colheita, pvc_peso_colheita, pvc_desvio_recente,
+                pvc_assinatura, pvc_atualizado_em
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, linhas)
+        conn.commit()
+        return len(linhas)
+    finally:
+        if fechar:
+            conn.close()
+
+
+def obter_previsoes(conn=None, apenas_ativos=True, data_ref=None, atualizar=True):
+    """
+    Atualiza o que for preciso e devolve as previsões dos plantios como DataFrame.
+    atualizar=False só lê as previsões gravadas (quem chama já as atualizou).
+    """
+    data_ref = data_ref or date.today()
+    fechar = conn is None
+    if fechar:
+        conn = sqlite3.connect(DB_NAME)
+    try:
+        if atualizar:
+            atualizar_previsoes(conn, apenas_ativos=apenas_ativos, data_ref=data_ref)
+        filtro, params = _filtro_ativos(apenas_ativos, data_ref)
+        return pd.read_sql(f"""
+            SELECT p.*
+            FROM tbl_previsoes_colheita p
+            JOIN tbl_crescimento_ajustes a
+              ON a.aju_bancada_id = p.pvc_bancada_id
+             AND a.aju_cultivar_id = p.pvc_cultivar_id
+             AND a.aju_data_plantio = p.pvc_data_plantio
+            {filtro}
+            ORDER BY p.pvc_data_colheita
+        """, conn, params=params)
+    finally:
+        if fechar:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza as previsões de colheita dos plantios")
+    parser.add_argument("--todos", action="store_true", help="inclui plantios já encerrados")
+    parser.add_argument("--forcar", action="store_true", help="recalcula mesmo sem alterações")
+    args = parser.parse_args()
+
+    qtd = atualizar_previsoes(apenas_ativos=not args.todos, forcar=args.forcar)
+    print(f"Previsões recalculadas: {qtd}")
+
+
+if __name__ == "__main__":
+    main()
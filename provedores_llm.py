@@ -0,0 +1,519 @@
+# provedores_llm.py
+
+"""
+    Camada única de acesso aos LLMs remotos dos chatbots (chatbot_ollama.py,
+    chatbot_deepseek.py e chatbot_gemini.py), em asyncio.
+
+    Cada provedor (Together, DeepSeek e OpenAI, com a API de chat da OpenAI, e
+    Gemini, com a API REST do Google) transmite a resposta como pedaços de
+    texto pela mesma interface. Os provedores são compartilhados pelo processo:
+    cada um tem um httpx.AsyncClient com pool de conexões keep-alive, timeouts
+    de conexão e de leitura e novas tentativas com espera exponencial com
+    jitter em 429/5xx e falhas de conexão, e guarda as latências (tempo até o
+    primeiro token e total) das últimas chamadas.
+
+    O Roteador pede a resposta ao primeiro provedor da lista e passa ao
+    seguinte quando o provedor falha ou não manda o primeiro token dentro do
+    prazo. Com atraso_hedge, se o primeiro token não chegar nesse tempo, o
+    próximo provedor é acionado em paralelo (pedido "hedged") e vale a resposta
+    que começar primeiro; a outra é cancelada. Depois do primeiro token não há
+    troca de provedor.
+
+    As corrotinas rodam num laço de eventos numa thread daemon; as páginas do
+    Streamlit usam transmitir() e completar(), que são síncronas. As URLs vêm
+    de PROVEDORES; nos testes (benchmarks/testar_provedores.py), um transporte
+    httpx simulado substitui a rede.
+"""
+
+import asyncio
+import json
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import httpx
+import numpy as np
+
+# Segundos para abrir a conexão e para esperar cada pedaço da resposta
+TIMEOUT_CONEXAO = 5
+TIMEOUT_LEITURA = 60
+# Novas tentativas em 429/5xx ou falha de conexão, com espera exponencial (base e teto, em segundos)
+TENTATIVAS = 3
+ESPERA_BASE = 0.5
+ESPERA_MAXIMA = 8.0
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+# Conexões mantidas abertas por provedor (sessões do Streamlit perguntando ao mesmo tempo)
+TAMANHO_POOL = 10
+# Chamadas consideradas nas latências
+JANELA_METRICAS = 200
+# Prazo para o primeiro token antes de passar ao próximo provedor e atraso
+# padrão do pedido paralelo (hedge), em segundos
+PRAZO_TTFT = 15.0
+ATRASO_HEDGE = 3.0
+
+GEMINI_SEGURANCA = [
+    {"category": f"HARM_CATEGORY_{categoria}", "threshold": "BLOCK_NONE"}
+    for categoria in ("HATE_SPEECH", "HARASSMENT", "SEXUALLY_EXPLICIT", "DANGEROUS_CONTENT")
+]
+
+
+class ErroAPI(Exception):
+    """Resposta de erro da API (status HTTP e mensagem), depois das novas tentativas"""
+
+    def __init__(self, status, mensagem):
+        super().__init__(f"Erro na API ({status}): {mensagem}")
+        self.status = status
+        self.mensagem = mensagem
+
+
+class ErroProvedores(Exception):
+    """Nenhum provedor respondeu; falhas traz (provedor, erro) de cada tentativa"""
+
+    def __init__(self, falhas):
+        self.falhas = falhas
+        detalhes = "; ".join(f"{nome}: {erro}" for nome, erro in falhas) or "nenhum provedor configurado"
+        super().__init__(f"Nenhum provedor respondeu ({detalhes})")
+
+
+def mensagem_erro(corpo):
+    try:
+        erro = json.loads(corpo)
+    except ValueError:
+        return corpo[:200] or "Erro desconhecido"
+    if isinstance(erro, list) and erro:
+        erro = erro[0]
+    erro = erro.get("error", "Erro desconhecido") if isinstance(erro, dict) else erro
+    return erro.get("message", "Erro desconhecido") if isinstance(erro, dict) else str(erro)
+
+
+def espera(tentativa, retry_after=None):
+    """Segundos até a próxima tentativa: Retry-After da API ou exponencial com jitter completo"""
+    if retry_after:
+        try:
+            return min(float(retry_after), ESPERA_MAXIMA)
+        except ValueError:
+            pass
+    return random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** tentativa))
+
+
+def percentis(valores):
+    if not valores:
+        return {"p50": None, "p95": None}
+    return {"p50": float(np.percentile(valores, 50)), "p95": float(np.percentile(valores, 95))}
+
+
+class Provedor:
+    """
+    Um LLM remoto (nome, modelo, URL base e chave). As subclasses montam a
+    requisição e extraem o texto de cada evento do streaming (SSE).
+    """
+
+    def __init__(self, nome, modelo, url, api_key, tentativas=TENTATIVAS, transporte=None):
+        self.nome = nome
+        self.modelo = modelo
+        self.url = url.rstrip("/")
+        self.api_key = api_key
+        self.tentativas = tentativas
+        # Transporte httpx no lugar da rede (ex.: httpx.MockTransport); None usa a rede
+        self.transporte = transporte
+        self._cliente = None
+        self._trava = threading.Lock()
+        self._ttft = deque(maxlen=JANELA_METRICAS)
+        self._total = deque(maxlen=JANELA_METRICAS)
+        self.chamadas = 0
+        self.tentativas_extras = 0
+        self.erros = 0
+
+    def requisicao(self, instrucao, mensagens, opcoes):
+        """(endpoint, cabeçalhos, corpo JSON) da chamada com streaming"""
+        raise NotImplementedError
+
+    def texto_evento(self, dados):
+        """Texto de um evento do streaming (None se não houver)"""
+        raise NotImplementedError
+
+    def cliente(self):
+        # Criado no laço de eventos que vai usá-lo
+        if self._cliente is None:
+            self._cliente = httpx.AsyncClient(
+                timeout=httpx.Timeout(TIMEOUT_LEITURA, connect=TIMEOUT_CONEXAO),
+                limits=httpx.Limits(max_connections=TAMANHO_POOL, max_keepalive_connections=TAMANHO_POOL),
+                transport=self.transporte,
+            )
+        return self._cliente
+
+    async def _enviar(self, instrucao, mensagens, opcoes):
+        """Resposta 200 em streaming, repetindo a requisição em 429/5xx e falhas de conexão"""
+        endpoint, cabecalhos, corpo = self.requisicao(instrucao, mensagens, opcoes)
+        cliente = self.cliente()
+        for tentativa in range(self.tentativas + 1):
+            ultima = tentativa == self.tentativas
+            try:
+                resposta = await cliente.send(cliente.build_request("POST", endpoint, headers=cabecalhos, json=corpo), stream=True)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError, httpx.PoolTimeout):
+                if ultima:
+                    raise
+                pausa = espera(tentativa)
+            else:
+                if resposta.status_code == 200:
+                    return resposta
+                # O corpo do erro é lido para a conexão voltar ao pool
+                corpo_erro = (await resposta.aread()).decode("utf-8", "replace")
+                await resposta.aclose()
+                if resposta.status_code not in STATUS_REPETIR or ultima:
+                    raise ErroAPI(resposta.status_code, mensagem_erro(corpo_erro))
+                pausa = espera(tentativa, resposta.headers.get("Retry-After"))
+            with self._trava:
+                self.tentativas_extras += 1
+            await asyncio.sleep(pausa)
+
+    async def transmitir(self, instrucao, mensagens, **opcoes):
+        """
+        Pedaços de texto da resposta. mensagens: [{"role": "user" | "assistant",
+        "content": texto}]; opcoes: max_tokens, temperature, top_p, top_k, stop.
+        """
+        inicio = time.perf_counter()
+        ttft = None
+        try:
+            resposta = await self._enviar(instrucao, mensagens, opcoes)
+            try:
+                async for linha in resposta.aiter_lines():
+                    if not linha.startswith("data: ") or linha[6:] == "[DONE]":
+                        continue
+                    try:
+                        texto = self.texto_evento(json.loads(linha[6:]))
+                    except json.JSONDecodeError:
+                        continue
+                    if texto:
+                        if ttft is None:
+                            ttft = time.perf_counter() - inicio
+                        yield texto
+            finally:
+                await resposta.aclose()
+        except Exception:
+            self._registrar(None, None, erro=True)
+            raise
+        self._registrar(ttft, time.perf_counter() - inicio)
+
+    def _registrar(self, ttft, duracao, erro=False):
+        with self._trava:
+            self.chamadas += 1
+            if erro:
+                self.erros += 1
+                return
+            if ttft is not None:
+                self._ttft.append(ttft)
+            self._total.append(duracao)
+
+    def estatisticas(self):
+        """Chamadas, tentativas extras, erros e p50/p95 (s) do TTFT e do tempo total das últimas chamadas"""
+        with self._trava:
+            ttft, total = list(self._ttft), list(self._total)
+            return {
+                "chamadas": self.chamadas,
+                "tentativas_extras": self.tentativas_extras,
+                "erros": self.erros,
+                "ttft": percentis(ttft),
+                "total": percentis(total),
+            }
+
+
+class ProvedorOpenAI(Provedor):
+    """API de chat no formato da OpenAI (OpenAI, DeepSeek, Together)"""
+
+    def requisicao(self, instrucao, mensagens, opcoes):
+        corpo = {
+            "model": self.modelo,
+            "messages": [{"role": "system", "content": instrucao}] + list(mensagens),
+            "stream": True,
+        }
+        for chave in ("max_tokens", "temperature", "top_p", "stop"):
+            if opcoes.get(chave) is not None:
+                corpo[chave] = opcoes[chave]
+        return f"{self.url}/chat/completions", {"Authorization": f"Bearer {self.api_key}"}, corpo
+
+    def texto_evento(self, dados):
+        if dados.get("choices"):
+            return dados["choices"][0].get("delta", {}).get("content")
+        return None
+
+
+class ProvedorGemini(Provedor):
+    """API REST do Gemini (streamGenerateContent com SSE)"""
+
+    def requisicao(self, instrucao, mensagens, opcoes):
+        configuracao = {"candidateCount": 1}
+        for chave, nome in (("max_tokens", "maxOutputTokens"), ("temperature", "temperature"),
+                            ("top_p", "topP"), ("top_k", "topK"), ("stop", "stopSequences")):
+            if opcoes.get(chave) is not None:
+                configuracao[nome] = opcoes[chave]
+        corpo = {
+            "systemInstruction": {"parts": [{"text": instrucao}]},
+            "contents": [
+                {"role": "model" if m["role"] == "assistant" else "user", "parts": [{"text": m["content"]}]}
+                for m in mensagens
+            ],
+            "generationConfig": configuracao,
+            "safetySettings": GEMINI_SEGURANCA,
+        }
+        endpoint = f"{self.url}/models/{self.modelo}:streamGenerateContent?alt=sse"
+        return endpoint, {"x-goog-api-key": self.api_key}, corpo
+
+    def texto_evento(self, dados):
+        candidatos = dados.get("candidates") or [{}]
+        partes = candidatos[0].get("content", {}).get("parts", [])
+        return "".join(parte.get("text", "") for parte in partes) or None
+
+
+# Provedores conhecidos: classe, chave em st.secrets, URL base e modelo padrão
+PROVEDORES = {
+    "Together": (ProvedorOpenAI, "TOGETHER_API_KEY", "https://api.together.xyz/v1", "mistralai/Mistral-7B-Instruct-v0.1"),
+    "DeepSeek": (ProvedorOpenAI, "DEEPSEEK_API_KEY", "https://api.deepseek.com/v1", "deepseek-chat"),
+    "OpenAI": (ProvedorOpenAI, "OPENAI_API_KEY", "https://api.openai.com/v1", "gpt-3.5-turbo"),
+    "Gemini": (ProvedorGemini, "GOOGLE_API_KEY", "https://generativelanguage.googleapis.com/v1beta", "gemini-1.5-flash-latest"),
+}
+
+# Preço de referência dos modelos padrão, em US$ por milhão de tokens (entrada, saída), para
+# estimar o custo das chamadas (cache de respostas)
+PRECOS = {
+    "Together": (0.20, 0.20),
+    "DeepSeek": (0.27, 1.10),
+    "OpenAI": (0.50, 1.50),
+    "Gemini": (0.075, 0.30),
+}
+
+
+def custo(provedor, tokens_entrada, tokens_saida):
+    """Custo estimado (US$) de uma chamada ao provedor"""
+    entrada, saida = PRECOS.get(provedor.nome, (0.0, 0.0))
+    return (tokens_entrada * entrada + tokens_saida * saida) / 1_000_000
+
+
+_provedores = {}
+_trava_provedores = threading.Lock()
+
+
+def obter_provedor(nome, api_key, modelo=None):
+    """Provedor compartilhado (um por processo) para o nome, a chave e o modelo"""
+    classe, _, url, padrao = PROVEDORES[nome]
+    modelo = modelo or padrao
+    with _trava_provedores:
+        chave = (nome, url, api_key, modelo)
+        if chave not in _provedores:
+            _provedores[chave] = classe(nome, modelo, url, api_key)
+        return _provedores[chave]
+
+
+def provedores_configurados(segredos, ordem, modelos=None):
+    """Provedores de ordem (nomes em PROVEDORES) cuja chave está em segredos (st.secrets), na mesma ordem"""
+    modelos = modelos or {}
+    lista = []
+    for nome in ordem:
+        try:
+            api_key = segredos[PROVEDORES[nome][1]]
+        except (KeyError, FileNotFoundError):
+            continue
+        lista.append(obter_provedor(nome, api_key, modelos.get(nome)))
+    return lista
+
+
+async def _descartar(tarefa, gerador):
+    tarefa.cancel()
+    await asyncio.gather(tarefa, return_exceptions=True)
+    try:
+        await gerador.aclose()
+    except Exception:
+        pass
+
+
+class Roteador:
+    """
+    Resposta do primeiro provedor que começar a transmitir, com troca de
+    provedor em erro ou sem o primeiro token em prazo_ttft segundos e, se
+    atraso_hedge não for None, pedido paralelo ao próximo depois desse atraso.
+    """
+
+    def __init__(self, provedores, prazo_ttft=PRAZO_TTFT, atraso_hedge=None):
+        self.provedores = list(provedores)
+        self.prazo_ttft = prazo_ttft
+        self.atraso_hedge = atraso_hedge
+        self.falhas = []
+        self.vencedor = None
+
+    async def transmitir(self, instrucao, mensagens, **opcoes):
+        """Pedaços (nome do provedor, texto) da resposta escolhida"""
+        laco = asyncio.get_running_loop()
+        pendentes = list(self.provedores)
+        tentativas = {}  # tarefa do primeiro pedaço -> (provedor, gerador, início)
+        ultimo_disparo = laco.time()
+
+        def disparar():
+            nonlocal ultimo_disparo
+            provedor = pendentes.pop(0)
+            gerador = provedor.transmitir(instrucao, mensagens, **opcoes)
+            ultimo_disparo = laco.time()
+            tentativas[asyncio.ensure_future(gerador.__anext__())] = (provedor, gerador, ultimo_disparo)
+
+        vencedor = None
+        try:
+            while vencedor is None:
+                if not tentativas:
+                    if not pendentes:
+                        raise ErroProvedores(self.falhas)
+                    disparar()
+                # Próximo prazo: primeiro token de alguma tentativa ou pedido paralelo (só se houver reserva)
+                prazos = []
+                if pendentes:
+                    prazos = [inicio + self.prazo_ttft for _, _, inicio in tentativas.values()]
+                    if self.atraso_hedge is not None:
+                        prazos.append(ultimo_disparo + self.atraso_hedge)
+                timeout = max(0.0, min(prazos) - laco.time()) if prazos else None
+                feitas, _ = await asyncio.wait(tentativas, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for tarefa in feitas:
+                    provedor, gerador, _ = tentativas.pop(tarefa)
+                    try:
+                        primeiro = tarefa.result()
+                    except StopAsyncIteration:
+                        self.falhas.append((provedor.nome, ValueError("resposta vazia")))
+                    except Exception as e:
+                        self.falhas.append((provedor.nome, e))
+                    else:
+                        if vencedor is None:
+                            vencedor = (provedor, gerador, primeiro)
+                            continue
+                    await _descartar(tarefa, gerador)
+                if vencedor is not None or not pendentes:
+                    continue
+                agora = laco.time()
+                for tarefa, (provedor, gerador, inicio) in list(tentativas.items()):
+                    if agora >= inicio + self.prazo_ttft:
+                        del tentativas[tarefa]
+                        await _descartar(tarefa, gerador)
+                        self.falhas.append((provedor.nome, TimeoutError(f"sem o primeiro token em {self.prazo_ttft:g} s")))
+                if tentativas and self.atraso_hedge is not None and agora >= ultimo_disparo + self.atraso_hedge:
+                    disparar()
+        finally:
+            for tarefa, (_, gerador, _) in tentativas.items():
+                await _descartar(tarefa, gerador)
+
+        provedor, gerador, primeiro = vencedor
+        self.vencedor = provedor.nome
+        try:
+            yield provedor.nome, primeiro
+            async for texto in gerador:
+                yield provedor.nome, texto
+        finally:
+            await gerador.aclose()
+
+
+_laco = None
+_trava_laco = threading.Lock()
+
+
+def laco_eventos():
+    """Laço de eventos do processo (thread daemon), onde rodam os provedores"""
+    global _laco
+    with _trava_laco:
+        if _laco is None:
+            _laco = asyncio.new_event_loop()
+            threading.Thread(target=_laco.run_forever, name="provedores-llm", daemon=True).start()
+        return _laco
+
+
+_FIM = object()
+
+
+class Transmissao:
+    """
+    Iterador síncrono sobre a resposta do Roteador, para as páginas do
+    Streamlit. Ao fim, provedor (o que respondeu), falhas (dos descartados),
+    ttft e duracao (segundos desde o pedido) ficam preenchidos. Parar de
+    iterar cancela o pedido.
+    """
+
+    def __init__(self, provedores, instrucao, mensagens, prazo_ttft=PRAZO_TTFT, atraso_hedge=None, **opcoes):
+        self.roteador = Roteador(provedores, prazo_ttft, atraso_hedge)
+        self.provedor = None
+        self.ttft = None
+        self.duracao = None
+        self._inicio = time.perf_counter()
+        self._fila = queue.Queue()
+        self._futuro = asyncio.run_coroutine_threadsafe(self._consumir(instrucao, mensagens, opcoes), laco_eventos())
+
+    @property
+    def falhas(self):
+        return self.roteador.falhas
+
+    async def _consumir(self, instrucao, mensagens, opcoes):
+        try:
+            async for nome, texto in self.roteador.transmitir(instrucao, mensagens, **opcoes):
+                self.provedor = nome
+                self._fila.put(texto)
+        except Exception as e:
+            self._fila.put(e)
+        finally:
+            self._fila.put(_FIM)
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self._fila.get()
+                if item is _FIM:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                if self.ttft is None:
+                    self.ttft = time.perf_counter() - self._inicio
+                yield item
+            self.duracao = time.perf_counter() - self._inicio
+        finally:
+            self._futuro.cancel()
+
+
+def transmitir(provedores, instrucao, mensagens, **opcoes):
+    """Transmissao (iterador síncrono de pedaços de texto) da resposta aos provedores, com troca e hedge"""
+    return Transmissao(provedores, instrucao, mensagens, **opcoes)
+
+
+def completar(provedores, instrucao, texto, **opcoes):
+    """Resposta completa a uma única mensagem do usuário (usada, por exemplo, nos resumos da conversa)"""
+    return "".join(Transmissao(provedores, instrucao, [{"role": "user", "content": texto}], **opcoes))
+
+
+def descrever_erro(erro):
+    """Mensagem para o usuário, com a dica do erro da API quando houver"""
+    texto = f"⚠️ **Erro na API:** {erro}"
+    erros = [e for _, e in erro.falhas] if isinstance(erro, ErroProvedores) else [erro]
+    status = {e.status for e in erros if isinstance(e, ErroAPI)}
+    detalhes = str(erro)
+    if 401 in status or 403 in status:
+        texto += "\n\n🔐 Verifique sua API Key"
+    elif 402 in status:
+        texto += "\n\n💳 Saldo ou crédito gratuito insuficiente. Recarregue sua conta ou use outro provedor."
+    elif 400 in status and "non-serverless" in detalhes:
+        texto += "\n\n🔧 Este modelo requer endpoint dedicado. Tente outro modelo."
+    elif 404 in status:
+        texto += "\n\n🔎 Modelo ou endpoint não encontrado. Verifique o nome do modelo e a URL da API."
+    elif 429 in status or "rate limit" in detalhes.lower():
+        texto += "\n\n⏳ Limite de requisições excedido, tente novamente mais tarde"
+    elif any(isinstance(e, (TimeoutError, httpx.TimeoutException)) for e in erros):
+        texto += "\n\n⏱️ O provedor demorou demais para responder. Tente novamente."
+    return texto
+
+
+def descrever_latencias(provedores):
+    """Uma linha por provedor já usado: p50/p95 do primeiro token e da resposta completa, tentativas e erros"""
+    linhas = []
+    for provedor in provedores:
+        est = provedor.estatisticas()
+        if not est["chamadas"]:
+            continue
+        linha = f"**{provedor.nome}**: {est['chamadas']} chamadas"
+        if est["ttft"]["p50"] is not None:
+            linha += (f" · 1º token p50 {est['ttft']['p50']:.2f} s / p95 {est['ttft']['p95']:.2f} s"
+                      f" · total p50 {est['total']['p50']:.2f} s / p95 {est['total']['p95']:.2f} s")
+        linha += f" · {est['tentativas_extras']} novas tentativas, {est['erros']} erros"
+        linhas.append(linha)
+    return linhas
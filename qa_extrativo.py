@@ -0,0 +1,167 @@
+# qa_extrativo.py
+
+"""
+    Extração da resposta (QA extrativo) do chatbot a partir dos chunks recuperados.
+
+    Em vez de juntar os chunks num único contexto longo, cada chunk vira uma ou
+    mais janelas (pergunta + trecho do chunk) e as janelas passam pelo modelo em
+    lotes, na ordem de relevância da busca, com padding só até a maior janela do
+    lote. Quando um lote já traz um trecho com confiança >= limiar_saida, os
+    lotes seguintes não são processados.
+
+    O modelo roda no PyTorch ou, opcionalmente (runtime="onnx"), no ONNX Runtime
+    com quantização dinâmica int8. Na primeira vez o modelo é exportado e
+    quantizado em modelos/qa_onnx/.
+"""
+
+import os
+import re
+
+import numpy as np
+import torch
+from transformers import AutoModelForQuestionAnswering, AutoTokenizer
+
+RUNTIMES = ("torch", "onnx")
+PASTA_ONNX = os.path.join("modelos", "qa_onnx")
+ENTRADAS = ("input_ids", "attention_mask", "token_type_ids")
+
+# Tokens por janela, sobreposição entre janelas de um chunk longo e tamanho
+# máximo da resposta (os mesmos padrões do pipeline question-answering da HF)
+TAMANHO_JANELA = 384
+SOBREPOSICAO = 128
+MAX_TOKENS_RESPOSTA = 15
+# Janelas por chamada ao modelo e confiança que dispensa os lotes seguintes
+TAMANHO_LOTE = 4
+LIMIAR_SAIDA = 0.7
+
+
+def arquivo_onnx(modelo, pasta=PASTA_ONNX):
+    return os.path.join(pasta, re.sub(r"[^\w.-]+", "_", modelo) + "-int8.onnx")
+
+
+def exportar_onnx(modelo, tokenizer, destino):
+    """Exporta o modelo para ONNX e grava a versão com quantização dinâmica int8 em destino"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    exemplo = tokenizer("Qual o pH?", "O pH ideal fica entre 5,5 e 6,5.", return_tensors="pt")
+    nomes = [n for n in ENTRADAS if n in exemplo]
+
+    class Logits(torch.nn.Module):
+        def __init__(self, modelo):
+            super().__init__()
+            self.modelo = modelo
+
+        def forward(self, *entradas):
+            saida = self.modelo(**dict(zip(nomes, entradas)), return_dict=False)
+            return saida[0], saida[1]
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temporario = destino + ".fp32"
+    eixos = {n: {0: "janelas", 1: "tokens"} for n in nomes + ["start_logits", "end_logits"]}
+    torch.onnx.export(
+        Logits(modelo).eval(), tuple(exemplo[n] for n in nomes), temporario,
+        input_names=nomes, output_names=["start_logits", "end_logits"],
+        dynamic_axes=eixos, opset_version=14, dynamo=False
+    )
+    try:
+        quantize_dynamic(temporario, destino, weight_type=QuantType.QInt8)
+    finally:
+        os.remove(temporario)
+
+
+def melhor_trecho(inicio, fim, no_contexto, max_tokens=MAX_TOKENS_RESPOSTA):
+    """
+    (confiança, token inicial, token final) do melhor trecho de uma janela. As
+    probabilidades são normalizadas sobre o contexto e o [CLS], como no pipeline
+    da HF, para que a confiança siga comparável ao limiar usado no chatbot.
+    """
+    validos = no_contexto.copy()
+    validos[0] = True
+    p_inicio = np.exp(np.where(validos, inicio, -np.inf) - inicio[validos].max())
+    p_fim = np.exp(np.where(validos, fim, -np.inf) - fim[validos].max())
+    p_inicio = np.where(no_contexto, p_inicio / p_inicio.sum(), 0.0)
+    p_fim = np.where(no_contexto, p_fim / p_fim.sum(), 0.0)
+    # Só trechos com fim >= início e até max_tokens tokens
+    pontos = np.tril(np.triu(np.outer(p_inicio, p_fim)), max_tokens - 1)
+    s, e = np.unravel_index(int(np.argmax(pontos)), pontos.shape)
+    return float(pontos[s, e]), int(s), int(e)
+
+
+class LeitorQA:
+    """Modelo de QA extrativo com tokenizer rápido da HF, no PyTorch ou no ONNX Runtime (int8)"""
+
+    def __init__(self, modelo, runtime="torch", pasta_onnx=PASTA_ONNX):
+        if runtime not in RUNTIMES:
+            raise ValueError(f"runtime deve ser um de {RUNTIMES}")
+        self.runtime = runtime
+        self.tokenizer = AutoTokenizer.from_pretrained(modelo, clean_up_tokenization_spaces=True)
+        if runtime == "onnx":
+            import onnxruntime
+
+            caminho = arquivo_onnx(modelo, pasta_onnx)
+            if not os.path.exists(caminho):
+                exportar_onnx(AutoModelForQuestionAnswering.from_pretrained(modelo), self.tokenizer, caminho)
+            opcoes = onnxruntime.SessionOptions()
+            opcoes.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.sessao = onnxruntime.InferenceSession(caminho, opcoes, providers=["CPUExecutionProvider"])
+            self.entradas = [e.name for e in self.sessao.get_inputs()]
+        else:
+            self.modelo = AutoModelForQuestionAnswering.from_pretrained(modelo).eval()
+
+    def _logits(self, entradas):
+        if self.runtime == "onnx":
+            inicio, fim = self.sessao.run(None, {n: entradas[n].astype(np.int64) for n in self.entradas})
+            return inicio, fim
+        with torch.inference_mode():
+            saida = self.modelo(**{n: torch.from_numpy(v.astype(np.int64)) for n, v in entradas.items()})
+        return saida.start_logits.numpy(), saida.end_logits.numpy()
+
+    def responder(self, pergunta, contextos, tamanho_lote=TAMANHO_LOTE, limiar_saida=LIMIAR_SAIDA):
+        """
+        Melhor trecho de resposta entre os contextos (em ordem de relevância).
+        Retorna um dicionário com as chaves do pipeline da HF (answer, score,
+        start, end), mais contexto (índice do contexto de origem) e janelas
+        (processadas / total); ou None se não houver contextos.
+        """
+        contextos = list(contextos)
+        if not contextos:
+            return None
+        codificado = self.tokenizer(
+            [pergunta] * len(contextos), contextos, truncation="only_second",
+            max_length=TAMANHO_JANELA, stride=SOBREPOSICAO, return_overflowing_tokens=True,
+            return_offsets_mapping=True, padding="longest", return_tensors="np"
+        )
+        origem = codificado["overflow_to_sample_mapping"]
+        entradas = {n: codificado[n] for n in ENTRADAS if n in codificado}
+        total = len(origem)
+
+        melhor = None
+        processadas = 0
+        for inicio_lote in range(0, total, tamanho_lote):
+            lote = slice(inicio_lote, inicio_lote + tamanho_lote)
+            # Padding só até a maior janela do lote (o padding fica à direita)
+            colunas = int(entradas["attention_mask"][lote].sum(axis=1).max())
+            inicio, fim = self._logits({n: v[lote, :colunas] for n, v in entradas.items()})
+            for j in range(len(inicio)):
+                janela = inicio_lote + j
+                no_contexto = np.array([s == 1 for s in codificado.sequence_ids(janela)[:colunas]])
+                if not no_contexto.any():
+                    continue
+                score, s, e = melhor_trecho(inicio[j], fim[j], no_contexto)
+                if melhor is None or score > melhor["score"]:
+                    offsets = codificado["offset_mapping"][janela]
+                    c = int(origem[janela])
+                    melhor = {
+                        "answer": contextos[c][offsets[s][0]:offsets[e][1]],
+                        "score": score,
+                        "start": int(offsets[s][0]),
+                        "end": int(offsets[e][1]),
+                        "contexto": c,
+                    }
+            processadas += len(inicio)
+            if melhor is not None and melhor["score"] >= limiar_saida:
+                break
+        if melhor is None:
+            return None
+        melhor["janelas"] = (processadas, total)
+        return melhor
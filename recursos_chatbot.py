@@ -0,0 +1,220 @@
+# recursos_chatbot.py
+
+"""
+    Recursos do chatbot (modelo de embeddings, índices FAISS e BM25, modelo de QA
+    e cache de consultas), carregados uma vez por processo numa thread em
+    segundo plano.
+
+    app.py inicia a carga no começo da sessão, antes mesmo do login, e
+    chatbot.py só consulta o andamento: a página aparece na hora e as perguntas
+    feitas durante a carga esperam numa fila. O tempo de cada etapa fica em
+    CargaRecursos.tempos e é escrito no log do servidor.
+
+    torch, transformers e faiss só são importados dentro da thread de carga,
+    para não atrasar a abertura das outras páginas.
+"""
+
+import importlib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import busca_hibrida
+import cache_consultas
+
+# MODELO DE EMBEDDING: DEVE SER O MESMO QUE EM 'treinar.py'!
+EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+# Modelo de QA para português (extrai a resposta dos chunks recuperados; ver qa_extrativo.py).
+QA_MODEL = "pierreguillou/bert-base-cased-squad-v1.1-portuguese"
+# Runtime do modelo de QA: "torch" ou "onnx" (ONNX Runtime com quantização int8; requer onnxruntime e onnx)
+QA_RUNTIME = "torch"
+FAISS_INDEX_PATH = "faiss_index"
+# Módulos pesados (torch, transformers, faiss, LangChain), importados na primeira etapa da carga
+BIBLIOTECAS = ("langchain_huggingface", "indice_chatbot", "qa_extrativo")
+
+
+def preprocess_question(question):
+    """
+    Prepara a pergunta do usuário para a busca e para o modelo de QA.
+    A regex DEVE SER CONSISTENTE com a usada em treinar.py.
+    """
+    question = question.strip()
+    question = re.sub(r'\s+', ' ', question)
+    # Mantém letras (incluindo acentuadas), números, espaços, e pontuação essencial
+    question = re.sub(r'[^\w\s.,!?;:\-–()\[\]{}<>/=+\*#@&%$\^|~`áéíóúâêîôûàèìòùãõäëïöüçÁÉÍÓÚÂÊÎÔÛÀÈÌÒÙÃÕÄËÏÖÜÇ]', '', question)
+    return question
+
+
+class RecursosChatbot:
+    """Recursos carregados, a busca de documentos e a extração de respostas que dependem deles"""
+
+    def __init__(self, vector_store, bm25, leitor_qa, cache):
+        self.vector_store = vector_store
+        self.bm25 = bm25
+        self.leitor_qa = leitor_qa
+        self.cache = cache
+        # QA fora da thread da página; uma inferência por vez (o torch já usa todos os núcleos)
+        self.executor_qa = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qa-chatbot")
+
+    def buscar_documentos(self, pergunta, k):
+        """
+        Chunks mais relevantes para a pergunta: busca densa (FAISS) e esparsa (BM25)
+        combinadas por RRF, usando o cache de embeddings e de buscas (se houver). A
+        busca BM25 roda numa thread enquanto o embedding da pergunta é calculado.
+        """
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            esparsa = executor.submit(self.bm25.buscar, pergunta, busca_hibrida.K_CANDIDATOS) if self.bm25 else None
+            embed_query = self.vector_store.embeddings.embed_query
+            if self.cache is None:
+                vetor = np.asarray(embed_query(pergunta), dtype=np.float32)
+            else:
+                vetor = self.cache.embedding(pergunta, embed_query)
+
+            def buscar(vetor, k):
+                _, ids = self.vector_store.index.search(vetor.reshape(1, -1), max(k, busca_hibrida.K_CANDIDATOS))
+                densos = [int(i) for i in ids[0] if i >= 0]
+                if esparsa is None:
+                    return densos[:k]
+                return busca_hibrida.fundir_rrf([densos, esparsa.result()], k)
+
+            ids = buscar(vetor, k) if self.cache is None else self.cache.busca(vetor, k, buscar)
+        docs = [self.vector_store.docstore.search(str(i)) for i in ids]
+        return [doc for doc in docs if not isinstance(doc, str)]
+
+    def extrair_resposta(self, pergunta, contextos):
+        """Future com o resultado de leitor_qa.responder, calculado na thread de QA"""
+        return self.executor_qa.submit(self.leitor_qa.responder, pergunta, contextos)
+
+
+def verificar_indice(pasta):
+    """Erro com a orientação para o usuário se o índice do treinar.py não estiver na pasta"""
+    import indice_chatbot
+
+    if not os.path.isdir(pasta):
+        raise FileNotFoundError(
+            f"**O diretório '{pasta}' não foi encontrado.** Por favor, execute `python treinar.py` "
+            f"primeiro para criar o índice FAISS no diretório do aplicativo (`{os.getcwd()}`)."
+        )
+    if not all(os.path.exists(os.path.join(pasta, nome)) for nome in ("index.faiss", indice_chatbot.DOCSTORE)):
+        raise FileNotFoundError(
+            f"**Arquivos do índice FAISS (index.faiss ou {indice_chatbot.DOCSTORE}) ausentes ou corrompidos "
+            f"em '{pasta}'.** Por favor, re-execute `python treinar.py` para criar o índice corretamente."
+        )
+
+
+def importar_bibliotecas():
+    for nome in BIBLIOTECAS:
+        importlib.import_module(nome)
+
+
+def carregar_embeddings(modelo=EMBEDDING_MODEL):
+    """Modelo de embeddings, já aquecido com uma consulta"""
+    from langchain_huggingface import HuggingFaceEmbeddings
+
+    embeddings = HuggingFaceEmbeddings(model_name=modelo)
+    embeddings.embed_query("hidroponia")
+    return embeddings
+
+
+def carregar_indices(pasta, embeddings):
+    import indice_chatbot
+
+    # Índice FAISS mapeado em memória e textos dos chunks lidos do SQLite sob demanda
+    vector_store = indice_chatbot.carregar_vector_store(pasta, embeddings)
+    # Índice BM25 da busca híbrida (índices gravados antes dele seguem só com a busca densa)
+    bm25 = busca_hibrida.IndiceBM25(pasta) if busca_hibrida.existe_bm25(pasta) else None
+    return vector_store, bm25
+
+
+def carregar_leitor_qa():
+    """Modelo de QA (por chunk, em lotes; ver qa_extrativo), já aquecido com uma pergunta"""
+    import qa_extrativo
+
+    try:
+        leitor_qa = qa_extrativo.LeitorQA(QA_MODEL, QA_RUNTIME)
+    except ImportError:
+        # Sem o onnxruntime instalado, segue com o PyTorch
+        leitor_qa = qa_extrativo.LeitorQA(QA_MODEL)
+    leitor_qa.responder("O que é hidroponia?", ["Hidroponia é o cultivo de plantas sem solo."])
+    return leitor_qa
+
+
+def carregar_cache():
+    # Cache de consultas (as buscas ficam em memória, válidas só para o índice deste processo)
+    return cache_consultas.CacheConsultas(EMBEDDING_MODEL)
+
+
+class CargaRecursos:
+    """
+    Carga dos recursos numa thread daemon. pronto indica que recursos pode ser
+    usado; concluido, que a carga terminou (com sucesso ou com erro).
+    """
+
+    def __init__(self, pasta=FAISS_INDEX_PATH):
+        self.pasta = pasta
+        self.recursos = None
+        self.erro = None
+        self.etapa = None
+        self.tempos = {}
+        self.duracao = None
+        self._trava = threading.Lock()
+        self._fim = threading.Event()
+        self._thread = None
+
+    @property
+    def concluido(self):
+        return self._fim.is_set()
+
+    @property
+    def pronto(self):
+        return self._fim.is_set() and self.erro is None
+
+    def iniciar(self):
+        """Dispara a carga (só na primeira chamada) e retorna sem esperar"""
+        with self._trava:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._carregar, name="carga-chatbot", daemon=True)
+                self._thread.start()
+        return self
+
+    def aguardar(self, timeout=None):
+        """Espera o fim da carga; retorna False se o timeout terminar antes"""
+        return self._fim.wait(timeout)
+
+    def _etapa(self, nome, funcao):
+        self.etapa = nome
+        inicio = time.perf_counter()
+        resultado = funcao()
+        self.tempos[nome] = time.perf_counter() - inicio
+        return resultado
+
+    def _carregar(self):
+        inicio = time.perf_counter()
+        try:
+            self._etapa("Bibliotecas", importar_bibliotecas)
+            verificar_indice(self.pasta)
+            embeddings = self._etapa("Modelo de embeddings", carregar_embeddings)
+            vector_store, bm25 = self._etapa("Índices FAISS e BM25", lambda: carregar_indices(self.pasta, embeddings))
+            leitor_qa = self._etapa("Modelo de QA", carregar_leitor_qa)
+            cache = self._etapa("Cache de consultas", carregar_cache)
+            self.recursos = RecursosChatbot(vector_store, bm25, leitor_qa, cache)
+        except Exception as e:
+            self.erro = f"Erro ao carregar recursos: {e}"
+        finally:
+            self.etapa = None
+            self.duracao = time.perf_counter() - inicio
+            self._fim.set()
+        tempos = ", ".join(f"{nome}: {segundos:.1f} s" for nome, segundos in self.tempos.items())
+        print(f"[chatbot] Carga {'com erro' if self.erro else 'concluída'} em {self.duracao:.1f} s ({tempos})")
+
+
+_carga = CargaRecursos()
+
+
+def iniciar():
+    """Inicia (uma vez por processo) a carga dos recursos e retorna a CargaRecursos"""
+    return _carga.iniciar()
@@ -0,0 +1,88 @@
+# reducao_series.py
+
+"""
+    Redução de séries longas para um número fixo de pontos por trace, feita no
+    servidor antes de enviar os dados ao navegador.
+
+    - LTTB (Largest-Triangle-Three-Buckets): preserva a forma visual da curva;
+    - min/max por faixa: preserva picos e vales (útil para medições ruidosas).
+
+    As funções devolvem os índices escolhidos, para que o chamador recorte
+    quantas colunas quiser (datas, pesos, fases...) de forma consistente.
+"""
+
+import numpy as np
+
+
+def _como_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[s]").astype(np.float64)
+    return x.astype(np.float64)
+
+
+def indices_lttb(x, y, n_pontos):
+    """Índices dos pontos escolhidos pelo LTTB (sempre inclui o primeiro e o último)"""
+    x = _como_float(x)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n_pontos >= n or n_pontos < 3:
+        return np.arange(n)
+
+    escolhidos = np.empty(n_pontos, dtype=np.int64)
+    escolhidos[0] = 0
+    escolhidos[-1] = n - 1
+
+    # Limites das n_pontos - 2 faixas internas
+    limites = np.linspace(1, n - 1, n_pontos - 1).astype(np.int64)
+    anterior = 0
+    for i in range(n_pontos - 2):
+        ini, fim = limites[i], max(limites[i + 1], limites[i] + 1)
+        # Média da faixa seguinte (ou o último ponto, na última faixa)
+        prox_ini = fim
+        prox_fim = limites[i + 2] if i + 2 < len(limites) else n
+        if prox_ini >= prox_fim:
+            x_med, y_med = x[-1], y[-1]
+        else:
+            x_med, y_med = x[prox_ini:prox_fim].mean(), y[prox_ini:prox_fim].mean()
+
+        xa, ya = x[anterior], y[anterior]
+        areas = np.abs((xa - x_med) * (y[ini:fim] - ya) - (xa - x[ini:fim]) * (y_med - ya))
+        anterior = ini + int(np.argmax(areas))
+        escolhidos[i + 1] = anterior
+
+    return escolhidos
+
+
+def indices_minmax(x, y, n_pontos):
+    """Índices do mínimo e do máximo de cada faixa, em ordem (até n_pontos pontos)"""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n_pontos >= n or n_pontos < 2:
+        return np.arange(n)
+
+    n_faixas = n_pontos // 2
+    limites = np.linspace(0, n, n_faixas + 1).astype(np.int64)
+    escolhidos = []
+    for ini, fim in zip(limites[:-1], limites[1:]):
+        if fim <= ini:
+            continue
+        faixa = y[ini:fim]
+        escolhidos.extend((ini + int(np.argmin(faixa)), ini + int(np.argmax(faixa))))
+    return np.unique(escolhidos)
+
+
+METODOS = {
+    "lttb": indices_lttb,
+    "minmax": indices_minmax
+}
+
+
+def reduzir(x, y, n_pontos, metodo="lttb"):
+    """Reduz a série (x, y) a no máximo n_pontos, ignorando valores ausentes"""
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=np.float64)
+    validos = ~np.isnan(y)
+    x, y = x[validos], y[validos]
+    idx = METODOS[metodo](x, y, n_pontos)
+    return x[idx], y[idx]
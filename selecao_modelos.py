@@ -0,0 +1,240 @@
+# selecao_modelos.py
+
+"""
+    Seleção da família de curva de crescimento de cada cultivar.
+
+    Para cada cultivar, as medições históricas de tbl_crescimento (todos os plantios)
+    são reunidas numa única série (dia desde o plantio x peso real). As famílias
+    logística, Gompertz, Richards e Weibull são ajustadas em lote (uma linha por
+    cultivar, ver ajuste_crescimento.ajustar_lote), cada família num processo do
+    pool, com validação cruzada deixando plantios de fora. A família escolhida (menor
+    RMSE de validação cruzada ou, sem dobras suficientes, menor AICc) e seus
+    parâmetros ficam em tbl_cultivares_modelos e passam a ser usados na geração das
+    curvas esperadas (cache_curvas).
+
+    Uso em lote (ex.: cron):
+        python selecao_modelos.py [--processos 4] [--criterio cv|aic]
+"""
+
+import argparse
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import ajuste_crescimento
+import modelo_crescimento
+
+DB_NAME = "./dados/hidroponia.db"
+
+P_INICIAL = 5.0
+N_DOBRAS = 5
+MIN_MEDICOES = 8
+
+SQL_CRIAR_TABELA = """
+    CREATE TABLE IF NOT EXISTS tbl_cultivares_modelos (
+        cmo_cultivar_id INTEGER PRIMARY KEY,
+        cmo_modelo TEXT NOT NULL,
+        cmo_K REAL,
+        cmo_r REAL,
+        cmo_t0 REAL,
+        cmo_nu REAL,
+        cmo_aic REAL,
+        cmo_rmse_cv REAL,
+        cmo_criterio TEXT,
+        cmo_n_plantios INTEGER,
+        cmo_n_medicoes INTEGER,
+        cmo_atualizado_em TEXT
+    )
+"""
+
+
+def criar_tabela(conn):
+    """Cria a tabela de modelos por cultivar, se ainda não existir"""
+    conn.execute(SQL_CRIAR_TABELA)
+
+
+def carregar_historico(conn):
+    """Medições de todos os plantios, com o período e o peso de colheita do cultivar"""
+    df = ajuste_crescimento.carregar_medicoes(conn, apenas_ativos=False)
+    if df.empty:
+        return df
+    df = df[df["cre_peso_real"].notna() & (df["cre_peso_real"] > 0)]
+    cultivares = pd.read_sql(
+        "SELECT clt_id AS cre_cultivar_id, clt_periodo, clt_peso_colheita FROM tbl_cultivares", conn
+    )
+    return df.merge(cultivares, on="cre_cultivar_id", how="left")
+
+
+def montar_lote(historico):
+    """
+    Empilha a série de cada cultivar em matrizes (n_cultivares, n_medicoes).
+
+    Retorna (cultivar_ids, t, y, mascara, dobra, n_plantios, theta_ref), onde dobra
+    indica a dobra de validação de cada medição (por plantio, quando há mais de um)
+    e theta_ref = (log K, log r, t0) da logística teórica de referência.
+    """
+    grupos = list(historico.groupby("cre_cultivar_id"))
+    grupos = [(c, g) for c, g in grupos if len(g) >= MIN_MEDICOES]
+    n = len(grupos)
+    n_max = max((len(g) for _, g in grupos), default=1)
+
+    t = np.zeros((n, n_max))
+    y = np.zeros_like(t)
+    mascara = np.zeros_like(t, dtype=bool)
+    dobra = np.full(t.shape, -1)
+    n_plantios = np.zeros(n, dtype=np.int64)
+    p_final = np.zeros(n)
+    dias = np.zeros(n)
+
+    for i, (_, g) in enumerate(grupos):
+        m = len(g)
+        t[i, :m] = g["dia"].to_numpy()
+        y[i, :m] = g["cre_peso_real"].to_numpy()
+        mascara[i, :m] = True
+        plantio = pd.factorize(g["cre_data_plantio"].astype(str) + "|" + g["cre_bancada_id"].astype(str))[0]
+        n_plantios[i] = plantio.max() + 1
+        # Com um só plantio, as dobras separam medições intercaladas
+        dobra[i, :m] = (plantio if n_plantios[i] > 1 else np.arange(m)) % N_DOBRAS
+        p_final[i] = g["clt_peso_colheita"].iloc[0] if pd.notna(g["clt_peso_colheita"].iloc[0]) else y[i, :m].max()
+        dias[i] = g["clt_periodo"].iloc[0] if pd.notna(g["clt_periodo"].iloc[0]) else t[i, :m].max()
+
+    K, r, t0 = modelo_crescimento.calcular_parametros_lote(
+        np.full(n, P_INICIAL), np.maximum(p_final, P_INICIAL + 1.0), np.maximum(dias, 3)
+    )
+    theta_ref = (np.log(K), np.log(r), t0)
+    return [c for c, _ in grupos], t, y, mascara, dobra, n_plantios, theta_ref
+
+
+def avaliar_familia(modelo, t, y, mascara, dobra, theta_ref):
+    """
+    Ajusta uma família a todos os cultivares (ajuste completo + validação cruzada).
+    Executado em um processo do pool; retorna (theta, aic, rmse_cv).
+    """
+    k = ajuste_crescimento.MODELOS[modelo]
+    theta0 = ajuste_crescimento.estimativa_inicial(modelo, *theta_ref)
+
+    theta, sse = ajuste_crescimento.ajustar_lote(modelo, t, y, mascara, theta0)
+    aic = ajuste_crescimento.aicc(mascara.sum(axis=1), sse, k)
+
+    sse_teste = np.zeros(len(t))
+    n_teste = np.zeros(len(t))
+    for f in range(N_DOBRAS):
+        teste = mascara & (dobra == f)
+        treino = mascara & (dobra != f)
+        aptos = (teste.sum(axis=1) > 0) & (treino.sum(axis=1) >= k + 2)
+        if not aptos.any():
+            continue
+        theta_f, _ = ajuste_crescimento.ajustar_lote(modelo, t[aptos], y[aptos], treino[aptos], theta0[aptos])
+        erro, _ = ajuste_crescimento._sse(modelo, theta_f, t[aptos], y[aptos], teste[aptos])
+        sse_teste[aptos] += erro
+        n_teste[aptos] += teste[aptos].sum(axis=1)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rmse_cv = np.where(n_teste > 0, np.sqrt(sse_teste / n_teste), np.nan)
+    return theta, aic, rmse_cv
+
+
+def selecionar(historico, modelos=ajuste_crescimento.MODELOS_AJUSTE, processos=None, criterio="cv"):
+    """
+    Compara as famílias para cada cultivar e devolve um DataFrame com a escolhida.
+    processos=1 executa tudo no processo atual.
+    """
+    cultivares, t, y, mascara, dobra, n_plantios, theta_ref = montar_lote(historico)
+    if not cultivares:
+        return pd.DataFrame()
+
+    argumentos = [(m, t, y, mascara, dobra, theta_ref) for m in modelos]
+    if processos == 1:
+        resultados = [avaliar_familia(*a) for a in argumentos]
+    else:
+        with ProcessPoolExecutor(max_workers=processos) as pool:
+            resultados = list(pool.map(avaliar_familia, *zip(*argumentos)))
+
+    aic = np.column_stack([r[1] for r in resultados])
+    rmse_cv = np.column_stack([r[2] for r in resultados])
+    aic = np.where(np.isfinite(aic), aic, np.inf)
+
+    # Validação cruzada só vale quando todas as famílias foram avaliadas
+    usa_cv = (criterio == "cv") & np.all(np.isfinite(rmse_cv), axis=1)
+    escolha = np.where(usa_cv, np.argmin(np.where(np.isfinite(rmse_cv), rmse_cv, np.inf), axis=1), np.argmin(aic, axis=1))
+
+    linhas = []
+    for i, cultivar_id in enumerate(cultivares):
+        j = escolha[i]
+        modelo = modelos[j]
+        theta = resultados[j][0][i]
+        K, r, t0, nu = ajuste_crescimento._para_naturais(modelo, theta[None, :])
+        linhas.append({
+            "cultivar_id": int(cultivar_id),
+            "modelo": modelo,
+            "K": float(K[0]),
+            "r": float(r[0]),
+            "t0": float(t0[0]),
+            "nu": None if nu is None else float(nu[0]),
+            "aic": float(aic[i, j]),
+            "rmse_cv": float(rmse_cv[i, j]) if np.isfinite(rmse_cv[i, j]) else None,
+            "criterio": "cv" if usa_cv[i] else "aic",
+            "n_plantios": int(n_plantios[i]),
+            "n_medicoes": int(mascara[i].sum()),
+        })
+    return pd.DataFrame(linhas)
+
+
+def atualizar_modelos(processos=None, criterio="cv"):
+    """Reavalia as famílias de todos os cultivares com histórico e grava as escolhidas"""
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        criar_tabela(conn)
+        escolhidos = selecionar(carregar_historico(conn), processos=processos, criterio=criterio)
+        if escolhidos.empty:
+            return escolhidos
+        agora = datetime.now().isoformat(timespec="seconds")
+        conn.executemany("""
+            INSERT OR REPLACE INTO tbl_cultivares_modelos (
+                cmo_cultivar_id, cmo_modelo, cmo_K, cmo_r, cmo_t0, cmo_nu, cmo_aic,
+                cmo_rmse_cv, cmo_criterio, cmo_n_plantios, cmo_n_medicoes, cmo_atualizado_em
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(*linha, agora) for linha in escolhidos.itertuples(index=False, name=None)])
+        conn.commit()
+        return escolhidos
+    finally:
+        conn.close()
+
+
+def obter_modelo_cultivar(cultivar_id):
+    """
+    Família e parâmetros escolhidos para o cultivar, como tupla
+    (modelo, K, r, t0, nu), ou None se o cultivar ainda não foi avaliado.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        criar_tabela(conn)
+        linha = conn.execute("""
+            SELECT cmo_modelo, cmo_K, cmo_r, cmo_t0, cmo_nu
+            FROM tbl_cultivares_modelos
+            WHERE cmo_cultivar_id = ?
+        """, (cultivar_id,)).fetchone()
+    finally:
+        conn.close()
+    return tuple(linha) if linha else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seleciona a família de curva de crescimento de cada cultivar")
+    parser.add_argument("--processos", type=int, default=None, help="processos do pool (padrão: núcleos da CPU)")
+    parser.add_argument("--criterio", choices=["cv", "aic"], default="cv")
+    args = parser.parse_args()
+
+    escolhidos = atualizar_modelos(processos=args.processos, criterio=args.criterio)
+    if escolhidos.empty:
+        print("Nenhum cultivar com medições suficientes.")
+    else:
+        print(escolhidos[["cultivar_id", "modelo", "criterio", "aic", "rmse_cv", "n_plantios", "n_medicoes"]]
+              .to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
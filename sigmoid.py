@@ -1,68 +1,16 @@
-import math
 import matplotlib.pyplot as plt
 import numpy as np
-
-def calcular_parametros(p_inicial, p_final, dias):
-    t0 = dias / 2.0
-    K = p_final * 1.05
-    tolerancia = 0.01
-    max_iter = 1000
-    
-    for _ in range(max_iter):
-        try:
-            if K <= p_inicial:
-                K = p_inicial * 1.1
-                continue
-                
-            r = -math.log((K / p_inicial) - 1) / (1 - t0)
-        except (ValueError, ZeroDivisionError):
-            K *= 1.1
-            continue
-            
-        exp_term = math.exp(-r * (dias - t0))
-        p_final_calculado = K / (1 + exp_term)
-        
-        if abs(p_final_calculado - p_final) < tolerancia:
-            return K, r, t0
-        
-        K *= p_final / p_final_calculado
-    
-    return K, r, t0
-
-def classificar_fase(peso, K):
-    if peso < 0.1 * K:
-        return "Lenta"
-    elif peso < 0.9 * K:
-        return "Acelerada"
-    else:
-        return "Saturação"
+from modelo_crescimento import gerar_dados_sigmoidal
 
 def gerar_dados(p_inicial=5.0, p_final=260.0, dias=35):
     try:
-        K, r, t0 = calcular_parametros(p_inicial, p_final, dias)
+        return gerar_dados_sigmoidal(p_inicial, p_final, dias)
     except Exception as e:
         print(f"Erro ao calcular parâmetros: {e}")
         return None, None, None, None, None
 
-    dias_list = list(range(1, dias + 1))
-    pesos_list = []
-    fases_list = []
-
-    for t in dias_list:
-        try:
-            exp_term = math.exp(-r * (t - t0))
-            peso = K / (1 + exp_term)
-            fase = classificar_fase(peso, K)
-            pesos_list.append(peso)
-            fases_list.append(fase)
-        except Exception as e:
-            print(f"Erro no dia {t}: {e}")
-            pesos_list.append(0)
-            fases_list.append("Erro")
-
-    return dias_list, pesos_list, fases_list, K, r
-
-def plotar_grafico(dias_list, pesos_list, fases_list, K, p_inicial, p_final, dias):
+def plotar_grafico(dias_list, pesos_list, fases_list, K, p_inicial, p_final, dias,
+                   arquivo='crescimento.png', mostrar=True, titulo=None):
     plt.figure(figsize=(10, 6))
     
     # 1. Define cores de fundo para cada fase
@@ -120,7 +68,7 @@ def plotar_grafico(dias_list, pesos_list, fases_list, K, p_inicial, p_final, dia
         plt.plot(fase_saturacao_x, fase_saturacao_y, 'ro', markersize=6, label='Fase Saturação')
 
     # Configurações do gráfico
-    plt.title(f'Crescimento: {p_inicial}g → {p_final}g em {dias} dias', fontsize=14)
+    plt.title(titulo or f'Crescimento: {p_inicial}g → {p_final}g em {dias} dias', fontsize=14)
     plt.xlabel('Dia', fontsize=12)
     plt.ylabel('Peso (g)', fontsize=12)
     plt.grid(True, linestyle='--', alpha=0.5)
@@ -147,8 +95,11 @@ def plotar_grafico(dias_list, pesos_list, fases_list, K, p_inicial, p_final, dia
     plt.legend(loc='best')
 
     plt.tight_layout()
-    plt.savefig('crescimento.png', dpi=150)
-    plt.show()
+    plt.savefig(arquivo, dpi=150)
+    if mostrar:
+        plt.show()
+    else:
+        plt.close()
 
 def main():
     try:
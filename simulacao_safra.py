@@ -0,0 +1,242 @@
+# simulacao_safra.py
+
+"""
+    Projeção de safra por Monte Carlo: distribuição da massa colhida por estufa e
+    semana.
+
+    Cada plantio ativo parte da previsão de colheita (previsao_colheita) e do
+    número de plantas da bancada (bcd_qtd_furos). Em cada cenário são sorteados,
+    por plantio, um fator de peso e um fator de ritmo (lognormais, com a dispersão
+    dos parâmetros K e r ajustados nos plantios do mesmo cultivar) e a fração de
+    plantas colhidas. A simulação é toda vetorizada (matriz cenários x plantios) e
+    os resultados P10/P50/P90 ficam em tbl_projecoes_safra, sendo refeitos apenas
+    quando alguma entrada muda.
+
+    Uso em lote (ex.: cron):
+        python simulacao_safra.py [--cenarios 5000] [--forcar]
+"""
+
+import argparse
+import hashlib
+import sqlite3
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+import previsao_colheita
+
+DB_NAME = "./dados/hidroponia.db"
+
+N_CENARIOS = 5000
+SEMENTE = 42
+# Dispersão (desvio do log) usada quando o cultivar tem menos de MIN_PLANTIOS ajustes
+SIGMA_PESO_PADRAO = 0.10
+SIGMA_RITMO_PADRAO = 0.08
+MIN_PLANTIOS = 3
+# Perda média de plantas até a colheita e concentração da distribuição Beta
+TAXA_PERDA = 0.05
+CONCENTRACAO_PERDA = 100.0
+
+SQL_CRIAR_TABELA = """
+    CREATE TABLE IF NOT EXISTS tbl_projecoes_safra (
+        prs_estufa_id INTEGER,
+        prs_semana TEXT NOT NULL,
+        prs_p10_kg REAL,
+        prs_p50_kg REAL,
+        prs_p90_kg REAL,
+        prs_media_kg REAL,
+        prs_plantios INTEGER,
+        prs_assinatura TEXT,
+        prs_atualizado_em TEXT,
+        PRIMARY KEY (prs_estufa_id, prs_semana)
+    )
+"""
+
+
+def criar_tabela(conn):
+    """Cria a tabela de projeções de safra, se ainda não existir"""
+    conn.execute(SQL_CRIAR_TABELA)
+
+
+def carregar_entradas(conn, data_ref, atualizar=True):
+    """
+    Plantios ativos com previsão de colheita, plantas por bancada e dispersão do cultivar.
+    atualizar=False usa as previsões já gravadas, sem reajustar os plantios.
+    """
+    previsoes = previsao_colheita.obter_previsoes(conn, apenas_ativos=True, data_ref=data_ref, atualizar=atualizar)
+    if previsoes.empty:
+        return previsoes
+    bancadas = pd.read_sql("""
+        SELECT b.bcd_id AS pvc_bancada_id, b.bcd_qtd_furos, b.bcd_estufa_id,
+               COALESCE(e.est_codigo, 'Sem estufa') AS est_codigo
+        FROM tbl_bancadas b
+        LEFT JOIN tbl_estufas e ON e.est_id = b.bcd_estufa_id
+    """, conn)
+    planejado = pd.read_sql("""
+        SELECT aju_bancada_id AS pvc_bancada_id, aju_cultivar_id AS pvc_cultivar_id,
+               aju_data_plantio AS pvc_data_plantio, aju_dias
+        FROM tbl_crescimento_ajustes
+    """, conn)
+    df = (previsoes
+          .merge(bancadas, on="pvc_bancada_id", how="left")
+          .merge(planejado, on=["pvc_bancada_id", "pvc_cultivar_id", "pvc_data_plantio"], how="left")
+          .merge(dispersao_cultivares(conn), on="pvc_cultivar_id", how="left"))
+    df["sigma_peso"] = df["sigma_peso"].fillna(SIGMA_PESO_PADRAO)
+    df["sigma_ritmo"] = df["sigma_ritmo"].fillna(SIGMA_RITMO_PADRAO)
+    df["dia_base"] = df["pvc_dia_colheita"].fillna(df["aju_dias"])
+    df = df[df["bcd_qtd_furos"].fillna(0) > 0].dropna(subset=["dia_base", "pvc_peso_colheita"])
+    colunas = [
+        "pvc_bancada_id", "pvc_cultivar_id", "pvc_data_plantio", "bcd_estufa_id", "est_codigo",
+        "bcd_qtd_furos", "dia_base", "pvc_peso_colheita", "sigma_peso", "sigma_ritmo",
+    ]
+    return df[colunas].sort_values(colunas[:3]).reset_index(drop=True)
+
+
+def dispersao_cultivares(conn):
+    """Desvio do log de K e de r entre os plantios ajustados de cada cultivar"""
+    ajustes = pd.read_sql("""
+        SELECT aju_cultivar_id AS pvc_cultivar_id, aju_K, aju_r
+        FROM tbl_crescimento_ajustes
+        WHERE aju_modelo IS NOT NULL AND aju_K > 0 AND aju_r > 0
+    """, conn)
+    ajustes["log_K"] = np.log(ajustes["aju_K"])
+    ajustes["log_r"] = np.log(ajustes["aju_r"])
+    grupos = ajustes.groupby("pvc_cultivar_id")
+    dispersao = pd.DataFrame({
+        "sigma_peso": grupos["log_K"].std(),
+        "sigma_ritmo": grupos["log_r"].std(),
+        "n": grupos.size(),
+    })
+    dispersao = dispersao[dispersao["n"] >= MIN_PLANTIOS]
+    return dispersao.drop(columns="n").reset_index()
+
+
+def _inicio_semana(datas):
+    """Segunda-feira da semana de cada data (datetime64[D])"""
+    # 1970-01-01 foi uma quinta-feira
+    dias = np.asarray(datas, dtype="datetime64[D]").astype(np.int64)
+    return (dias - (dias + 3) % 7).astype("datetime64[D]")
+
+
+def simular(entradas, n_cenarios=N_CENARIOS, data_ref=None, semente=SEMENTE):
+    """
+    Sorteia n_cenarios cenários e devolve P10/P50/P90 e média (kg) por estufa e
+    semana de colheita.
+    """
+    data_ref = np.datetime64(data_ref or date.today(), "D")
+    rng = np.random.default_rng(semente)
+    n = len(entradas)
+
+    sigma_peso = entradas["sigma_peso"].to_numpy(dtype=np.float64)
+    sigma_ritmo = entradas["sigma_ritmo"].to_numpy(dtype=np.float64)
+    fator_peso = np.exp(rng.standard_normal((n_cenarios, n)) * sigma_peso - sigma_peso ** 2 / 2)
+    fator_ritmo = np.exp(rng.standard_normal((n_cenarios, n)) * sigma_ritmo)
+    colhidas = rng.beta(
+        (1 - TAXA_PERDA) * CONCENTRACAO_PERDA, TAXA_PERDA * CONCENTRACAO_PERDA, size=(n_cenarios, n)
+    )
+
+    plantas = entradas["bcd_qtd_furos"].to_numpy(dtype=np.float64)
+    massa_kg = plantas * colhidas * entradas["pvc_peso_colheita"].to_numpy(dtype=np.float64) * fator_peso / 1000.0
+
+    # Ritmo maior antecipa a colheita; plantios atrasados são colhidos a partir de hoje
+    plantio = pd.to_datetime(entradas["pvc_data_plantio"]).to_numpy().astype("datetime64[D]")
+    dia = np.rint(entradas["dia_base"].to_numpy(dtype=np.float64) / fator_ritmo).astype(np.int64)
+    colheita = np.maximum(plantio + (dia - 1).astype("timedelta64[D]"), data_ref)
+    semana = _inicio_semana(colheita).astype(np.int64)
+
+    # Índice de cada par (estufa, semana) e soma por cenário com um único bincount
+    estufa_idx, estufas = pd.factorize(entradas["bcd_estufa_id"].fillna(-1).astype(np.int64))
+    semana_min = semana.min()
+    n_semanas = (semana.max() - semana_min) // 7 + 1
+    grupo = estufa_idx[None, :] * n_semanas + (semana - semana_min) // 7
+    n_grupos = len(estufas) * n_semanas
+    cenario = np.arange(n_cenarios)[:, None]
+    totais = np.bincount(
+        (cenario * n_grupos + grupo).ravel(), weights=massa_kg.ravel(), minlength=n_cenarios * n_grupos
+    ).reshape(n_cenarios, n_grupos)
+
+    # Grupos com colheita em algum cenário
+    ocorre = np.bincount(grupo.ravel(), minlength=n_grupos) > 0
+    p10, p50, p90 = np.percentile(totais[:, ocorre], [10, 50, 90], axis=0)
+    # Plantios cuja semana mediana de colheita cai no grupo
+    semana_mediana = np.quantile(semana, 0.5, axis=0, method="lower")
+    plantios = np.bincount(estufa_idx * n_semanas + (semana_mediana - semana_min) // 7, minlength=n_grupos)
+    idx = np.flatnonzero(ocorre)
+    codigos = entradas["est_codigo"].groupby(estufa_idx).first()
+    return pd.DataFrame({
+        "estufa_id": estufas[idx // n_semanas],
+        "estufa": codigos.reindex(idx // n_semanas).to_numpy(),
+        "semana": (semana_min + (idx % n_semanas) * 7).astype("datetime64[D]").astype(str),
+        "p10_kg": p10,
+        "p50_kg": p50,
+        "p90_kg": p90,
+        "media_kg": totais[:, ocorre].mean(axis=0),
+        "plantios": plantios[idx],
+    })
+
+
+def _assinatura(entradas, n_cenarios, data_ref):
+    texto = entradas.to_csv(index=False) + f"|{n_cenarios}|{SEMENTE}|{data_ref}"
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def obter_projecao(conn=None, n_cenarios=N_CENARIOS, data_ref=None, forcar=False, atualizar=True):
+    """
+    Projeção por estufa e semana. Só simula de novo quando as entradas (plantios,
+    previsões, bancadas, dispersões, data) mudam; senão lê tbl_projecoes_safra.
+    atualizar=False parte das previsões de colheita já atualizadas por quem chama.
+    Retorna (DataFrame, recalculado).
+    """
+    data_ref = data_ref or date.today()
+    fechar = conn is None
+    if fechar:
+        conn = sqlite3.connect(DB_NAME)
+    try:
+        criar_tabela(conn)
+        entradas = carregar_entradas(conn, data_ref, atualizar)
+        assinatura = _assinatura(entradas, n_cenarios, data_ref)
+        gravada = conn.execute("SELECT MAX(prs_assinatura) FROM tbl_projecoes_safra").fetchone()[0]
+        recalcular = forcar or gravada != assinatura
+        if recalcular:
+            projecao = simular(entradas, n_cenarios, data_ref) if not entradas.empty else pd.DataFrame()
+            agora = datetime.now().isoformat(timespec="seconds")
+            conn.execute("DELETE FROM tbl_projecoes_safra")
+            conn.executemany("""
+                INSERT INTO tbl_projecoes_safra (
+                    prs_estufa_id, prs_semana, prs_p10_kg, prs_p50_kg, prs_p90_kg,
+                    prs_media_kg, prs_plantios, prs_assinatura, prs_atualizado_em
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (None if p.estufa_id < 0 else int(p.estufa_id), p.semana, p.p10_kg, p.p50_kg,
+                 p.p90_kg, p.media_kg, int(p.plantios), assinatura, agora)
+                for p in projecao.itertuples(index=False)
+            ])
+            conn.commit()
+        return pd.read_sql("""
+            SELECT COALESCE(e.est_codigo, 'Sem estufa') AS estufa, p.prs_semana AS semana,
+                   p.prs_p10_kg AS p10_kg, p.prs_p50_kg AS p50_kg, p.prs_p90_kg AS p90_kg,
+                   p.prs_media_kg AS media_kg, p.prs_plantios AS plantios
+            FROM tbl_projecoes_safra p
+            LEFT JOIN tbl_estufas e ON e.est_id = p.prs_estufa_id
+            ORDER BY estufa, semana
+        """, conn), recalcular
+    finally:
+        if fechar:
+            conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Projeção de safra por Monte Carlo (P10/P50/P90 por estufa e semana)")
+    parser.add_argument("--cenarios", type=int, default=N_CENARIOS)
+    parser.add_argument("--forcar", action="store_true", help="simula mesmo sem alterações nas entradas")
+    args = parser.parse_args()
+
+    projecao, recalculado = obter_projecao(n_cenarios=args.cenarios, forcar=args.forcar)
+    print("Simulação refeita." if recalculado else "Entradas inalteradas: projeção lida do banco.")
+    if not projecao.empty:
+        print(projecao.to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# tempo_termico.py
+
+"""
+    Tempo térmico (graus-dia) por estufa.
+
+    As leituras de temperatura do ar e da solução de cada estufa ficam em
+    tbl_temperaturas. Cada leitura contribui com a temperatura efetiva acima da
+    base (limitada pela máxima); a média do dia dá os graus-dia, gravados em
+    tbl_graus_dia. Só os dias cujas leituras mudaram (quantidade, somas ou última
+    leitura) são recalculados, e o acumulado é obtido na leitura com np.cumsum.
+
+    A curva esperada do cultivar supõe T_REFERENCIA o dia todo, ou seja,
+    GRAUS_DIA_REF graus-dia por dia de calendário. O dia térmico de um plantio é o
+    acumulado de graus-dia dividido por GRAUS_DIA_REF, e o peso esperado passa a
+    ser a curva avaliada nesse dia térmico. Dias sem leitura (inclusive os futuros)
+    usam a média dos dias medidos até ali.
+
+    Uso em lote:
+        python tempo_termico.py importar leituras.csv --estufa 1
+        python tempo_termico.py atualizar
+"""
+
+import argparse
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import cache_curvas
+import modelo_crescimento
+
+DB_NAME = "./dados/hidroponia.db"
+
+# Limiares de crescimento (°C)
+T_BASE = 4.0
+T_MAXIMA = 30.0
+# Temperatura média implícita no período cadastrado do cultivar
+T_REFERENCIA = 20.0
+GRAUS_DIA_REF = T_REFERENCIA - T_BASE
+# Peso da temperatura da solução na temperatura efetiva (o restante é do ar)
+PESO_SOLUCAO = 0.5
+
+SQL_CRIAR_TABELAS = (
+    """
+    CREATE TABLE IF NOT EXISTS tbl_temperaturas (
+        tem_estufa_id INTEGER NOT NULL,
+        tem_data_hora TEXT NOT NULL,
+        tem_temp_ar REAL,
+        tem_temp_solucao REAL,
+        PRIMARY KEY (tem_estufa_id, tem_data_hora)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tbl_graus_dia (
+        gdd_estufa_id INTEGER NOT NULL,
+        gdd_data TEXT NOT NULL,
+        gdd_graus_dia REAL,
+        gdd_n_leituras INTEGER,
+        gdd_assinatura TEXT,
+        gdd_atualizado_em TEXT,
+        PRIMARY KEY (gdd_estufa_id, gdd_data)
+    )
+    """,
+)
+
+
+def criar_tabelas(conn):
+    """Cria as tabelas de temperaturas e graus-dia, se ainda não existirem"""
+    for sql in SQL_CRIAR_TABELAS:
+        conn.execute(sql)
+
+
+def registrar_leituras(conn, estufa_id, leituras):
+    """
+    Grava leituras de uma estufa (DataFrame com data_hora, temp_ar e/ou
+    temp_solucao). Leituras no mesmo instante substituem as anteriores.
+    """
+    criar_tabelas(conn)
+    df = pd.DataFrame({
+        "data_hora": pd.to_datetime(leituras["data_hora"]).dt.strftime("%Y-%m-%d %H:%M:%S"),
+        "temp_ar": leituras.get("temp_ar"),
+        "temp_solucao": leituras.get("temp_solucao"),
+    })
+    df = df.astype(object).where(df.notna(), None)
+    conn.executemany("""
+        INSERT OR REPLACE INTO tbl_temperaturas (tem_estufa_id, tem_data_hora, tem_temp_ar, tem_temp_solucao)
+        VALUES (?, ?, ?, ?)
+    """, [(estufa_id, *linha) for linha in df.itertuples(index=False, name=None)])
+    conn.commit()
+    return len(df)
+
+
+def temperatura_efetiva(temp_ar, temp_solucao):
+    """Média ponderada do ar e da solução; com uma delas ausente, usa a outra"""
+    ar = np.asarray(temp_ar, dtype=np.float64)
+    sol = np.asarray(temp_solucao, dtype=np.float64)
+    combinada = (1.0 - PESO_SOLUCAO) * ar + PESO_SOLUCAO * sol
+    return np.where(np.isnan(ar), sol, np.where(np.isnan(sol), ar, combinada))
+
+
+def graus_dia_leituras(temp_ar, temp_solucao, dia_idx, n_dias):
+    """
+    Graus-dia de cada dia a partir das leituras (vetorizado): média, entre as
+    leituras do dia, de min(max(T - T_BASE, 0), T_MAXIMA - T_BASE).
+    Retorna (graus_dia, n_leituras_validas); dias sem leitura ficam NaN.
+    """
+    t_ef = temperatura_efetiva(temp_ar, temp_solucao)
+    valido = ~np.isnan(t_ef)
+    contribuicao = np.clip(np.where(valido, t_ef, 0.0) - T_BASE, 0.0, T_MAXIMA - T_BASE)
+    soma = np.bincount(dia_idx, weights=np.where(valido, contribuicao, 0.0), minlength=n_dias)
+    n = np.bincount(dia_idx, weights=valido.astype(np.float64), minlength=n_dias)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, soma / n, np.nan), n.astype(np.int64)
+
+
+def _resumo_diario(conn, estufas=None):
+    """Assinatura barata de cada (estufa, dia) com leituras"""
+    sql = """
+        SELECT tem_estufa_id, date(tem_data_hora),
+               COUNT(*), TOTAL(tem_temp_ar), TOTAL(tem_temp_solucao), MAX(tem_data_hora)
+        FROM tbl_temperaturas
+    """
+    params = ()
+    if estufas is not None:
+        sql += f" WHERE tem_estufa_id IN ({','.join('?' * len(estufas))})"
+        params = tuple(estufas)
+    sql += " GROUP BY 1, 2"
+    return {(e, d): "|".join(map(str, resto)) for e, d, *resto in conn.execute(sql, params)}
+
+
+def atualizar_graus_dia(conn=None, estufas=None, forcar=False):
+    """
+    Recalcula os graus-dia apenas dos dias com leituras novas ou alteradas.
+    Retorna a quantidade de dias recalculados.
+    """
+    proprio = conn is None
+    if proprio:
+        conn = sqlite3.connect(DB_NAME)
+    try:
+        criar_tabelas(conn)
+        resumo = _resumo_diario(conn, estufas)
+        sql = "SELECT gdd_estufa_id, gdd_data, gdd_assinatura FROM tbl_graus_dia"
+        params = ()
+        if estufas is not None:
+            sql += f" WHERE gdd_estufa_id IN ({','.join('?' * len(estufas))})"
+            params = tuple(estufas)
+        gravados = {(e, d): a for e, d, a in conn.execute(sql, params)}
+
+        alterados = [k for k, a in resumo.items() if forcar or gravados.get(k) != a]
+        removidos = [k for k in gravados if k not in resumo]
+        if removidos:
+            conn.executemany("DELETE FROM tbl_graus_dia WHERE gdd_estufa_id = ? AND gdd_data = ?", removidos)
+
+        if alterados:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS tmp_graus_dia (estufa_id INTEGER, data TEXT)")
+            conn.execute("DELETE FROM tmp_graus_dia")
+            conn.executemany("INSERT INTO tmp_graus_dia VALUES (?, ?)", alterados)
+            leituras = pd.read_sql("""
+                SELECT t.tem_estufa_id, date(t.tem_data_hora) AS dia, t.tem_temp_ar, t.tem_temp_solucao
+                FROM tbl_temperaturas t
+                JOIN tmp_graus_dia p ON p.estufa_id = t.tem_estufa_id AND p.data = date(t.tem_data_hora)
+            """, conn)
+            indice = pd.MultiIndex.from_tuples(alterados)
+            dia_idx = indice.get_indexer(pd.MultiIndex.from_arrays([leituras["tem_estufa_id"], leituras["dia"]]))
+            graus_dia, n = graus_dia_leituras(
+                leituras["tem_temp_ar"], leituras["tem_temp_solucao"], dia_idx, len(alterados)
+            )
+            agora = datetime.now().isoformat(timespec="seconds")
+            conn.executemany("""
+                INSERT OR REPLACE INTO tbl_graus_dia (
+                    gdd_estufa_id, gdd_data, gdd_graus_dia, gdd_n_leituras, gdd_assinatura, gdd_atualizado_em
+                ) VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (e, d, None if np.isnan(g) else float(g), int(q), resumo[(e, d)], agora)
+                for (e, d), g, q in zip(alterados, graus_dia, n)
+            ])
+        conn.commit()
+        return len(alterados)
+    finally:
+        if proprio:
+            conn.close()
+
+
+def graus_dia_periodo(conn, estufa_id, data_inicio, n_dias):
+    """Graus-dia diários da estufa a partir de data_inicio (NaN nos dias sem leitura)"""
+    inicio = pd.Timestamp(data_inicio).normalize()
+    fim = inicio + pd.Timedelta(days=n_dias - 1)
+    linhas = conn.execute("""
+        SELECT gdd_data, gdd_graus_dia FROM tbl_graus_dia
+        WHERE gdd_estufa_id = ? AND gdd_data BETWEEN ? AND ?
+    """, (estufa_id, inicio.strftime("%Y-%m-%d"), fim.strftime("%Y-%m-%d"))).fetchall()
+    graus_dia = np.full(n_dias, np.nan)
+    if linhas:
+        datas, valores = zip(*linhas)
+        idx = (pd.to_datetime(list(datas)) - inicio).days.to_numpy()
+        graus_dia[idx] = np.array(valores, dtype=np.float64)
+    return graus_dia
+
+
+def dias_termicos(graus_dia, graus_dia_ref=GRAUS_DIA_REF):
+    """
+    Converte graus-dia diários em dias térmicos equivalentes (acumulado /
+    graus_dia_ref). Dias sem leitura recebem a média dos dias medidos até ali
+    ou, antes da primeira leitura, graus_dia_ref.
+    """
+    graus_dia = np.asarray(graus_dia, dtype=np.float64)
+    medido = ~np.isnan(graus_dia)
+    soma = np.cumsum(np.where(medido, graus_dia, 0.0))
+    n = np.cumsum(medido)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        media = np.where(n > 0, soma / n, graus_dia_ref)
+    return np.cumsum(np.where(medido, graus_dia, media)) / graus_dia_ref
+
+
+def estufa_da_bancada(conn, bancada_id):
+    linha = conn.execute("SELECT bcd_estufa_id FROM tbl_bancadas WHERE bcd_id = ?", (bancada_id,)).fetchone()
+    return linha[0] if linha else None
+
+
+def dias_termicos_plantio(bancada_id, data_plantio, n_dias):
+    """
+    Dias térmicos dos n_dias do plantio, a partir das temperaturas da estufa
+    da bancada. Retorna (dias_termicos, dias_com_leitura) ou None se a estufa
+    não tiver leituras no período.
+    """
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        criar_tabelas(conn)
+        estufa_id = estufa_da_bancada(conn, bancada_id)
+        if estufa_id is None:
+            return None
+        atualizar_graus_dia(conn, estufas=[estufa_id])
+        graus_dia = graus_dia_periodo(conn, estufa_id, data_plantio, n_dias)
+    finally:
+        conn.close()
+    medidos = int((~np.isnan(graus_dia)).sum())
+    if not medidos:
+        return None
+    return dias_termicos(graus_dia), medidos
+
+
+def reindexar_registros(registros_df, tempo, p_final, dias, p_inicial=cache_curvas.P_INICIAL_PADRAO, modelo=None):
+    """
+    Substitui o peso previsto e a fase de registros_df pela curva esperada
+    avaliada nos dias térmicos (tempo), em vez dos dias de calendário.
+    """
+    df = registros_df.copy()
+    pesos, K = cache_curvas.curva_esperada(p_inicial, p_final, dias, tempo[:len(df)], modelo)
+    fase_ids = modelo_crescimento.classificar_fases(pesos, K)
+    df["Peso previsto (g)"] = np.round(pesos, 2)
+    df["_fase_id"] = fase_ids
+    df["Fase"] = pd.Series(fase_ids, index=df.index).map(modelo_crescimento.FASES)
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Temperaturas e graus-dia por estufa")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    importar = sub.add_parser("importar", help="importa leituras de um CSV (data_hora, temp_ar, temp_solucao)")
+    importar.add_argument("arquivo")
+    importar.add_argument("--estufa", type=int, required=True)
+    atualizar = sub.add_parser("atualizar", help="recalcula os graus-dia dos dias alterados")
+    atualizar.add_argument("--forcar", action="store_true")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(DB_NAME)
+    try:
+        if args.comando == "importar":
+            qtd = registrar_leituras(conn, args.estufa, pd.read_csv(args.arquivo))
+            print(f"{qtd} leituras gravadas.")
+        dias = atualizar_graus_dia(conn, forcar=getattr(args, "forcar", False))
+        print(f"{dias} dias de graus-dia recalculados.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
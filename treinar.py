@@ -1,12 +1,23 @@
-from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
 from langchain.docstore.document import Document
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import deque
+from pypdf import PdfReader
+import argparse
+import hashlib
+import json
+import sys
+import time
+import faiss
+import numpy as np
 import re
 import os # Importar os para criar diretórios se necessário
+import indice_chatbot
+import busca_hibrida
 
 # --- Configurações ---
+# Documento padrão (outros PDFs ou pastas podem ser passados na linha de comando)
 PDF_PATH = "Questionario_limpo.pdf"
 # Ajuste o tamanho e a sobreposição dos chunks conforme a densidade do seu texto.
 # 1000-1200 com 200-300 de overlap é um bom ponto de partida para textos informativos.
@@ -15,6 +26,43 @@ CHUNK_OVERLAP = 300
 # MODELO DE EMBEDDING: ESTE DEVE SER O MESMO EM app.py!
 EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
 
+# Índice FAISS (IndexIDMap2: os ids dos vetores são os ids dos chunks) e manifesto
+FAISS_INDEX_DIR = "faiss_index"
+MANIFESTO = "manifesto.json"
+VERSAO_MANIFESTO = 2
+
+# Prioriza parágrafos inteiros, depois frases, e então outros separadores.
+SEPARADORES = ["\n\n", ". ", "! ", "? ", "\n", "; ", ": ", ", ", " "]
+
+# --- Tipo de índice de busca ---
+# "flat": busca exata (varredura linear); "hnsw": grafo de vizinhança; "ivfpq":
+# listas invertidas com vetores comprimidos (quantização de produto). Os índices
+# aproximados são montados a partir da cópia exata dos vetores (VETORES), que é
+# a usada nas atualizações incrementais (o HNSW não permite remover vetores).
+TIPOS_INDICE = ("flat", "hnsw", "ivfpq")
+VETORES = "vetores.faiss"
+CONFIG_INDICE = {
+    "tipo": "flat",
+    "hnsw_m": 32,           # vizinhos por nó do grafo
+    "ef_construcao": 200,   # candidatos avaliados ao inserir
+    "ef_busca": 64,         # candidatos avaliados por consulta (recall x latência)
+    "nlist": 0,             # listas do IVF (0: automático, ~4 * raiz do número de vetores)
+    "pq_m": 48,             # subvetores do PQ, 1 byte cada (deve dividir a dimensão)
+    "nprobe": 16,           # listas visitadas por consulta
+}
+# Com menos vetores que isto não há dados para treinar o IVF-PQ e a busca fica exata
+MIN_VETORES_IVFPQ = 10000
+
+# --- Ingestão em fluxo ---
+# Páginas por tarefa do pool de extração e tarefas em andamento por processo
+PAGINAS_POR_TAREFA = 8
+TAREFAS_POR_PROCESSO = 2
+# O texto acumulado é dividido quando passa deste tamanho (em chunks)
+BUFFER_CHUNKS = 16
+# Chunks por chamada ao modelo de embeddings e threads que chamam o modelo
+TAMANHO_LOTE = 64
+THREADS_EMBEDDING = 2
+
 # --- Funções Auxiliares ---
 def clean_text(text):
     """
@@ -24,87 +72,458 @@ def clean_text(text):
     """
     # Remove múltiplos espaços em branco, incluindo quebras de linha e quebras de página PDF (\r)
     text = re.sub(r'\s+', ' ', text)
-    
+
     # Remove apenas caracteres que NÃO são:
     # letras (incluindo acentuadas e cedilha), números, espaços,
     # e pontuação essencial (.,;:?!/()-_–'\[\]{}<>/=+\*#@&%$\^|~`\)
     # Esta regex é bem abrangente para português.
     text = re.sub(r'[^\w\s.,;:?!/()\-\–\'\[\]{}<>/=+\*#@&%$\^|~`áéíóúâêîôûàèìòùãõäëïöüçÁÉÍÓÚÂÊÎÔÛÀÈÌÒÙÃÕÄËÏÖÜÇ]', '', text)
-    
+
     # Remove caracteres que podem ser introduzidos de forma indesejada na leitura do PDF (como \r)
-    text = text.replace('\r', '') 
-    
+    text = text.replace('\r', '')
+
     return text.strip()
 
-print(f"Iniciando o treinamento do chatbot com o PDF: {PDF_PATH}")
-print(f"Modelo de Embedding utilizado: {EMBEDDING_MODEL}")
-print(f"Configuração dos Chunks: Tamanho={CHUNK_SIZE}, Overlap={CHUNK_OVERLAP}")
-
-print("Carregando PDF...")
-loader = PyPDFLoader(PDF_PATH)
-try:
-    pages = loader.load()
-    if not pages:
-        print("Erro: O PDF parece estar vazio ou não pôde ser carregado. Verifique o caminho e o conteúdo.")
-        exit()
-    print(f"PDF carregado. Total de páginas: {len(pages)}")
-except Exception as e:
-    print(f"Erro ao carregar o PDF: {e}")
-    print("Certifique-se de que o arquivo PDF existe e não está corrompido.")
-    exit()
-
-# Juntar todo o conteúdo antes de dividir
-full_text = ""
-for page in pages:
-    full_text += clean_text(page.page_content) + "\n\n" # Adiciona quebra de linha para separar páginas
-
-print("Dividindo texto em chunks com contexto...")
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=CHUNK_SIZE,
-    chunk_overlap=CHUNK_OVERLAP,
-    length_function=len,
-    # Adicionando mais separadores de frase/parágrafo para melhor segmentação
-    # Prioriza parágrafos inteiros, depois frases, e então outros separadores.
-    separators=["\n\n", ". ", "! ", "? ", "\n", "; ", ": ", ", ", " "] 
-)
-
-chunks = text_splitter.split_text(full_text)
-
-if not chunks:
-    print("Nenhum chunk foi gerado. Verifique o tamanho do chunk e o conteúdo do texto.")
-    exit()
-
-print(f"Número de chunks criados: {len(chunks)}")
-
-# Criar objetos Document para cada chunk
-docs = []
-for i, chunk in enumerate(chunks):
-    docs.append(Document(
-        page_content=chunk,
-        metadata={"chunk_id": i+1} # Adiciona um metadado simples para identificação
-    ))
-
-print("Criando embeddings e salvando no FAISS...")
-
-try:
-    # Inicializa o modelo de embeddings
-    embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
-    
-    # Cria o banco de vetores FAISS a partir dos documentos e embeddings
-    vector_store = FAISS.from_documents(docs, embeddings)
-    
-    # Define o caminho para salvar o índice FAISS
-    faiss_index_dir = "faiss_index"
-    # Cria o diretório se ele não existir
-    if not os.path.exists(faiss_index_dir):
-        os.makedirs(faiss_index_dir)
-        print(f"Diretório '{faiss_index_dir}' criado.")
-        
-    # Salva o índice FAISS localmente
-    vector_store.save_local(faiss_index_dir)
-    
-    print("Treinamento concluído e FAISS indexado com sucesso!")
-
-except Exception as e:
-    print(f"Erro durante a criação dos embeddings ou salvamento do FAISS: {e}")
-    print("Verifique se o modelo de embedding foi baixado corretamente e se há espaço em disco.")
+def hash_texto(texto):
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+def hash_arquivo(caminho):
+    """Hash do conteúdo do arquivo, lido em blocos"""
+    h = hashlib.sha1()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def listar_documentos(caminhos):
+    """Expande pastas em seus PDFs; devolve os caminhos existentes, normalizados e sem repetição"""
+    documentos = []
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            for raiz, _, arquivos in os.walk(caminho):
+                documentos.extend(os.path.join(raiz, a) for a in arquivos if a.lower().endswith(".pdf"))
+        elif os.path.isfile(caminho):
+            documentos.append(caminho)
+        else:
+            print(f"Aviso: '{caminho}' não encontrado.")
+    return sorted(dict.fromkeys(os.path.normpath(d) for d in documentos))
+
+def criar_splitter():
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        length_function=len,
+        separators=SEPARADORES
+    )
+
+# --- Ingestão em fluxo ---
+def contar_paginas(caminho):
+    return len(PdfReader(caminho).pages)
+
+def extrair_paginas(caminho, inicio, fim):
+    """Extrai e limpa as páginas [inicio, fim) do PDF (executado em um processo do pool)"""
+    reader = PdfReader(caminho)
+    return [clean_text(reader.pages[i].extract_text() or "") for i in range(inicio, fim)]
+
+def paginas_em_fluxo(caminho, pool, processos):
+    """
+    Gera as páginas limpas do PDF, em ordem, extraídas em paralelo. No máximo
+    processos * TAREFAS_POR_PROCESSO tarefas ficam em andamento, o que limita as
+    páginas mantidas em memória.
+    """
+    total = contar_paginas(caminho)
+    faixas = iter(range(0, total, PAGINAS_POR_TAREFA))
+    em_andamento = deque()
+
+    def enviar():
+        inicio = next(faixas, None)
+        if inicio is not None:
+            fim = min(inicio + PAGINAS_POR_TAREFA, total)
+            em_andamento.append(pool.submit(extrair_paginas, caminho, inicio, fim))
+
+    for _ in range(processos * TAREFAS_POR_PROCESSO):
+        enviar()
+    while em_andamento:
+        paginas = em_andamento.popleft().result()
+        enviar()
+        yield from paginas
+
+def chunks_em_fluxo(paginas, splitter):
+    """
+    Divide o texto das páginas em chunks sem juntar o documento inteiro. O texto
+    acumulado é dividido quando passa de BUFFER_CHUNKS chunks; o último chunk
+    continua no buffer e é emendado às páginas seguintes.
+    """
+    limite = BUFFER_CHUNKS * CHUNK_SIZE
+    buffer = ""
+    for pagina in paginas:
+        buffer += pagina + "\n\n" # Adiciona quebra de linha para separar páginas
+        if len(buffer) >= limite:
+            chunks = splitter.split_text(buffer)
+            yield from (c for c in chunks[:-1] if c.strip())
+            buffer = chunks[-1] + "\n\n" if chunks else ""
+    if buffer.strip():
+        yield from (c for c in splitter.split_text(buffer) if c.strip())
+
+class Progresso:
+    """Linha de progresso no terminal: chunks lidos, embeddings gerados e taxa"""
+
+    def __init__(self, ativo=True):
+        self.ativo = ativo and sys.stdout.isatty()
+        self.inicio = time.perf_counter()
+        self.documento = ""
+        self.chunks = 0
+        self.embutidos = 0
+
+    def atualizar(self, chunks=0, embutidos=0):
+        self.chunks += chunks
+        self.embutidos += embutidos
+        if self.ativo:
+            taxa = self.embutidos / max(time.perf_counter() - self.inicio, 1e-9)
+            print(
+                f"\r{self.documento[:40]:<40} chunks: {self.chunks:>7}  embeddings: {self.embutidos:>7} ({taxa:.0f}/s)",
+                end="", flush=True
+            )
+
+    def fim(self):
+        if self.ativo:
+            print()
+
+class EmbutidorEmLotes:
+    """
+    Agrupa os chunks novos em lotes de tamanho fixo e gera os embeddings num pool
+    de threads. No máximo 2 lotes por thread ficam pendentes; os concluídos são
+    gravados no índice e no docstore na ordem de envio.
+    """
+
+    def __init__(self, embeddings, index, docstore, progresso,
+                 tamanho_lote=TAMANHO_LOTE, threads=THREADS_EMBEDDING):
+        self.embeddings = embeddings
+        self.index = index
+        self.docstore = docstore
+        self.progresso = progresso
+        self.tamanho_lote = tamanho_lote
+        self.threads = threads
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+        self.lote = []
+        self.pendentes = deque()
+
+    def adicionar(self, chunk_id, texto, fonte):
+        self.lote.append((chunk_id, texto, fonte))
+        if len(self.lote) >= self.tamanho_lote:
+            self._enviar()
+
+    def adicionar_vetor(self, chunk_id, vetor, texto, fonte):
+        """Chunk com vetor já conhecido (texto idêntico a outro já indexado)"""
+        self._gravar([(chunk_id, texto, fonte)], np.asarray(vetor, dtype="float32").reshape(1, -1))
+
+    def _enviar(self):
+        if not self.lote:
+            return
+        if self.embeddings is None:
+            self.embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+        lote, self.lote = self.lote, []
+        futuro = self.pool.submit(self.embeddings.embed_documents, [t for _, t, _ in lote])
+        self.pendentes.append((lote, futuro))
+        while len(self.pendentes) > 2 * self.threads:
+            self._concluir()
+
+    def _concluir(self):
+        lote, futuro = self.pendentes.popleft()
+        self._gravar(lote, np.asarray(futuro.result(), dtype="float32"))
+        self.progresso.atualizar(embutidos=len(lote))
+
+    def _gravar(self, lote, vetores):
+        if self.index is None:
+            self.index = faiss.IndexIDMap2(faiss.IndexFlatL2(vetores.shape[1]))
+        self.index.add_with_ids(vetores, np.array([i for i, _, _ in lote], dtype=np.int64))
+        self.docstore.add({
+            str(i): Document(page_content=texto, metadata={"chunk_id": i, "fonte": fonte})
+            for i, texto, fonte in lote
+        })
+
+    def finalizar(self):
+        """Envia o último lote, espera os pendentes e devolve o índice"""
+        try:
+            self._enviar()
+            while self.pendentes:
+                self._concluir()
+        finally:
+            self.pool.shutdown(cancel_futures=True)
+        return self.index
+
+# --- Índice de busca ---
+def config_indice(anterior=None, **ajustes):
+    """Configuração do índice de busca: a padrão, atualizada pela gravada e pelos ajustes informados"""
+    config = dict(CONFIG_INDICE)
+    config.update(anterior or {})
+    config.update({k: v for k, v in ajustes.items() if v is not None})
+    if config["tipo"] not in TIPOS_INDICE:
+        raise ValueError(f"Tipo de índice inválido: {config['tipo']} (use {', '.join(TIPOS_INDICE)})")
+    return config
+
+def matriz_vetores(index):
+    """
+    Ids e vetores do índice exato, sem cópia: IndexIDMap2 sobre IndexFlatL2 ou
+    IndexFlatL2 puro (índices gerados antes dos ids de chunks, em que os ids
+    são as posições). Outros tipos são reconstruídos com reconstruct_n.
+    """
+    index = faiss.downcast_index(index)
+    if hasattr(index, "id_map"):
+        ids, plano = faiss.vector_to_array(index.id_map), faiss.downcast_index(index.index)
+    else:
+        ids, plano = np.arange(index.ntotal, dtype=np.int64), index
+    if not isinstance(plano, faiss.IndexFlat):
+        return ids, plano.reconstruct_n(0, plano.ntotal)
+    vetores = faiss.rev_swig_ptr(plano.get_xb(), plano.ntotal * plano.d).reshape(plano.ntotal, plano.d)
+    return ids, vetores
+
+def construir_indice(index, config):
+    """
+    Monta o índice de busca a partir do índice exato. Para "flat" (ou IVF-PQ
+    com poucos vetores) devolve o próprio índice exato.
+    """
+    n, d = index.ntotal, index.d
+    if config["tipo"] == "flat" or (config["tipo"] == "ivfpq" and n < MIN_VETORES_IVFPQ):
+        return index
+    ids, vetores = matriz_vetores(index)
+
+    if config["tipo"] == "hnsw":
+        grafo = faiss.IndexHNSWFlat(d, config["hnsw_m"])
+        grafo.hnsw.efConstruction = config["ef_construcao"]
+        grafo.hnsw.efSearch = config["ef_busca"]
+        busca = faiss.IndexIDMap2(grafo)
+        busca.add_with_ids(vetores, ids)
+        return busca
+
+    if d % config["pq_m"]:
+        raise ValueError(f"pq_m={config['pq_m']} não divide a dimensão dos vetores ({d}).")
+    nlist = config["nlist"] or max(1, int(min(4 * np.sqrt(n), n / 39)))
+    busca = faiss.index_factory(d, f"IVF{nlist},PQ{config['pq_m']}")
+    # Amostra de treino: ~64 vetores por lista e por centróide do PQ
+    amostra = np.random.default_rng(0).choice(n, size=min(n, 64 * max(nlist, 256)), replace=False)
+    busca.train(vetores[np.sort(amostra)])
+    busca.add_with_ids(vetores, ids)
+    busca.nprobe = config["nprobe"]
+    return busca
+
+# --- Estado do índice ---
+def manifesto_vazio():
+    return {
+        "versao": VERSAO_MANIFESTO,
+        "modelo": EMBEDDING_MODEL,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "proximo_id": 1,
+        "indice": dict(CONFIG_INDICE),
+        "documentos": {}
+    }
+
+def carregar_estado(pasta, reconstruir=False):
+    """
+    Carrega o índice exato, o docstore (SQLite, aberto para escrita) e o manifesto.
+    Sem manifesto compatível (outro modelo ou outra configuração de chunks) ou com
+    reconstruir, começa um índice vazio, mantendo a configuração do índice de busca.
+    """
+    os.makedirs(pasta, exist_ok=True)
+    caminho_docstore = os.path.join(pasta, indice_chatbot.DOCSTORE)
+    tinha_docstore = os.path.exists(caminho_docstore)
+    docstore = indice_chatbot.DocstoreSQLite(caminho_docstore)
+    vazio = manifesto_vazio()
+
+    caminho_manifesto = os.path.join(pasta, MANIFESTO)
+    if os.path.exists(caminho_manifesto):
+        with open(caminho_manifesto, encoding="utf-8") as f:
+            manifesto = json.load(f)
+        vazio["indice"] = manifesto.get("indice", vazio["indice"])
+        compativel = tinha_docstore and all(
+            manifesto.get(c) == vazio[c] for c in ("versao", "modelo", "chunk_size", "chunk_overlap")
+        )
+        if compativel and not reconstruir:
+            # Com índice aproximado, os vetores exatos ficam em VETORES
+            exato = VETORES if os.path.exists(os.path.join(pasta, VETORES)) else "index.faiss"
+            return faiss.read_index(os.path.join(pasta, exato)), docstore, manifesto
+        if not compativel:
+            print("Manifesto incompatível com a configuração atual: o índice será reconstruído.")
+    docstore.limpar()
+    return None, docstore, vazio
+
+def gravar_indice(index, caminho):
+    faiss.write_index(index, caminho + ".tmp")
+    os.replace(caminho + ".tmp", caminho)
+
+def salvar_estado(pasta, index, docstore, manifesto, busca=None):
+    """
+    Grava os índices via arquivo temporário + os.replace (sem deixar o índice pela
+    metade), confirma a transação do docstore e grava o manifesto por último.
+    index é o índice exato e busca, o índice lido pelo chatbot (index.faiss): o
+    próprio index, um índice aproximado, ou None para manter o index.faiss atual.
+    """
+    if busca is index:
+        gravar_indice(index, os.path.join(pasta, "index.faiss"))
+        if os.path.exists(os.path.join(pasta, VETORES)):
+            os.remove(os.path.join(pasta, VETORES))
+    else:
+        gravar_indice(index, os.path.join(pasta, VETORES))
+        if busca is not None:
+            gravar_indice(busca, os.path.join(pasta, "index.faiss"))
+
+    docstore.salvar()
+    # Docstore em pickle das versões anteriores
+    if os.path.exists(os.path.join(pasta, "index.pkl")):
+        os.remove(os.path.join(pasta, "index.pkl"))
+
+    caminho = os.path.join(pasta, MANIFESTO)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifesto, f, ensure_ascii=False, indent=1)
+    os.replace(caminho + ".tmp", caminho)
+
+# --- Indexação incremental ---
+def indexar(caminhos, pasta=FAISS_INDEX_DIR, embeddings=None, reconstruir=False,
+            processos=None, tamanho_lote=TAMANHO_LOTE, threads=THREADS_EMBEDDING, progresso=True, indice=None):
+    """
+    Atualiza o índice com os documentos informados e os já indexados.
+
+    Documentos já indexados continuam na biblioteca enquanto o arquivo existir;
+    os que sumiram do disco têm seus vetores removidos. Documentos com o mesmo
+    hash de arquivo são ignorados. Nos alterados, cada chunk é identificado pelo
+    hash do texto: chunks já indexados mantêm o id (e o vetor), chunks idênticos
+    a outro já indexado reaproveitam o vetor, e só os novos são enviados ao
+    modelo de embeddings, em lotes de tamanho_lote.
+
+    As páginas são extraídas por um pool de processos e seguem em fluxo até o
+    splitter e os lotes de embeddings, sem carregar documentos inteiros.
+
+    indice ajusta a configuração do índice de busca (ver CONFIG_INDICE; por
+    padrão, mantém a gravada). O índice de busca só é remontado quando os
+    vetores ou a configuração mudam. Retorna um dicionário com as contagens.
+    """
+    index, docstore, manifesto = carregar_estado(pasta, reconstruir)
+
+    anteriores = manifesto["documentos"]
+    documentos = listar_documentos(list(caminhos) + [c for c in anteriores if os.path.isfile(c)])
+    stats = {"documentos": len(documentos), "inalterados": 0, "novos": 0, "reaproveitados": 0, "removidos": 0}
+
+    # Vetores já existentes, por hash do texto (para reaproveitar entre documentos)
+    id_por_hash = {h: i for doc in anteriores.values() for h, i in doc["chunks"]}
+
+    remover = [i for caminho, doc in anteriores.items() if caminho not in documentos for _, i in doc["chunks"]]
+    novos_docs = {}
+    splitter = criar_splitter()
+    proximo_id = manifesto["proximo_id"]
+    processos = processos or os.cpu_count() or 1
+    barra = Progresso(progresso)
+    embutidor = EmbutidorEmLotes(embeddings, index, docstore, barra, tamanho_lote, threads)
+
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        for caminho in documentos:
+            hash_doc = hash_arquivo(caminho)
+            anterior = anteriores.get(caminho)
+            if anterior and anterior["hash"] == hash_doc:
+                novos_docs[caminho] = anterior
+                stats["inalterados"] += 1
+                continue
+
+            fonte = os.path.basename(caminho)
+            barra.documento = fonte
+            # Ids antigos deste documento, por hash (um texto pode aparecer mais de uma vez)
+            livres = {}
+            for h, i in (anterior["chunks"] if anterior else []):
+                livres.setdefault(h, []).append(i)
+
+            chunks = []
+            for texto in chunks_em_fluxo(paginas_em_fluxo(caminho, pool, processos), splitter):
+                barra.atualizar(chunks=1)
+                h = hash_texto(texto)
+                if livres.get(h):
+                    chunks.append([h, livres[h].pop()])
+                    continue
+                chunks.append([h, proximo_id])
+                if h in id_por_hash:
+                    # Vetor lido antes de qualquer remoção (as remoções ficam para o final)
+                    embutidor.adicionar_vetor(proximo_id, index.reconstruct(int(id_por_hash[h])), texto, fonte)
+                    stats["reaproveitados"] += 1
+                else:
+                    embutidor.adicionar(proximo_id, texto, fonte)
+                    stats["novos"] += 1
+                proximo_id += 1
+            remover.extend(i for ids in livres.values() for i in ids)
+            novos_docs[caminho] = {"hash": hash_doc, "chunks": chunks}
+    index = embutidor.finalizar()
+    barra.fim()
+
+    if remover and index is not None:
+        index.remove_ids(np.array(remover, dtype=np.int64))
+        docstore.delete(remover)
+    stats["removidos"] = len(remover)
+
+    config = config_indice(manifesto.get("indice"), **(indice or {}))
+    remontar = (
+        reconstruir or config != manifesto.get("indice")
+        or stats["novos"] or stats["reaproveitados"] or stats["removidos"]
+        or not os.path.exists(os.path.join(pasta, "index.faiss"))
+    )
+    manifesto["documentos"] = novos_docs
+    manifesto["proximo_id"] = proximo_id
+    manifesto["indice"] = config
+    if index is None:
+        docstore.fechar()
+        print("Nenhum chunk foi gerado. Verifique os documentos informados.")
+        return stats
+    if remontar:
+        busca = construir_indice(index, config)
+    else:
+        busca = index if not os.path.exists(os.path.join(pasta, VETORES)) else None
+    salvar_estado(pasta, index, docstore, manifesto, busca)
+    # Índice BM25 da busca híbrida, sobre os mesmos chunks do índice de vetores
+    if remontar or not busca_hibrida.existe_bm25(pasta):
+        stats["bm25"] = busca_hibrida.construir_bm25(docstore.iterar(), pasta)
+    docstore.fechar()
+    stats["total"] = index.ntotal
+    stats["indice"] = config["tipo"] if busca is not index else "flat"
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Indexa (de forma incremental) os documentos do chatbot no FAISS")
+    parser.add_argument("documentos", nargs="*", default=[PDF_PATH], help="PDFs ou pastas com PDFs")
+    parser.add_argument("--indice", default=FAISS_INDEX_DIR, help="pasta do índice")
+    parser.add_argument("--reconstruir", action="store_true", help="ignora o índice atual e reindexa tudo")
+    parser.add_argument("--processos", type=int, default=None, help="processos de extração de páginas (padrão: núcleos da CPU)")
+    parser.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="chunks por lote de embeddings")
+    parser.add_argument("--threads", type=int, default=THREADS_EMBEDDING, help="threads que geram os embeddings")
+    busca = parser.add_argument_group("índice de busca (padrão: mantém a configuração atual)")
+    busca.add_argument("--tipo", choices=TIPOS_INDICE, help="flat (exato), hnsw ou ivfpq")
+    busca.add_argument("--hnsw-m", type=int, help=f"HNSW: vizinhos por nó ({CONFIG_INDICE['hnsw_m']})")
+    busca.add_argument("--ef-construcao", type=int, help=f"HNSW: efConstruction ({CONFIG_INDICE['ef_construcao']})")
+    busca.add_argument("--ef-busca", type=int, help=f"HNSW: efSearch ({CONFIG_INDICE['ef_busca']})")
+    busca.add_argument("--nlist", type=int, help="IVF-PQ: número de listas (0: automático)")
+    busca.add_argument("--pq-m", type=int, help=f"IVF-PQ: subvetores do PQ ({CONFIG_INDICE['pq_m']})")
+    busca.add_argument("--nprobe", type=int, help=f"IVF-PQ: listas visitadas por consulta ({CONFIG_INDICE['nprobe']})")
+    args = parser.parse_args()
+
+    print(f"Iniciando o treinamento do chatbot com: {', '.join(args.documentos)}")
+    print(f"Modelo de Embedding utilizado: {EMBEDDING_MODEL}")
+    print(f"Configuração dos Chunks: Tamanho={CHUNK_SIZE}, Overlap={CHUNK_OVERLAP}")
+
+    inicio = time.perf_counter()
+    try:
+        stats = indexar(
+            args.documentos, pasta=args.indice, reconstruir=args.reconstruir,
+            processos=args.processos, tamanho_lote=args.lote, threads=args.threads,
+            indice={c: getattr(args, c) for c in CONFIG_INDICE}
+        )
+    except Exception as e:
+        print(f"Erro durante a indexação: {e}")
+        print("Verifique se os PDFs existem, se o modelo de embedding foi baixado e se há espaço em disco.")
+        raise SystemExit(1)
+
+    print(
+        f"Documentos: {stats['documentos']} ({stats['inalterados']} inalterados). "
+        f"Chunks novos: {stats['novos']}, reaproveitados: {stats['reaproveitados']}, "
+        f"removidos: {stats['removidos']}. Total no índice: {stats.get('total', 0)} "
+        f"(busca: {stats.get('indice', '-')})."
+    )
+    print(f"Treinamento concluído em {time.perf_counter() - inicio:.1f} s.")
+
+if __name__ == "__main__":
+    main()